@@ -56,6 +56,13 @@ def build_parser() -> argparse.ArgumentParser:
 	runp.add_argument("--novel_id", default=None, help="小说 ID，缺省时从 chapter_dir 父目录名推断")
 	runp.add_argument("--until", default="plan", choices=STAGES)
 	runp.add_argument("--from_stage", default=None, choices=STAGES, help="从指定阶段开始（跳过之前的阶段）")
+	runp.add_argument("--profile", default=None, help="Render 参数组，如 proxy（见 configs/stage_render.yaml profiles）")
+	runp.add_argument(
+		"--cassette",
+		default=None,
+		choices=["off", "record", "replay"],
+		help="provider 录制 / 回放（覆盖 PROVIDER_CASSETTE，见 providers/cassette.py）",
+	)
 
 	return p
 
@@ -114,7 +121,16 @@ def cmd_prepare(chapters_dir: str, novel_id: str | None = None, chapter: str | N
 	print(f"[OK] prepared {len(chapter_files)} chapter(s), novel_id={resolved_novel_id}")
 
 
-def cmd_run(chapter_dir: str, until: str, novel_id: str | None = None, from_stage: str | None = None) -> None:
+def cmd_run(
+	chapter_dir: str,
+	until: str,
+	novel_id: str | None = None,
+	from_stage: str | None = None,
+	profile: str | None = None,
+	cassette: str | None = None,
+) -> None:
+	import os
+
 	from novel2comic.pipeline.orchestrator import run_until
 	from novel2comic.stages.base import StageContext
 
@@ -126,8 +142,13 @@ def cmd_run(chapter_dir: str, until: str, novel_id: str | None = None, from_stag
 	ctx = StageContext(
 		novel_id=resolved_novel_id,
 		chapter_id=chapter_name,
+		render_profile=profile or "",
 	)
 
+	if cassette:
+		# provider 会话在首次请求时才创建，这里设 env 即可对本次运行生效
+		os.environ["PROVIDER_CASSETTE"] = cassette
+
 	run_until(chapter_dir=chapter_dir, ctx=ctx, until=until, from_stage=from_stage)
 
 
@@ -143,7 +164,14 @@ def main(argv=None) -> None:
 		return
 
 	if args.cmd == "run":
-		cmd_run(args.chapter_dir, args.until, novel_id=args.novel_id, from_stage=args.from_stage)
+		cmd_run(
+			args.chapter_dir,
+			args.until,
+			novel_id=args.novel_id,
+			from_stage=args.from_stage,
+			profile=args.profile,
+			cassette=args.cassette,
+		)
 		return
 
 
@@ -3,43 +3,82 @@
 novel2comic/core/audio_utils.py
 
 纯 stdlib 的 wav 拼接工具，避免 pydub（Python 3.13 无 audioop）。
-支持 mp3→wav 转换（通过 ffmpeg）。
+解码策略（按开销从低到高）：
+- wav：原样返回
+- pcm：provider 直出 s16le 裸流，仅补 wav 头（无子进程）
+- mp3/opus 等：ffmpeg 经 stdin/stdout 管道解码（无临时文件）
+流式落盘：StreamingWavWriter 边收 PCM 边写文件；concat_wav_files 按文件逐段拼接。
 """
 
 from __future__ import annotations
 
+import struct
 import subprocess
-import tempfile
 import wave
 from io import BytesIO
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 
+# 可直接补 wav 头的裸 PCM 格式（SiliconFlow /audio/speech 的 pcm 为 16bit mono）
+PCM_FORMATS = frozenset({"pcm"})
 
-def _ensure_wav(audio_bytes: bytes) -> bytes:
+
+def pcm_to_wav(pcm_bytes: bytes, sample_rate: int = 24000, nchannels: int = 1, sampwidth: int = 2) -> bytes:
+	"""裸 PCM（s16le）封装为 wav bytes。"""
+	buf = BytesIO()
+	with wave.open(buf, "wb") as wf:
+		wf.setnchannels(nchannels)
+		wf.setsampwidth(sampwidth)
+		wf.setframerate(sample_rate)
+		wf.writeframes(pcm_bytes)
+	return buf.getvalue()
+
+
+def _ffmpeg_decode_pcm(audio_bytes: bytes, sample_rate: int = 24000) -> bytes:
 	"""
-	若为 mp3/其他格式，用 ffmpeg 转为 wav。若已是 wav 则原样返回。
+	ffmpeg 管道解码：stdin 输入压缩音频，stdout 输出 s16le mono PCM。
+	不落临时文件，只有一次进程启动。
+	"""
+	r = subprocess.run(
+		[
+			"ffmpeg", "-hide_banner", "-loglevel", "error",
+			"-i", "pipe:0",
+			"-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-ac", "1",
+			"pipe:1",
+		],
+		input=audio_bytes,
+		capture_output=True,
+	)
+	if r.returncode != 0:
+		err = r.stderr.decode("utf-8", errors="replace")[:500]
+		raise RuntimeError(f"ffmpeg decode failed: {err}")
+	return r.stdout
+
+
+def decode_to_wav(audio_bytes: bytes, response_format: str = "", sample_rate: int = 24000) -> bytes:
+	"""
+	把 TTS 响应统一为 wav bytes。
+	response_format 为请求时的格式（wav/pcm/mp3/opus），pcm 无头部，必须显式告知。
 	"""
 	if audio_bytes[:4] == b"RIFF":
 		return audio_bytes
-	# mp3/opus 等需转换
-	with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as fin:
-		fin.write(audio_bytes)
-		mp3_path = fin.name
-	wav_path = None
-	try:
-		with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as fout:
-			wav_path = fout.name
-		subprocess.run(
-			["ffmpeg", "-y", "-i", mp3_path, "-acodec", "pcm_s16le", "-ar", "24000", "-ac", "1", wav_path],
-			check=True,
-			capture_output=True,
-		)
-		return Path(wav_path).read_bytes()
-	finally:
-		Path(mp3_path).unlink(missing_ok=True)
-		if wav_path:
-			Path(wav_path).unlink(missing_ok=True)
+	if (response_format or "").strip().lower() in PCM_FORMATS:
+		return pcm_to_wav(audio_bytes, sample_rate)
+	return pcm_to_wav(_ffmpeg_decode_pcm(audio_bytes, sample_rate), sample_rate)
+
+
+def _ensure_wav(audio_bytes: bytes, sample_rate: int = 24000) -> bytes:
+	"""
+	若为 mp3/其他格式，用 ffmpeg 转为 wav。若已是 wav 则原样返回。
+	保留旧入口，新代码请用 decode_to_wav（可识别 pcm）。
+	"""
+	return decode_to_wav(audio_bytes, "", sample_rate)
+
+
+def wav_frames(wav_bytes: bytes) -> Tuple[int, int]:
+	"""从 wav bytes 获取 (帧数, 采样率)，用于精确计时。"""
+	with wave.open(BytesIO(wav_bytes), "rb") as wf:
+		return wf.getnframes(), wf.getframerate()
 
 
 def wav_duration_ms(wav_bytes: bytes) -> int:
@@ -114,3 +153,117 @@ def concat_wavs_with_pauses(
 		wf.setframerate(params[2])
 		wf.writeframes(b"".join(all_frames))
 	return buf.getvalue()
+
+
+_WAV_HEADER_LEN = 44
+
+
+class StreamingWavWriter:
+	"""
+	增量写 wav 文件：先写占位头，PCM 追加写入，close 时回填长度。
+	mark()/rollback() 用于请求重试时丢弃写了一半的数据。
+	"""
+
+	def __init__(self, path: Path, sample_rate: int = 24000, nchannels: int = 1, sampwidth: int = 2):
+		self.path = Path(path)
+		self.sample_rate = sample_rate
+		self.nchannels = nchannels
+		self.sampwidth = sampwidth
+		self._block = nchannels * sampwidth
+		self._carry = b""
+		self._f = open(self.path, "wb")
+		self._f.write(self._header(0))
+
+	def _header(self, data_len: int) -> bytes:
+		byte_rate = self.sample_rate * self._block
+		return (
+			b"RIFF" + struct.pack("<I", 36 + data_len) + b"WAVE"
+			+ b"fmt " + struct.pack("<IHHIIHH", 16, 1, self.nchannels, self.sample_rate, byte_rate, self._block, self.sampwidth * 8)
+			+ b"data" + struct.pack("<I", data_len)
+		)
+
+	@property
+	def data_bytes(self) -> int:
+		return self._f.tell() - _WAV_HEADER_LEN
+
+	@property
+	def position_ms(self) -> float:
+		"""当前写入位置（ms，未取整）。"""
+		return self.data_bytes / self._block / self.sample_rate * 1000
+
+	@property
+	def duration_ms(self) -> int:
+		return int(self.position_ms)
+
+	def write(self, pcm: bytes) -> None:
+		"""写入 PCM 数据块；不足一帧的尾巴暂存，与下一块拼接。"""
+		data = self._carry + pcm
+		cut = len(data) - len(data) % self._block
+		self._f.write(data[:cut])
+		self._carry = data[cut:]
+		self._f.flush()
+
+	def write_silence_ms(self, ms: int) -> None:
+		if ms > 0:
+			self.write(b"\x00" * (int(self.sample_rate * ms / 1000) * self._block))
+
+	def mark(self) -> int:
+		self._carry = b""
+		return self._f.tell()
+
+	def rollback(self, mark: int) -> None:
+		self._carry = b""
+		self._f.seek(mark)
+		self._f.truncate()
+
+	def close(self) -> None:
+		if self._f.closed:
+			return
+		data_len = self.data_bytes
+		self._f.seek(0)
+		self._f.write(self._header(data_len))
+		self._f.close()
+
+	def __enter__(self) -> "StreamingWavWriter":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+
+def concat_wav_files(
+	wav_paths: List[Path],
+	pauses_after: List[int],
+	out_path: Path,
+	chunk_frames: int = 1 << 16,
+) -> List[Tuple[float, float]]:
+	"""
+	按文件逐段拼接 wav 到 out_path（不把整章读入内存）。
+	pauses_after 语义同 concat_wavs_with_pauses。
+	返回每个输入文件在输出中的 (start_ms, end_ms)，由帧数精确计算。
+	"""
+	writer: Optional[StreamingWavWriter] = None
+	params = None
+	spans: List[Tuple[float, float]] = []
+	try:
+		for i, p in enumerate(wav_paths):
+			with wave.open(str(p), "rb") as wf:
+				cur = (wf.getnchannels(), wf.getsampwidth(), wf.getframerate())
+				if params is None:
+					params = cur
+					writer = StreamingWavWriter(out_path, sample_rate=cur[2], nchannels=cur[0], sampwidth=cur[1])
+				elif cur != params:
+					raise ValueError(f"incompatible wav format: {cur} vs {params}")
+				start_ms = writer.position_ms
+				while True:
+					frames = wf.readframes(chunk_frames)
+					if not frames:
+						break
+					writer.write(frames)
+				spans.append((start_ms, writer.position_ms))
+			if i < len(wav_paths) - 1 and i < len(pauses_after):
+				writer.write_silence_ms(pauses_after[i])
+		return spans
+	finally:
+		if writer:
+			writer.close()
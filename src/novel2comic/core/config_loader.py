@@ -74,6 +74,12 @@ _CFG_PATH_TO_ENV: Dict[str, str] = {
 	"stage_director_review.temperature": "DIRECTOR_REVIEW_TEMPERATURE",
 	"stage_tts.instruction_max_len": "TTS_INSTRUCTION_MAX_LEN",
 	"stage_tts.use_style_prompt": "TTS_USE_STYLE_PROMPT",
+	"stage_align.provider": "ALIGN_PROVIDER",
+	"stage_render.mode": "RENDER_MODE",
+	"stage_render.workers": "RENDER_WORKERS",
+	"stage_render.subtitles": "RENDER_SUBTITLES",
+	"stage_render.profile": "RENDER_PROFILE",
+	"stage_render.hls": "RENDER_HLS",
 	"stage_anchors.enabled": "ANCHORS_ENABLED",
 	"stage_anchors.topk_chars": "ANCHORS_TOPK",
 	"stage_anchors.auto_build_on_missing": "ANCHORS_AUTO_BUILD",
@@ -134,7 +140,7 @@ def _is_leaf_dict(d: dict) -> bool:
 def load_config(name: str, use_cache: bool = True) -> Dict[str, Any]:
 	"""
 	加载 configs/<name>.yaml，并应用 env 覆盖。
-	name: "siliconflow" | "stage_segment" | "stage_director_review" | "stage_tts" | "stage_image"
+	name: "siliconflow" | "stage_segment" | "stage_director_review" | "stage_tts" | "stage_align" | "stage_render" | "stage_image"
 	"""
 	_ensure_dotenv_loaded()
 	if use_cache and name in _CACHE:
@@ -152,7 +158,7 @@ def get_siliconflow() -> Dict[str, Any]:
 
 
 def get_stage_config(stage: str) -> Dict[str, Any]:
-	"""加载 stage 配置：stage 为 segment/director_review/tts/image。"""
+	"""加载 stage 配置：stage 为 segment/director_review/tts/align/render/image。"""
 	return load_config(f"stage_{stage}")
 
 
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+novel2comic/core/ffmpeg_pool.py
+
+ffmpeg 进程池：限制同时运行的 ffmpeg 数，按核数分配 -threads，解析 -progress 输出，带超时。
+- 同一进程内所有 RenderStage 共用一个池（get_ffmpeg_pool），多章节并发渲染也不会超订 CPU
+- 每个 job 的 -threads = CPU 核数 / 最大并发数（命令里已有 -threads 时不改）
+- stdout 走 -progress pipe:1，逐行解析 out_time，回调进度与 ETA
+- stderr 只保留末尾若干行（不整段缓存在内存）
+- 超时后 kill 进程，返回 timed_out
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+STDERR_TAIL_LINES = 40
+DEFAULT_TIMEOUT_S = 900
+
+
+@dataclass
+class FFmpegProgress:
+	"""单个 job 的进度快照。eta_s 在速度未知时为 None。"""
+	label: str
+	out_ms: int
+	duration_ms: int
+	elapsed_s: float
+	done: bool = False
+
+	@property
+	def speed(self) -> float:
+		"""编码速度（媒体时长 / 墙钟时长），1.0 即实时。"""
+		return self.out_ms / 1000.0 / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+	@property
+	def eta_s(self) -> Optional[float]:
+		if self.done:
+			return 0.0
+		if self.duration_ms <= 0 or self.speed <= 0:
+			return None
+		return max(0.0, (self.duration_ms - self.out_ms) / 1000.0 / self.speed)
+
+
+@dataclass
+class FFmpegResult:
+	returncode: int
+	elapsed_s: float
+	stderr_tail: str = ""
+	timed_out: bool = False
+
+	@property
+	def ok(self) -> bool:
+		return self.returncode == 0 and not self.timed_out
+
+	@property
+	def error(self) -> Optional[str]:
+		if self.timed_out:
+			return f"timeout after {self.elapsed_s:.0f}s: {self.stderr_tail[-500:]}"
+		return None if self.returncode == 0 else self.stderr_tail[-1000:]
+
+
+ProgressCallback = Callable[[FFmpegProgress], None]
+
+
+def parse_progress_line(line: str, state: Dict[str, str]) -> Optional[str]:
+	"""
+	累积 -progress 的 key=value 行；遇到 progress=continue|end 时返回该值（一个进度块结束）。
+	"""
+	key, sep, value = line.strip().partition("=")
+	if not sep:
+		return None
+	state[key] = value
+	return value if key == "progress" else None
+
+
+def progress_out_ms(state: Dict[str, str]) -> int:
+	"""out_time_us（新版）或 out_time_ms（旧版，实际单位也是微秒）换算为 ms。"""
+	for key in ("out_time_us", "out_time_ms"):
+		raw = state.get(key, "")
+		if raw.lstrip("-").isdigit():
+			return max(0, int(raw) // 1000)
+	return 0
+
+
+def _is_ffmpeg(cmd: List[str]) -> bool:
+	return bool(cmd) and os.path.basename(cmd[0]).startswith("ffmpeg")
+
+
+def with_threads(cmd: List[str], threads: int) -> List[str]:
+	"""ffmpeg 命令在输出路径前插入 -threads（命令中已有则不变）。"""
+	if threads <= 0 or not _is_ffmpeg(cmd) or "-threads" in cmd:
+		return list(cmd)
+	return [*cmd[:-1], "-threads", str(threads), cmd[-1]]
+
+
+def with_progress(cmd: List[str]) -> List[str]:
+	"""ffmpeg 命令加 -progress pipe:1 -nostats（紧跟程序名，作为全局选项）。"""
+	if not _is_ffmpeg(cmd) or "-progress" in cmd:
+		return list(cmd)
+	return [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+
+
+class FFmpegPool:
+	"""
+	max_procs：同时运行的 ffmpeg 上限（<=0 取 CPU 核数的一半）。
+	timeout_s：单个 job 墙钟超时（<=0 不限）。
+	"""
+
+	def __init__(self, max_procs: int = 0, timeout_s: float = DEFAULT_TIMEOUT_S, cpu_count: Optional[int] = None):
+		cpus = cpu_count or os.cpu_count() or 1
+		self.max_procs = max_procs if max_procs > 0 else max(1, cpus // 2)
+		self.threads_per_job = max(1, cpus // self.max_procs)
+		self.timeout_s = timeout_s
+		self._slots = threading.BoundedSemaphore(self.max_procs)
+
+	def run(
+		self,
+		cmd: List[str],
+		*,
+		duration_ms: int = 0,
+		label: str = "",
+		on_progress: Optional[ProgressCallback] = None,
+		timeout_s: Optional[float] = None,
+	) -> FFmpegResult:
+		"""占用一个槽位执行命令；槽位满时阻塞等待。"""
+		cmd = with_progress(with_threads(cmd, self.threads_per_job))
+		timeout = self.timeout_s if timeout_s is None else timeout_s
+		with self._slots:
+			return self._execute(cmd, duration_ms, label, on_progress, timeout)
+
+	def _execute(
+		self,
+		cmd: List[str],
+		duration_ms: int,
+		label: str,
+		on_progress: Optional[ProgressCallback],
+		timeout_s: float,
+	) -> FFmpegResult:
+		t0 = time.monotonic()
+		proc = subprocess.Popen(
+			cmd,
+			stdin=subprocess.DEVNULL,
+			stdout=subprocess.PIPE,
+			stderr=subprocess.PIPE,
+			text=True,
+			encoding="utf-8",
+			errors="replace",
+		)
+		tail: deque = deque(maxlen=STDERR_TAIL_LINES)
+
+		def read_stderr() -> None:
+			for line in proc.stderr:
+				tail.append(line)
+
+		def read_stdout() -> None:
+			state: Dict[str, str] = {}
+			for line in proc.stdout:
+				status = parse_progress_line(line, state)
+				if status is not None and on_progress is not None:
+					on_progress(FFmpegProgress(
+						label=label,
+						out_ms=progress_out_ms(state),
+						duration_ms=duration_ms,
+						elapsed_s=time.monotonic() - t0,
+						done=status == "end",
+					))
+
+		readers = [threading.Thread(target=read_stderr, daemon=True), threading.Thread(target=read_stdout, daemon=True)]
+		for t in readers:
+			t.start()
+		timed_out = False
+		try:
+			proc.wait(timeout=timeout_s if timeout_s and timeout_s > 0 else None)
+		except subprocess.TimeoutExpired:
+			timed_out = True
+			proc.kill()
+			proc.wait()
+		for t in readers:
+			t.join(timeout=5)
+		return FFmpegResult(
+			returncode=proc.returncode,
+			elapsed_s=time.monotonic() - t0,
+			stderr_tail="".join(tail),
+			timed_out=timed_out,
+		)
+
+
+class ProgressBoard:
+	"""
+	汇总多个 job 的进度：总完成比例 + 按整体速度估算 ETA，节流打印。
+	total_ms 为所有 job 的媒体时长之和。
+	"""
+
+	def __init__(self, total_ms: int, prefix: str = "[render]", interval_s: float = 2.0, printer: Callable[[str], None] = print):
+		self.total_ms = max(1, total_ms)
+		self.prefix = prefix
+		self.interval_s = interval_s
+		self.printer = printer
+		self._done_ms: Dict[str, int] = {}
+		self._finished = 0
+		self._t0 = time.monotonic()
+		self._last = 0.0
+		self._lock = threading.Lock()
+
+	def update(self, p: FFmpegProgress) -> None:
+		with self._lock:
+			self._done_ms[p.label] = p.duration_ms if p.done and p.duration_ms else p.out_ms
+			if p.done and p.duration_ms:
+				self._finished += 1
+			now = time.monotonic()
+			all_done = sum(self._done_ms.values()) >= self.total_ms
+			if now - self._last < self.interval_s and not all_done:
+				return
+			self._last = now
+			self.printer(self.summary())
+
+	def summary(self) -> str:
+		done = min(sum(self._done_ms.values()), self.total_ms)
+		elapsed = time.monotonic() - self._t0
+		pct = done * 100 // self.total_ms
+		eta = ""
+		if 0 < done < self.total_ms and elapsed > 0:
+			eta = f" ETA {(self.total_ms - done) / (done / elapsed) / 1000:.0f}s"
+		return f"{self.prefix} {pct}% ({self._finished} jobs done){eta}"
+
+
+_POOL: Optional[FFmpegPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_ffmpeg_pool(max_procs: int = 0, timeout_s: float = DEFAULT_TIMEOUT_S) -> FFmpegPool:
+	"""进程内共享池：首次调用的参数生效，后续调用复用同一并发上限。"""
+	global _POOL
+	with _POOL_LOCK:
+		if _POOL is None:
+			_POOL = FFmpegPool(max_procs=max_procs, timeout_s=timeout_s)
+		return _POOL
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+novel2comic/core/hedging.py
+
+请求对冲（hedged requests）：压低 provider 长尾延迟。
+- 每个 endpoint 维护最近 window 次成功请求的耗时，取 quantile 分位数（默认 p95）作为对冲阈值
+- 请求超过阈值仍未返回时，再发一份副本，取先成功返回的一方；另一方结果丢弃
+  （同步 httpx 无法中途打断，落后的一方在后台线程跑完后释放连接，不阻塞调用方）
+- 成功 = 无异常且 ok(结果) 为真（默认 is_success：带 status_code 的响应要求 2xx），
+  先返回的 429/5xx 不算赢，继续等另一份；失败请求的耗时不进入延迟样本
+- 预算：对冲副本数不超过总请求数 × budget；样本数不足 min_samples 时不对冲
+- 两份都失败时返回 / 抛出原请求的结果
+
+只对幂等、无副作用的整包请求使用（/chat/completions、/audio/speech）；流式回调路径不对冲。
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class HedgeConfig:
+	quantile: float = 0.95
+	min_samples: int = 20
+	window: int = 200
+	min_delay_s: float = 2.0
+	max_delay_s: float = 30.0
+	budget: float = 0.05
+	max_workers: int = 64
+
+
+def is_success(out: Any) -> bool:
+	"""默认成功判定：带 status_code 的响应（httpx.Response）要求 2xx，其他结果视为成功。"""
+	code = getattr(out, "status_code", None)
+	return code is None or 200 <= code < 300
+
+
+def quantile(values: Any, q: float) -> float:
+	"""最近邻分位数（values 非空）。"""
+	ordered = sorted(values)
+	idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+	return ordered[idx]
+
+
+class Hedger:
+	"""线程安全；一个 client 一个实例，各 endpoint 分别统计延迟。"""
+
+	def __init__(self, cfg: Optional[HedgeConfig] = None):
+		self.cfg = cfg or HedgeConfig()
+		self._lock = threading.Lock()
+		self._latency: Dict[str, Deque[float]] = {}
+		self.calls = 0
+		self.hedged = 0
+		self.hedge_wins = 0
+		self._pool = ThreadPoolExecutor(max_workers=self.cfg.max_workers, thread_name_prefix="hedge")
+
+	def close(self) -> None:
+		self._pool.shutdown(wait=False)
+
+	def record(self, endpoint: str, latency_s: float) -> None:
+		with self._lock:
+			window = self._latency.setdefault(endpoint, deque(maxlen=max(1, self.cfg.window)))
+			window.append(latency_s)
+
+	def threshold(self, endpoint: str) -> Optional[float]:
+		"""当前对冲阈值（秒）；样本不足返回 None。"""
+		with self._lock:
+			window = self._latency.get(endpoint)
+			if not window or len(window) < self.cfg.min_samples:
+				return None
+			q = quantile(window, self.cfg.quantile)
+		return min(self.cfg.max_delay_s, max(self.cfg.min_delay_s, q))
+
+	def _take_budget(self) -> bool:
+		with self._lock:
+			if self.hedged + 1 > self.calls * self.cfg.budget:
+				return False
+			self.hedged += 1
+			return True
+
+	def _timed(self, endpoint: str, fn: Callable[[], T], ok: Callable[[Any], bool]) -> T:
+		"""执行 fn，只有成功的结果记入延迟样本。"""
+		t0 = time.perf_counter()
+		out = fn()
+		if ok(out):
+			self.record(endpoint, time.perf_counter() - t0)
+		return out
+
+	def _submit(self, endpoint: str, fn: Callable[[], T], ok: Callable[[Any], bool]) -> "Future[T]":
+		return self._pool.submit(self._timed, endpoint, fn, ok)
+
+	def call(
+		self,
+		endpoint: str,
+		fn: Callable[[], T],
+		on_hedge: Optional[Callable[[], None]] = None,
+		ok: Callable[[Any], bool] = is_success,
+	) -> T:
+		"""
+		执行 fn（可能执行两次）。on_hedge 在发出副本前调用（如计入限流器）；ok 判定结果是否成功。
+		"""
+		with self._lock:
+			self.calls += 1
+		delay = self.threshold(endpoint)
+		if delay is None:
+			# 样本不足：在调用方线程直接执行，只记录成功耗时
+			return self._timed(endpoint, fn, ok)
+		primary = self._submit(endpoint, fn, ok)
+		done, _ = wait([primary], timeout=delay)
+		if done or not self._take_budget():
+			return primary.result()
+
+		if on_hedge is not None:
+			on_hedge()
+		backup = self._submit(endpoint, fn, ok)
+		pending = {primary, backup}
+		while pending:
+			done, pending = wait(pending, return_when=FIRST_COMPLETED)
+			for fut in done:
+				if fut.exception() is None and ok(fut.result()):
+					if fut is backup:
+						with self._lock:
+							self.hedge_wins += 1
+					for other in pending:
+						other.cancel()
+					return fut.result()
+		return primary.result()
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			out: Dict[str, Any] = {"calls": self.calls, "hedged": self.hedged, "hedge_wins": self.hedge_wins}
+		out["threshold_s"] = {ep: self.threshold(ep) for ep in list(self._latency)}
+		return out
+
+
+def load_hedger(cfg: Optional[Dict[str, Any]]) -> Optional[Hedger]:
+	"""
+	configs/siliconflow.yaml 的 hedge 段；未启用返回 None。env HEDGE_ENABLED=1/0 优先于 YAML。
+	"""
+	cfg = cfg or {}
+	enabled_env = os.environ.get("HEDGE_ENABLED", "").strip().lower()
+	enabled = enabled_env in ("1", "true", "yes") if enabled_env else bool(cfg.get("enabled", False))
+	if not enabled:
+		return None
+	d = HedgeConfig()
+	return Hedger(HedgeConfig(
+		quantile=float(cfg.get("quantile", d.quantile)),
+		min_samples=int(cfg.get("min_samples", d.min_samples)),
+		window=int(cfg.get("window", d.window)),
+		min_delay_s=float(cfg.get("min_delay_s", d.min_delay_s)),
+		max_delay_s=float(cfg.get("max_delay_s", d.max_delay_s)),
+		budget=float(cfg.get("budget", d.budget)),
+	))
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+novel2comic/core/hls.py
+
+HLS（fMP4 分片）输出：一 shot 一分片，分片边界即 shot 边界。
+- 每个分片由 shot clip（视频拷贝）+ chapter.wav 对应区间（aac）封装为 fragmented mp4，
+  再拆成 <shot_id>_init.mp4（ftyp+moov）与 <shot_id>.m4s（moof/mdat）
+- 每个分片自带 EXT-X-MAP，分片间加 EXT-X-DISCONTINUITY（时间戳各自从 0 开始，帧率可不同）
+- HlsPlaylistWriter 按顺序增量写 playlist（EVENT），前缀分片完成即可发布；全部完成后写 ENDLIST
+
+纯函数 + 文件写入，不执行 ffmpeg。
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+PLAYLIST_NAME = "playlist.m3u8"
+
+# fMP4 初始化段包含的顶层 box
+_INIT_BOXES = (b"ftyp", b"moov")
+# 分片文件里丢弃的尾部索引
+_DROP_BOXES = (b"mfra",)
+
+
+@dataclass
+class HlsSegment:
+	"""playlist 中的一项：init/media 为相对 playlist 的文件名，duration_s 为分片时长。"""
+	init: str
+	media: str
+	duration_s: float
+
+
+def iter_boxes(data: bytes) -> List[Tuple[bytes, int, int]]:
+	"""解析 MP4 顶层 box：返回 [(type, offset, size)]。"""
+	boxes = []
+	pos = 0
+	n = len(data)
+	while pos + 8 <= n:
+		size, btype = struct.unpack(">I4s", data[pos:pos + 8])
+		if size == 1:
+			if pos + 16 > n:
+				break
+			size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+		elif size == 0:
+			size = n - pos
+		if size < 8 or pos + size > n:
+			raise ValueError(f"truncated mp4 box {btype!r} at {pos}")
+		boxes.append((btype, pos, size))
+		pos += size
+	return boxes
+
+
+def split_fmp4(data: bytes) -> Tuple[bytes, bytes]:
+	"""fragmented mp4 -> (init 段, media 段)。没有 moof 时视为非分片文件，报错。"""
+	init = bytearray()
+	media = bytearray()
+	has_moof = False
+	for btype, off, size in iter_boxes(data):
+		chunk = data[off:off + size]
+		if btype in _INIT_BOXES:
+			init += chunk
+		elif btype in _DROP_BOXES:
+			continue
+		else:
+			has_moof = has_moof or btype == b"moof"
+			media += chunk
+	if not init or not has_moof:
+		raise ValueError("not a fragmented mp4 (missing moov or moof)")
+	return bytes(init), bytes(media)
+
+
+def build_segment_cmd(
+	clip_path: Path,
+	audio_path: Path,
+	start_s: float,
+	duration_s: float,
+	out_path: Path,
+	audio_bitrate: str,
+) -> List[str]:
+	"""clip 视频拷贝 + 章节音频区间（样本精确 -ss）-> fragmented mp4。"""
+	return [
+		"ffmpeg", "-y", "-v", "error",
+		"-i", str(clip_path),
+		"-ss", f"{start_s:.6f}", "-t", f"{duration_s:.6f}", "-i", str(audio_path),
+		"-map", "0:v", "-map", "1:a",
+		"-c:v", "copy",
+		"-c:a", "aac", "-b:a", audio_bitrate,
+		"-movflags", "frag_keyframe+empty_moov+default_base_moof",
+		"-f", "mp4",
+		str(out_path),
+	]
+
+
+def render_playlist(segments: Sequence[HlsSegment], target_duration: int, ended: bool) -> str:
+	lines = [
+		"#EXTM3U",
+		"#EXT-X-VERSION:7",
+		f"#EXT-X-TARGETDURATION:{target_duration}",
+		"#EXT-X-MEDIA-SEQUENCE:0",
+		"#EXT-X-PLAYLIST-TYPE:" + ("VOD" if ended else "EVENT"),
+		"#EXT-X-INDEPENDENT-SEGMENTS",
+	]
+	for i, seg in enumerate(segments):
+		if i > 0:
+			lines.append("#EXT-X-DISCONTINUITY")
+		lines.append(f'#EXT-X-MAP:URI="{seg.init}"')
+		lines.append(f"#EXTINF:{seg.duration_s:.3f},")
+		lines.append(seg.media)
+	if ended:
+		lines.append("#EXT-X-ENDLIST")
+	return "\n".join(lines) + "\n"
+
+
+class HlsPlaylistWriter:
+	"""
+	segments 为完整计划（按播放顺序）；mark_done(i) 后重写 playlist，只包含已完成的连续前缀。
+	写入为临时文件 + replace，读端不会看到半截 playlist。线程安全。
+	"""
+
+	def __init__(self, path: Path, segments: Sequence[HlsSegment]):
+		self.path = path
+		self.segments = list(segments)
+		self.target_duration = max((math.ceil(s.duration_s) for s in self.segments), default=1)
+		self._done = [False] * len(self.segments)
+		self._published = 0
+		self._lock = threading.Lock()
+
+	@property
+	def published(self) -> int:
+		return self._published
+
+	def mark_done(self, index: int) -> None:
+		with self._lock:
+			self._done[index] = True
+			n = self._published
+			while n < len(self._done) and self._done[n]:
+				n += 1
+			if n == self._published:
+				return
+			self._published = n
+			self._write(ended=False)
+
+	def finish(self) -> None:
+		with self._lock:
+			if self._published != len(self.segments):
+				raise RuntimeError(f"HLS incomplete: {self._published}/{len(self.segments)} segments")
+			self._write(ended=True)
+
+	def _write(self, ended: bool) -> None:
+		text = render_playlist(self.segments[: self._published], self.target_duration, ended)
+		tmp = self.path.with_name(self.path.name + ".tmp")
+		tmp.write_text(text, encoding="utf-8")
+		tmp.replace(self.path)
+
+
+def write_segment_files(fmp4_path: Path, init_path: Path, media_path: Path) -> None:
+	"""把 ffmpeg 输出的 fragmented mp4 拆成 init/media 两个文件，并删除中间文件。"""
+	init, media = split_fmp4(fmp4_path.read_bytes())
+	init_path.write_bytes(init)
+	media_path.write_bytes(media)
+	fmp4_path.unlink(missing_ok=True)
+
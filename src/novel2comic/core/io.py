@@ -116,11 +116,15 @@ class ChapterPaths:
 	audio_dir: Path
 	audio_shots_dir: Path
 	audio_chapter_wav: Path
+	audio_timeline_json: Path
 	subtitles_dir: Path
 	subtitles_srt: Path
 	subtitles_ass: Path
+	subtitles_align_dir: Path
 	video_dir: Path
 	video_preview_mp4: Path
+	video_clips_dir: Path
+	video_hls_dir: Path
 
 	# Director Review 产出
 	director_dir: Path
@@ -192,11 +196,15 @@ def chapter_paths(chapter_dir: str | Path) -> ChapterPaths:
 		audio_dir=root / "audio",
 		audio_shots_dir=root / "audio" / "shots",
 		audio_chapter_wav=root / "audio" / "chapter.wav",
+		audio_timeline_json=root / "audio" / "timeline.json",
 		subtitles_dir=root / "subtitles",
 		subtitles_srt=root / "subtitles" / "chapter.srt",
 		subtitles_ass=root / "subtitles" / "chapter.ass",
+		subtitles_align_dir=root / "subtitles" / "align",
 		video_dir=root / "video",
 		video_preview_mp4=root / "video" / "preview.mp4",
+		video_clips_dir=root / "video" / "clips",
+		video_hls_dir=root / "video" / "hls",
 		director_dir=root / "director",
 		director_review_json=root / "director" / "director_review.json",
 		shotscript_directed=root / "shotscript.directed.json",
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+novel2comic/core/json_repair.py
+
+LLM / VLM 输出的容错 JSON 解析：能本地修好的就不再重新请求。
+- 去掉 ```json 代码块围栏、JSON 前后的说明文字
+- 修常见语法错误：尾逗号、Python 字面量（True/False/None）、字符串内裸换行
+- 截断修复：流/输出在中途断开时，回退到最后一个完整元素处并补齐括号（保留最长有效前缀）；
+  数组里只保留完整闭合的对象元素，不产出缺字段的半截元素
+
+loads_tolerant 先尝试严格 json.loads，失败才走修复；修复后仍不合法则抛 ValueError。
+只有外观修复（围栏、说明文字、尾逗号、字面量、裸换行）算完整结果；截断修复得到的是有效前缀，
+非流式调用方应传 allow_truncated=False（抛 TruncatedJSONError，不当作成功、不写缓存）。
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*([\s\S]*?)(?:```|$)")
+_WORD_RE = re.compile(r"[A-Za-z_]+")
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def strip_fences(text: str) -> str:
+	"""取代码块内容（允许缺少结尾围栏）；否则从第一个 { 或 [ 开始。"""
+	text = (text or "").strip()
+	m = _FENCE_RE.search(text)
+	if m:
+		text = m.group(1).strip()
+	starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+	return text[min(starts):] if starts else text
+
+
+def _next_non_ws(text: str, i: int) -> str:
+	while i < len(text) and text[i].isspace():
+		i += 1
+	return text[i] if i < len(text) else ""
+
+
+def _cut_ok(stack: List[str]) -> bool:
+	"""数组元素对象尚未闭合时不能作为截断点。"""
+	in_array = False
+	for c in stack:
+		if c == "[":
+			in_array = True
+		elif in_array:
+			return False
+	return True
+
+
+class TruncatedJSONError(ValueError):
+	"""输出在中途被截断，只能恢复出有效前缀。"""
+
+
+def repair_json(text: str) -> Optional[str]:
+	"""
+	单遍扫描修复。返回修复后的 JSON 文本；完全无法恢复（没有任何完整值）时返回 None。
+	顶层值闭合后的多余内容直接丢弃。
+	"""
+	return _repair(text)[0]
+
+
+def _repair(text: str) -> Tuple[Optional[str], bool]:
+	"""返回 (修复后的 JSON 文本或 None, 是否为截断修复)。"""
+	out: List[str] = []
+	stack: List[str] = []
+	# 截断回退点：(输出长度, 当时的容器栈)，保证 out[:n] + 补齐括号 是合法 JSON
+	cut: Optional[Tuple[int, List[str]]] = None
+
+	def mark(length: int) -> None:
+		nonlocal cut
+		if _cut_ok(stack):
+			cut = (length, list(stack))
+
+	in_str = False
+	esc = False
+	i = 0
+	n = len(text)
+	while i < n:
+		ch = text[i]
+		if in_str:
+			if esc:
+				esc = False
+				out.append(ch)
+			elif ch == "\\":
+				esc = True
+				out.append(ch)
+			elif ch == '"':
+				in_str = False
+				out.append(ch)
+			elif ch == "\n":
+				out.append("\\n")
+			elif ch == "\r":
+				out.append("\\r")
+			elif ch == "\t":
+				out.append("\\t")
+			else:
+				out.append(ch)
+			i += 1
+			continue
+
+		if ch == '"':
+			in_str = True
+			out.append(ch)
+		elif ch in "{[":
+			stack.append(ch)
+			out.append(ch)
+			mark(len(out))
+		elif ch in "}]":
+			if not stack:
+				break
+			# 括号不匹配时按实际打开的容器闭合
+			out.append(_CLOSERS[stack.pop()])
+			mark(len(out))
+			if not stack:
+				break
+		elif ch == ",":
+			if _next_non_ws(text, i + 1) in ("}", "]", ""):
+				i += 1
+				continue
+			mark(len(out))
+			out.append(ch)
+		elif ch.isascii() and (ch.isalpha() or ch == "_"):
+			word = _WORD_RE.match(text, i).group(0)
+			out.append(_LITERALS.get(word, word))
+			i += len(word)
+			continue
+		else:
+			out.append(ch)
+		i += 1
+
+	if not stack and not in_str:
+		return ("".join(out).strip() or None), False
+	# 截断在对象/数组末尾一个完整标量之后（如 {"a": 1）：直接补齐括号即可
+	if not in_str and _cut_ok(stack):
+		candidate = "".join(out).rstrip() + "".join(_CLOSERS[c] for c in reversed(stack))
+		try:
+			json.loads(candidate)
+			return candidate, True
+		except ValueError:
+			pass
+	if cut is None:
+		return None, True
+	length, open_stack = cut
+	body = "".join(out[:length]).rstrip()
+	return body + "".join(_CLOSERS[c] for c in reversed(open_stack)), True
+
+
+def loads_tolerant(text: str, allow_truncated: bool = True) -> Tuple[Any, bool]:
+	"""
+	返回 (对象, 是否经过修复)。
+	allow_truncated=False 时输出被截断（只能恢复前缀）抛 TruncatedJSONError。
+	"""
+	try:
+		return json.loads(text), False
+	except (TypeError, ValueError):
+		pass
+	stripped = strip_fences(text)
+	try:
+		return json.loads(stripped), True
+	except ValueError:
+		pass
+	repaired, truncated = _repair(stripped)
+	if repaired is not None:
+		try:
+			obj = json.loads(repaired)
+		except ValueError:
+			obj = None
+		else:
+			if truncated and not allow_truncated:
+				raise TruncatedJSONError("JSON output truncated")
+			return obj, True
+	if truncated and not allow_truncated:
+		raise TruncatedJSONError("JSON output truncated")
+	raise ValueError("unrecoverable JSON")
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+novel2comic/core/json_stream.py
+
+流式 JSON 数组元素提取：LLM 以 SSE 分块输出 JSON 时，逐块喂入，
+目标数组（如 patch.shots / shots / ops）中每个对象元素一闭合就解析出来交给调用方。
+- 只跟踪字符串 / 转义 / 容器栈与当前 key，不做完整 JSON 校验（完整性由最终 json.loads 判断）
+- 流被截断时，已闭合的元素（有效前缀）仍然可用
+
+纯函数 + 状态机，不做网络 IO。
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+
+@dataclass
+class _Frame:
+	kind: str  # "{" | "["
+	key: Optional[str] = None
+	expect_key: bool = False
+
+
+@dataclass
+class JsonArrayStream:
+	"""
+	path：目标数组在顶层对象中的键路径，如 ("patch", "shots")。
+	feed(chunk) 返回本次新闭合的元素列表；items 为累计的全部元素。
+	"""
+	path: Sequence[str]
+	text: str = ""
+	items: List[Any] = field(default_factory=list)
+	_pos: int = 0
+	_stack: List[_Frame] = field(default_factory=list)
+	_in_str: bool = False
+	_esc: bool = False
+	_str_start: int = 0
+	_elem_start: Optional[int] = None
+
+	def _at_target(self) -> bool:
+		"""栈顶是目标数组：其上各层均为对象且 key 依次等于 path。"""
+		if len(self._stack) != len(self.path) + 1 or self._stack[-1].kind != "[":
+			return False
+		return all(f.kind == "{" and f.key == k for f, k in zip(self._stack, self.path))
+
+	def feed(self, chunk: str) -> List[Any]:
+		self.text += chunk
+		new_items: List[Any] = []
+		text = self.text
+		i = self._pos
+		while i < len(text):
+			ch = text[i]
+			if self._in_str:
+				if self._esc:
+					self._esc = False
+				elif ch == "\\":
+					self._esc = True
+				elif ch == '"':
+					self._in_str = False
+					top = self._stack[-1] if self._stack else None
+					if top is not None and top.kind == "{" and top.expect_key:
+						try:
+							top.key = json.loads(text[self._str_start:i + 1])
+						except ValueError:
+							top.key = text[self._str_start + 1:i]
+				i += 1
+				continue
+
+			if ch == '"':
+				self._in_str = True
+				self._str_start = i
+			elif ch in "{[":
+				if self._elem_start is None and self._at_target():
+					self._elem_start = i
+				self._stack.append(_Frame(kind=ch, expect_key=(ch == "{")))
+			elif ch in "}]":
+				if self._stack:
+					self._stack.pop()
+				if self._elem_start is not None and self._at_target():
+					try:
+						item = json.loads(text[self._elem_start:i + 1])
+					except ValueError:
+						item = None
+					self._elem_start = None
+					if item is not None:
+						self.items.append(item)
+						new_items.append(item)
+			elif ch == ":":
+				if self._stack and self._stack[-1].kind == "{":
+					self._stack[-1].expect_key = False
+			elif ch == ",":
+				if self._stack and self._stack[-1].kind == "{":
+					self._stack[-1].expect_key = True
+			i += 1
+		self._pos = i
+		return new_items
+
+	@property
+	def complete(self) -> bool:
+		"""顶层容器已闭合（不代表整体 JSON 合法）。"""
+		return bool(self.text.strip()) and not self._stack and not self._in_str
+
+	def salvage(self) -> Dict[str, Any]:
+		"""截断时的有效前缀：按 path 嵌套放入已闭合元素。"""
+		out: Dict[str, Any] = {}
+		cur = out
+		for k in self.path[:-1]:
+			cur = cur.setdefault(k, {})
+		cur[self.path[-1]] = list(self.items)
+		return out
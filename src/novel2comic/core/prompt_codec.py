@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+novel2comic/core/prompt_codec.py
+
+LLM prompt 的紧凑编码（减少输入 token）与 token 估算。
+- IdCodec：长 id（ch_0001_shot_0042）<-> 本地短 id（0,1,2...），响应回来后映射回原 id
+- table：同构对象数组 -> {"cols": [...], "rows": [[...]]}，键名只出现一次
+- dumps：无空格分隔符的 JSON
+- estimate_tokens：粗估 token 数（CJK 约 1 字 1 token，其余约 4 字符 1 token），用于记录每次调用的 prompt 规模
+
+纯函数，不调用模型。
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+_CJK_RE = re.compile(r"[　-〿㐀-䶿一-鿿＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+	"""粗估 token 数：CJK 字符与全角标点各算 1，其余字符按 4 个算 1（向上取整）。"""
+	if not text:
+		return 0
+	cjk = len(_CJK_RE.findall(text))
+	other = len(text) - cjk
+	return cjk + (other + 3) // 4
+
+
+def dumps(obj: Any) -> str:
+	return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def table(cols: Sequence[str], rows: Sequence[Sequence[Any]]) -> Dict[str, Any]:
+	return {"cols": list(cols), "rows": [list(r) for r in rows]}
+
+
+class IdCodec:
+	"""按出现顺序给原 id 分配本地整数 id；decode 对未知本地 id 返回 None。"""
+
+	def __init__(self, ids: Sequence[str]):
+		self.ids: List[str] = list(ids)
+		self._local = {sid: i for i, sid in enumerate(self.ids)}
+
+	def encode(self, sid: str) -> int:
+		return self._local[sid]
+
+	def decode(self, local: Any) -> Optional[str]:
+		if isinstance(local, bool):
+			return None
+		if isinstance(local, str) and local.strip().isdigit():
+			local = int(local)
+		if isinstance(local, int) and 0 <= local < len(self.ids):
+			return self.ids[local]
+		return None
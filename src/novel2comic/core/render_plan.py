@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+novel2comic/core/render_plan.py
+
+Render 规划：把章节切成“一 shot 一 clip”，并生成 ffmpeg 命令。
+- clip 时长取 shot 在 chapter.wav 中的区间（含其后 gap），按帧号累计取整，不累积漂移
+- 画面：shot 图片单帧缩放裁切到输出尺寸一次，再按 motion 做 zoompan（或静止 loop）
+- 字幕：burn 时 chapter.ass 按 clip 区间切出、平移到 clip 本地时间后烧录；
+  soft 时 clip 不含字幕，拼接时作为字幕流封装（字幕改动只需拷贝重封装）
+- 拼接：concat demuxer + -c:v copy（所有 clip 编码参数一致），音频直接取 chapter.wav
+- 缓存：clip_cache_key 由 clip 的全部输入派生，key 不变的 clip 无需重编码
+
+纯函数，不执行 ffmpeg。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Collection, Dict, List, Optional, Sequence, Tuple
+
+# clip 滤镜链 / 命令结构变更时递增，使旧缓存失效
+CLIP_PLAN_VERSION = "clip.v2"
+
+# 无图片时的背景色（与旧版纯色渲染一致）
+BACKGROUND_COLOR = "0x1a1a2e"
+
+MOTION_TYPES = ("static", "zoom_in", "zoom_out", "pan_left", "pan_right", "pan_up", "pan_down")
+DEFAULT_MOTION_STRENGTH = 0.08
+
+AssEvent = Tuple[int, int, str]
+
+_ASS_TIME_RE = re.compile(r"(\d+):(\d{2}):(\d{2})\.(\d{2})")
+
+
+@dataclass
+class RenderSettings:
+	"""所有 clip 共用的编码参数（concat 拷贝要求一致）。"""
+	width: int = 1920
+	height: int = 1080
+	fps: int = 24
+	preset: str = "fast"
+	crf: int = 23
+	audio_bitrate: str = "128k"
+
+
+@dataclass
+class ClipSpec:
+	"""
+	一个 shot clip。start_ms/end_ms 为章节绝对时间；frames 为该 clip 在 fps 下的精确帧数。
+	fps=0 表示使用 RenderSettings.fps（静止镜头降帧时为其整除值）。
+	"""
+	shot_id: str
+	index: int
+	start_ms: int
+	end_ms: int
+	frames: int
+	fps: int = 0
+	image: Optional[Path] = None
+	image_sha: Optional[str] = None
+	ass_header_sha: Optional[str] = None
+	motion: Dict[str, Any] = field(default_factory=dict)
+	events: List[AssEvent] = field(default_factory=list)
+
+	@property
+	def duration_ms(self) -> int:
+		return self.end_ms - self.start_ms
+
+
+def normalize_motion(motion: Any) -> Dict[str, Any]:
+	"""
+	shot.motion 归一化为 {"type", "strength"}。
+	支持字符串（"zoom_in"）或 dict（{"type": "pan_left", "strength": 0.1}）；未知类型视为 static。
+	"""
+	if isinstance(motion, str):
+		motion = {"type": motion}
+	if not isinstance(motion, dict):
+		motion = {}
+	mtype = str(motion.get("type") or "static").strip().lower()
+	if mtype not in MOTION_TYPES:
+		mtype = "static"
+	try:
+		strength = float(motion.get("strength", DEFAULT_MOTION_STRENGTH))
+	except (TypeError, ValueError):
+		strength = DEFAULT_MOTION_STRENGTH
+	return {"type": mtype, "strength": min(max(strength, 0.0), 0.5)}
+
+
+def _static_divisor(fps: int, static_fps: int) -> int:
+	"""静止镜头降帧倍数 k（fps = static_fps * k）；static_fps 不整除 fps 时不降帧。"""
+	if static_fps <= 0 or static_fps >= fps or fps % static_fps != 0:
+		return 1
+	return fps // static_fps
+
+
+def plan_clips(
+	starts: Sequence[Tuple[str, int]],
+	total_ms: int,
+	fps: int,
+	static_ids: Collection[str] = (),
+	static_fps: int = 0,
+) -> List[ClipSpec]:
+	"""
+	starts：按时间顺序的 (shot_id, start_ms)。每个 clip 覆盖到下一个 shot 起点，最后一个到 total_ms。
+	首个 clip 从 0 开始，保证视频与 chapter.wav 等长。
+
+	clip 边界先取整到全局帧号（相邻 clip 共用边界，不累积漂移）。
+	static_ids 中的镜头以 static_fps 编码：其边界再吸附到 k 帧网格（k = fps / static_fps），
+	帧数恰为整数个低帧率帧，总时长不变；边界位移 < k/2 帧，落在 shot 间停顿内。
+	"""
+	n = len(starts)
+	if n == 0:
+		return []
+	k = _static_divisor(fps, static_fps)
+	bounds = [0] + [round(int(s) * fps / 1000) for _, s in starts[1:]] + [round(int(total_ms) * fps / 1000)]
+	static = [k > 1 and sid in static_ids for sid, _ in starts]
+	if k > 1:
+		for i in range(1, n + 1):
+			if static[i - 1] or (i < n and static[i]):
+				# 末尾向上取整，视频不短于音频（concat 时 -shortest 截断）
+				bounds[i] = -(-bounds[i] // k) * k if i == n else round(bounds[i] / k) * k
+
+	clips = []
+	for i, (shot_id, start) in enumerate(starts):
+		frames = bounds[i + 1] - bounds[i]
+		if frames <= 0:
+			continue
+		start = 0 if i == 0 else int(start)
+		end = int(starts[i + 1][1]) if i + 1 < n else int(total_ms)
+		clip_fps = fps // k if static[i] else fps
+		clips.append(ClipSpec(
+			shot_id=shot_id,
+			index=len(clips),
+			start_ms=start,
+			end_ms=end,
+			frames=frames // k if static[i] else frames,
+			fps=clip_fps,
+		))
+	return clips
+
+
+def _parse_ass_time(s: str) -> int:
+	m = _ASS_TIME_RE.fullmatch(s.strip())
+	if not m:
+		raise ValueError(f"bad ASS time: {s}")
+	h, mi, sec, cs = (int(x) for x in m.groups())
+	return ((h * 60 + mi) * 60 + sec) * 1000 + cs * 10
+
+
+def _format_ass_time(ms: int) -> str:
+	h = ms // 3600000
+	m = (ms % 3600000) // 60000
+	s = (ms % 60000) // 1000
+	cs = (ms % 1000) // 10
+	return f"{h:01d}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def split_ass(text: str) -> Tuple[str, List[AssEvent]]:
+	"""
+	拆分 ASS：返回 (header, events)。header 为 Dialogue 行之前的全部内容（含 Format 行），
+	events 为 (start_ms, end_ms, text)，text 保持原样（含 \\N）。
+	"""
+	header_lines = []
+	events = []
+	for line in text.splitlines():
+		if line.startswith("Dialogue:"):
+			parts = line[len("Dialogue:"):].split(",", 9)
+			if len(parts) == 10:
+				events.append((_parse_ass_time(parts[1]), _parse_ass_time(parts[2]), parts[9]))
+		elif not events:
+			header_lines.append(line)
+	return "\n".join(header_lines).rstrip("\n") + "\n", events
+
+
+def clip_events(events: Sequence[AssEvent], start_ms: int, end_ms: int) -> List[AssEvent]:
+	"""取与 [start_ms, end_ms) 相交的字幕，截断到区间内并平移为 clip 本地时间。"""
+	out = []
+	for s, e, text in events:
+		if e <= start_ms or s >= end_ms:
+			continue
+		out.append((max(s, start_ms) - start_ms, min(e, end_ms) - start_ms, text))
+	return out
+
+
+def render_ass(header: str, events: Sequence[AssEvent]) -> str:
+	lines = [header]
+	for s, e, text in events:
+		lines.append(f"Dialogue: 0,{_format_ass_time(s)},{_format_ass_time(e)},Default,,0,0,0,,{text}")
+	return "\n".join(lines)
+
+
+def file_sha256(path: Path) -> str:
+	h = hashlib.sha256()
+	with open(path, "rb") as f:
+		for chunk in iter(lambda: f.read(1 << 20), b""):
+			h.update(chunk)
+	return h.hexdigest()
+
+
+def text_sha256(text: str) -> str:
+	return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def clip_cache_key(clip: ClipSpec, settings: RenderSettings) -> str:
+	"""
+	clip 输入指纹：图片内容哈希、帧数（音频区间时长）、本地字幕及 ASS 头部（样式）、motion、视频编码参数。
+	不含章节绝对起点——前面 shot 时长变化只平移后续 clip，不触发重编码；
+	不含 audio_bitrate——clip 只有视频流。
+	"""
+	video_settings = asdict(settings)
+	video_settings.pop("audio_bitrate", None)
+	payload = {
+		"v": CLIP_PLAN_VERSION,
+		"image": clip.image_sha or (file_sha256(clip.image) if clip.image is not None else None),
+		"frames": clip.frames,
+		"fps": clip.fps,
+		"events": [list(e) for e in clip.events],
+		"ass_header": clip.ass_header_sha,
+		"motion": clip.motion,
+		"settings": video_settings,
+	}
+	raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+	return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _filter_path(path: Path) -> str:
+	"""filtergraph 中的文件路径：正斜杠，冒号转义（兼容 Windows 盘符）。"""
+	return "'" + path.resolve().as_posix().replace(":", "\\:") + "'"
+
+
+def motion_filter(motion: Dict[str, Any], frames: int, settings: RenderSettings, fps: int = 0) -> str:
+	"""
+	输入为已缩放到输出尺寸的单帧，输出 frames 帧。
+	static 用 loop 复制帧；其余用 zoompan（d=frames，单帧展开为整段）。
+	"""
+	w, h = settings.width, settings.height
+	fps = fps or settings.fps
+	mtype = motion.get("type", "static")
+	s = motion.get("strength", DEFAULT_MOTION_STRENGTH)
+	if mtype == "static" or s <= 0 or frames <= 1:
+		return f"loop=loop={frames - 1}:size=1:start=0,setpts=N/({fps}*TB)"
+
+	n = frames - 1
+	cx = "iw/2-(iw/zoom/2)"
+	cy = "ih/2-(ih/zoom/2)"
+	if mtype == "zoom_in":
+		z, x, y = f"1+{s}*on/{n}", cx, cy
+	elif mtype == "zoom_out":
+		z, x, y = f"1+{s}-{s}*on/{n}", cx, cy
+	elif mtype == "pan_right":
+		z, x, y = f"1+{s}", f"(iw-iw/zoom)*on/{n}", cy
+	elif mtype == "pan_left":
+		z, x, y = f"1+{s}", f"(iw-iw/zoom)*(1-on/{n})", cy
+	elif mtype == "pan_down":
+		z, x, y = f"1+{s}", cx, f"(ih-ih/zoom)*on/{n}"
+	else:  # pan_up
+		z, x, y = f"1+{s}", cx, f"(ih-ih/zoom)*(1-on/{n})"
+	return f"zoompan=z='{z}':x='{x}':y='{y}':d={frames}:s={w}x{h}:fps={fps}"
+
+
+def build_clip_cmd(
+	clip: ClipSpec,
+	out_path: Path,
+	settings: RenderSettings,
+	*,
+	ass_path: Optional[Path] = None,
+	threads: int = 0,
+) -> List[str]:
+	"""
+	单个 clip 的 ffmpeg 命令（仅视频，音频在 concat 时统一加入）。
+	统一 video_track_timescale，使不同帧率的 clip 可拷贝拼接。
+	"""
+	w, h = settings.width, settings.height
+	fps = clip.fps or settings.fps
+	if clip.image is not None:
+		inputs = ["-i", str(clip.image)]
+		vf = (
+			f"scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},setsar=1,"
+			+ motion_filter(clip.motion, clip.frames, settings, fps)
+		)
+	else:
+		inputs = ["-f", "lavfi", "-i", f"color=c={BACKGROUND_COLOR}:s={w}x{h}:r={fps}"]
+		vf = "setsar=1"
+	if ass_path is not None:
+		vf += f",ass={_filter_path(ass_path)}"
+	vf += ",format=yuv420p"
+
+	cmd = ["ffmpeg", "-y", "-v", "error", *inputs, "-vf", vf, "-frames:v", str(clip.frames), "-r", str(fps), "-an"]
+	if threads > 0:
+		cmd += ["-threads", str(threads)]
+	cmd += [
+		"-c:v", "libx264", "-preset", settings.preset, "-crf", str(settings.crf),
+		"-video_track_timescale", "90000",
+		str(out_path),
+	]
+	return cmd
+
+
+def build_prescale_cmd(image: Path, out_path: Path, settings: RenderSettings) -> List[str]:
+	"""把 shot 图片缩放裁切到输出尺寸，落盘复用（clip 不必每次解码大图）。"""
+	w, h = settings.width, settings.height
+	return [
+		"ffmpeg", "-y", "-v", "error", "-i", str(image),
+		"-vf", f"scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h},setsar=1",
+		"-frames:v", "1", str(out_path),
+	]
+
+
+def write_concat_list(clip_paths: Sequence[Path], list_path: Path) -> None:
+	"""concat demuxer 列表文件（绝对路径，单引号转义）。"""
+	lines = []
+	for p in clip_paths:
+		escaped = p.resolve().as_posix().replace("'", "'\\''")
+		lines.append(f"file '{escaped}'")
+	list_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def subtitle_codec(container: str) -> str:
+	"""软字幕编码：MP4 只支持 mov_text；MKV 原样保留 ASS 样式。"""
+	return "copy" if container == "mkv" else "mov_text"
+
+
+def build_concat_cmd(
+	list_path: Path,
+	audio_path: Path,
+	out_path: Path,
+	settings: RenderSettings,
+	*,
+	subtitle_path: Optional[Path] = None,
+	container: str = "mp4",
+) -> List[str]:
+	"""
+	concat 拼接：视频流拷贝不重编码，音频由 chapter.wav 编码为 aac。
+	subtitle_path 非空时作为软字幕流封装（不烧录）：mp4 -> mov_text，mkv -> ASS 拷贝。
+	"""
+	cmd = [
+		"ffmpeg", "-y", "-v", "error",
+		"-f", "concat", "-safe", "0", "-i", str(list_path),
+		"-i", str(audio_path),
+	]
+	if subtitle_path is not None:
+		cmd += ["-i", str(subtitle_path)]
+	cmd += ["-map", "0:v", "-map", "1:a"]
+	if subtitle_path is not None:
+		cmd += ["-map", "2:s", "-c:s", subtitle_codec(container), "-metadata:s:s:0", "language=chi"]
+	cmd += ["-c:v", "copy", "-c:a", "aac", "-b:a", settings.audio_bitrate]
+	# 字幕流可能早于音视频结束，软字幕时不用 -shortest（clip 帧数已与音频等长）
+	if subtitle_path is None:
+		cmd.append("-shortest")
+	if container == "mp4":
+		cmd += ["-movflags", "+faststart"]
+	cmd.append(str(out_path))
+	return cmd
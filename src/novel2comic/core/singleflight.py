@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+novel2comic/core/singleflight.py
+
+相同请求的在途合并（singleflight）：同一 key 的请求已在进行中时，后来者等待这一次的结果，不再重复发送。
+- 与持久化缓存互补：缓存只覆盖首个响应落地之后，singleflight 覆盖首个响应返回之前的窗口
+- 领头调用的异常同样传给所有等待者（不缓存失败，下一次调用重新发起）
+- 进程内按 provider 分组（get_group），跨章节、跨 client 生效；统计由 record_singleflight 写入 manifest
+
+领头者与等待者拿到的是同一个对象：可变结果（dict 等）由每个调用方（包括领头者）各自拷贝后再使用，
+共享对象本身只读（等待者在 done.set() 之后才拷贝，领头者若原地修改会与之竞争）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def request_key(endpoint: str, payload: Any) -> str:
+	"""endpoint + 规范化 JSON 请求体的 sha256。"""
+	raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+	return hashlib.sha256(f"{endpoint}\n{raw}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Call:
+	done: threading.Event = field(default_factory=threading.Event)
+	result: Any = None
+	error: Optional[BaseException] = None
+
+
+class SingleFlight:
+	def __init__(self) -> None:
+		self._lock = threading.Lock()
+		self._calls: Dict[str, _Call] = {}
+		self.leaders = 0
+		self.joined = 0
+
+	def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+		"""返回 (结果, 是否为等待他人结果)。"""
+		with self._lock:
+			call = self._calls.get(key)
+			leader = call is None
+			if leader:
+				call = self._calls[key] = _Call()
+				self.leaders += 1
+			else:
+				self.joined += 1
+
+		if not leader:
+			call.done.wait()
+			if call.error is not None:
+				raise call.error
+			return call.result, True
+
+		try:
+			call.result = fn()
+		except BaseException as e:
+			call.error = e
+			raise
+		finally:
+			with self._lock:
+				self._calls.pop(key, None)
+			call.done.set()
+		return call.result, False
+
+	def stats(self) -> Dict[str, int]:
+		with self._lock:
+			return {"leaders": self.leaders, "joined": self.joined, "inflight": len(self._calls)}
+
+
+_GROUPS: Dict[str, SingleFlight] = {}
+_GROUPS_LOCK = threading.Lock()
+
+
+def get_group(name: str) -> SingleFlight:
+	"""进程内共享的分组（如 chat / speech / images / vlm）。"""
+	with _GROUPS_LOCK:
+		group = _GROUPS.get(name)
+		if group is None:
+			group = _GROUPS[name] = SingleFlight()
+		return group
+
+
+def record_singleflight(providers: Dict[str, Any]) -> None:
+	"""把已有分组的统计写入 manifest providers.singleflight。"""
+	with _GROUPS_LOCK:
+		snapshot = {name: g.stats() for name, g in _GROUPS.items()}
+	if snapshot:
+		providers["singleflight"] = snapshot
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+novel2comic/core/timeline.py
+
+章节时间轴 sidecar：audio/timeline.json（TTS 阶段写出）。
+- 记录每个 shot、每个 segment 在 chapter.wav 中的精确起止 ms（由帧数计算，不靠字数估算）
+- Align/Render/Export 直接查表，不必重新打开 wav
+- Timeline.shot_at(ms) 按 start_ms 二分查找
+
+时间均为章节绝对 ms（int）。segment 的 end_ms 为语音结束，pause_after_ms 为其后静音。
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+TIMELINE_SCHEMA_VERSION = "timeline.v0.1"
+
+
+def segment_timings(
+	seg_requests: Sequence[Tuple[List[str], List[int]]],
+	request_spans: Sequence[Tuple[float, float, float]],
+) -> List[Dict[str, Any]]:
+	"""
+	由请求级时间推出 segment 级时间（shot 内相对 ms）。
+
+	seg_requests[i]：第 i 个请求覆盖的 (seg_ids, seg_chars)
+	request_spans[i]：(start_ms, speech_end_ms, next_start_ms)，next_start_ms 含尾部静音
+	合并请求内按字数比例切分语音时长；拆分请求里同一 seg 的多个片段取并集。
+	"""
+	spans: Dict[str, List[float]] = {}
+	order: List[str] = []
+	for (seg_ids, seg_chars), (start, end, _) in zip(seg_requests, request_spans):
+		total = sum(seg_chars) or 1
+		t = start
+		for sid, n in zip(seg_ids, seg_chars):
+			dur = (end - start) * n / total
+			if sid not in spans:
+				spans[sid] = [t, t + dur]
+				order.append(sid)
+			else:
+				spans[sid][1] = t + dur
+			t += dur
+
+	shot_end = request_spans[-1][2] if request_spans else 0.0
+	out = []
+	for i, sid in enumerate(order):
+		start, end = spans[sid]
+		next_start = spans[order[i + 1]][0] if i + 1 < len(order) else shot_end
+		out.append({
+			"seg_id": sid,
+			"start_ms": int(round(start)),
+			"end_ms": int(round(end)),
+			"pause_after_ms": max(0, int(round(next_start)) - int(round(end))),
+		})
+	return out
+
+
+def build_timeline(
+	shots: Sequence[Dict[str, Any]],
+	sample_rate: int,
+) -> Dict[str, Any]:
+	"""
+	shots：按 chapter.wav 顺序的条目，每个含
+	  shot_id, start_ms, end_ms（章节绝对，float 可）, gap_after_ms, segments（shot 内相对，可缺省）
+	返回可直接落盘的 timeline dict。
+	"""
+	out_shots = []
+	for s in shots:
+		start = int(round(s["start_ms"]))
+		entry: Dict[str, Any] = {
+			"shot_id": s["shot_id"],
+			"start_ms": start,
+			"end_ms": int(round(s["end_ms"])),
+			"gap_after_ms": int(s.get("gap_after_ms", 0)),
+		}
+		segs = s.get("segments")
+		if segs:
+			entry["segments"] = [
+				{
+					"seg_id": seg["seg_id"],
+					"start_ms": start + seg["start_ms"],
+					"end_ms": start + seg["end_ms"],
+					"pause_after_ms": seg.get("pause_after_ms", 0),
+				}
+				for seg in segs
+			]
+		out_shots.append(entry)
+	return {
+		"schema_version": TIMELINE_SCHEMA_VERSION,
+		"sample_rate": sample_rate,
+		"duration_ms": out_shots[-1]["end_ms"] if out_shots else 0,
+		"shots": out_shots,
+	}
+
+
+def save_timeline(path: Path, timeline: Dict[str, Any]) -> None:
+	path.write_text(json.dumps(timeline, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+@dataclass
+class Timeline:
+	"""timeline.json 的只读视图：按 shot_id 查、按时间点二分查。"""
+	data: Dict[str, Any]
+
+	def __post_init__(self) -> None:
+		self._shots: List[Dict[str, Any]] = self.data.get("shots", [])
+		self._starts = [s["start_ms"] for s in self._shots]
+		self._by_id = {s["shot_id"]: s for s in self._shots}
+
+	@property
+	def duration_ms(self) -> int:
+		return int(self.data.get("duration_ms", 0))
+
+	def shot(self, shot_id: str) -> Optional[Dict[str, Any]]:
+		return self._by_id.get(shot_id)
+
+	def shot_at(self, ms: int) -> Optional[Dict[str, Any]]:
+		"""返回 ms 所在的 shot（含其后 gap）；ms 早于第一个 shot 时返回 None。"""
+		i = bisect.bisect_right(self._starts, ms) - 1
+		return self._shots[i] if i >= 0 else None
+
+
+def load_timeline(path: Path) -> Optional[Timeline]:
+	"""不存在或 schema 不符时返回 None（调用方回退到旧逻辑）。"""
+	if not path.exists():
+		return None
+	data = json.loads(path.read_text(encoding="utf-8"))
+	if data.get("schema_version") != TIMELINE_SCHEMA_VERSION:
+		return None
+	return Timeline(data)
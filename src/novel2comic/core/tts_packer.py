@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+novel2comic/core/tts_packer.py
+
+TTS 请求打包：把一个 shot 的 segments 整理成“长度合适”的请求序列。
+- 合并：相邻且 (voice, style_prompt, speed) 相同、中间停顿不长的碎片合成一次请求
+- 拆分：超长 segment 在句末标点处切成有界 chunk（缩短首字节时间、降低超时概率）
+- 停顿：每个请求携带 pause_after_ms，与 get_tail_pause_ms 的记账保持一致
+
+纯函数，不调用 provider。
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from novel2comic.core.tts_utils import get_tail_pause_ms
+
+# 单次请求默认字数上限
+DEFAULT_MAX_CHARS = 120
+# 仅当两段之间的停顿 <= 此值时允许合并（句末停顿 260ms 可交给模型韵律处理）
+DEFAULT_MERGE_MAX_PAUSE_MS = 260
+
+# 拆分边界：先句末，再句中；都找不到时硬切
+_SENT_END_RE = re.compile(r"(?<=[。！？；!?;])")
+_CLAUSE_END_RE = re.compile(r"(?<=[，、：,:])")
+
+
+@dataclass
+class TTSUnit:
+	"""一个待合成的 segment（已清洗）。pause_after_ms = 尾部标点停顿 + 省略号额外停顿。"""
+	seg_id: str
+	text: str
+	voice: str
+	style_prompt: Optional[str]
+	speed: float
+	pause_after_ms: int
+
+
+@dataclass
+class TTSRequest:
+	"""
+	一次 /audio/speech 请求。
+	seg_ids：覆盖的 segment（合并时多个；拆分时同一 seg_id 出现在连续多个请求中）。
+	seg_chars：与 seg_ids 对齐，各 segment 在本请求 text 中的字数（用于按比例切分时长）。
+	"""
+	text: str
+	voice: str
+	style_prompt: Optional[str]
+	speed: float
+	pause_after_ms: int
+	seg_ids: List[str] = field(default_factory=list)
+	seg_chars: List[int] = field(default_factory=list)
+
+	@property
+	def key(self) -> tuple:
+		return (self.voice, self.style_prompt, self.speed)
+
+
+def _split_by(pattern: re.Pattern, text: str) -> List[str]:
+	return [p for p in pattern.split(text) if p]
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+	"""
+	把超长文本切成 <= max_chars 的 chunk。
+	优先句末标点，其次逗号类标点，最后硬切；拼回后与原文逐字一致。
+	"""
+	if max_chars <= 0 or len(text) <= max_chars:
+		return [text]
+
+	pieces: List[str] = []
+	for sent in _split_by(_SENT_END_RE, text):
+		if len(sent) <= max_chars:
+			pieces.append(sent)
+			continue
+		for clause in _split_by(_CLAUSE_END_RE, sent):
+			while len(clause) > max_chars:
+				pieces.append(clause[:max_chars])
+				clause = clause[max_chars:]
+			if clause:
+				pieces.append(clause)
+
+	# 贪心装箱：相邻 piece 在不超上限时合并
+	chunks: List[str] = []
+	buf = ""
+	for p in pieces:
+		if buf and len(buf) + len(p) > max_chars:
+			chunks.append(buf)
+			buf = ""
+		buf += p
+	if buf:
+		chunks.append(buf)
+	return chunks
+
+
+def pack_requests(
+	units: List[TTSUnit],
+	max_chars: int = DEFAULT_MAX_CHARS,
+	merge_max_pause_ms: int = DEFAULT_MERGE_MAX_PAUSE_MS,
+) -> List[TTSRequest]:
+	"""
+	先拆后合：
+	1) 超长 unit 按 split_text 拆成多个请求，chunk 间停顿按 chunk 末尾标点取 get_tail_pause_ms，
+	   最后一个 chunk 继承 unit 原 pause_after_ms；
+	2) 相邻请求 key 相同、合并后不超 max_chars、且中间停顿 <= merge_max_pause_ms 时合并，
+	   合并后 pause_after_ms 取后者。
+	"""
+	split: List[TTSRequest] = []
+	for u in units:
+		chunks = split_text(u.text, max_chars)
+		for i, chunk in enumerate(chunks):
+			last = i == len(chunks) - 1
+			split.append(TTSRequest(
+				text=chunk,
+				voice=u.voice,
+				style_prompt=u.style_prompt,
+				speed=u.speed,
+				pause_after_ms=u.pause_after_ms if last else get_tail_pause_ms(chunk),
+				seg_ids=[u.seg_id],
+				seg_chars=[len(chunk)],
+			))
+
+	packed: List[TTSRequest] = []
+	for req in split:
+		prev = packed[-1] if packed else None
+		can_merge = (
+			prev is not None
+			and prev.key == req.key
+			and prev.pause_after_ms <= merge_max_pause_ms
+			and len(prev.text) + len(req.text) <= max_chars
+		)
+		if not can_merge:
+			packed.append(req)
+			continue
+		prev.text += req.text
+		prev.pause_after_ms = req.pause_after_ms
+		for sid, n in zip(req.seg_ids, req.seg_chars):
+			if prev.seg_ids and prev.seg_ids[-1] == sid:
+				prev.seg_chars[-1] += n
+			else:
+				prev.seg_ids.append(sid)
+				prev.seg_chars.append(n)
+	return packed
+
+
+def unpacked_requests(units: List[TTSUnit]) -> List[TTSRequest]:
+	"""不打包：一个 unit 一次请求（packer 关闭时使用）。"""
+	return [
+		TTSRequest(
+			text=u.text,
+			voice=u.voice,
+			style_prompt=u.style_prompt,
+			speed=u.speed,
+			pause_after_ms=u.pause_after_ms,
+			seg_ids=[u.seg_id],
+			seg_chars=[len(u.text)],
+		)
+		for u in units
+	]
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+novel2comic/core/windowing.py
+
+长章节 LLM 调用的窗口切分与并发执行。
+- plan_windows：把 n 个 shot 切成固定大小的窗口；每个窗口两侧各带 overlap 个只读上下文
+- plan_windows_at_breaks：只在边界（如 scene_break）处切，相邻短段合并到不超过 size，超长段按大小硬切
+- run_concurrent：线程池并发执行，逐项返回 (结果, 异常)，单项失败不影响其他项
+
+skill 只对窗口核心区间输出 patch，上下文只用于语义连贯，不参与校验与合并。
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class Window:
+	"""核心区间 [start, end)；带上下文的区间 [ctx_start, ctx_end)。"""
+	index: int
+	start: int
+	end: int
+	ctx_start: int
+	ctx_end: int
+
+	def core(self, items: Sequence[T]) -> List[T]:
+		return list(items[self.start:self.end])
+
+	def context_before(self, items: Sequence[T]) -> List[T]:
+		return list(items[self.ctx_start:self.start])
+
+	def context_after(self, items: Sequence[T]) -> List[T]:
+		return list(items[self.end:self.ctx_end])
+
+
+def plan_windows(n: int, size: int, overlap: int = 0) -> List[Window]:
+	"""size<=0 或 size>=n 时只有一个窗口（等价于整章一次调用）。"""
+	if n <= 0:
+		return []
+	size = n if size <= 0 else min(size, n)
+	overlap = max(0, overlap)
+	windows = []
+	for i, start in enumerate(range(0, n, size)):
+		end = min(n, start + size)
+		windows.append(Window(i, start, end, max(0, start - overlap), min(n, end + overlap)))
+	return windows
+
+
+def plan_windows_at_breaks(breaks: Sequence[bool], size: int) -> List[Window]:
+	"""
+	按边界切窗口：breaks[i] 为 True 表示 i 之后可以切开（如 scene_break）。
+	相邻的段落（两个边界之间）合并进同一窗口，直到再加一段会超过 size；
+	单段超过 size 时按 size 硬切（末尾不足 size 的部分继续与后续段落合并）。
+	size<=0 时每段一个窗口。无上下文。
+	"""
+	n = len(breaks)
+	spans: List[Tuple[int, int]] = []
+	start = 0
+	for i in range(n):
+		if breaks[i] or i == n - 1:
+			spans.append((start, i + 1))
+			start = i + 1
+	if size <= 0:
+		return [Window(k, a, b, a, b) for k, (a, b) in enumerate(spans)]
+
+	cuts: List[Tuple[int, int]] = []
+	cur = 0  # 当前窗口起点；窗口为 [cur, a)
+	for a, b in spans:
+		if a > cur and b - cur > size:
+			cuts.append((cur, a))
+			cur = a
+		while b - cur > size:
+			cuts.append((cur, cur + size))
+			cur += size
+	if cur < n:
+		cuts.append((cur, n))
+	return [Window(k, a, b, a, b) for k, (a, b) in enumerate(cuts)]
+
+
+def run_concurrent(
+	fn: Callable[[T], R],
+	items: Sequence[T],
+	workers: int,
+) -> List[Tuple[Optional[R], Optional[BaseException]]]:
+	"""按输入顺序返回每项的 (结果, None) 或 (None, 异常)。workers<=1 时串行。"""
+
+	def call(item: T) -> Tuple[Optional[R], Optional[BaseException]]:
+		try:
+			return fn(item), None
+		except Exception as e:
+			return None, e
+
+	if workers <= 1 or len(items) <= 1:
+		return [call(item) for item in items]
+	with ThreadPoolExecutor(max_workers=min(workers, len(items))) as ex:
+		return list(ex.map(call, items))
@@ -2,28 +2,195 @@
 """
 novel2comic/director_review/client.py
 
-LLM 调用：JSON mode + 重试。
+LLM 调用：JSON mode + 重试（校验不过同样重试；重试跳过 LLM 缓存读取，校验通过的响应才写缓存）。
+窗口模式：重叠窗口并发审阅，patch 按 shot_id 合并；失败窗口只影响自身 shot（由调用方走 fallback gap）。
+分级模型（cascade）：窗口先用小模型（不重试），校验不过或窗口对白/说话人过多时用默认模型（含重试）。
 """
 
 from __future__ import annotations
 
 import time
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from novel2comic.core.windowing import Window, plan_windows, run_concurrent
+from novel2comic.providers.breaker import CircuitOpenError
+from novel2comic.providers.llm.cascade import CascadeConfig, answering_model, chat_json_with_model, join_models, run_cascade
+from novel2comic.providers.session import retry_policy
+from novel2comic.director_review.prompt import (
+	SYSTEM_PROMPT,
+	build_compact_user_prompt,
+	build_user_prompt,
+	decode_compact_review,
+)
+from novel2comic.director_review.schema import validate_director_review
 
 MAX_RETRIES = 2
 
 
-def chat_director_review(llm_client: Any, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+def chat_director_review(
+	llm_client: Any,
+	system_prompt: str,
+	user_prompt: str,
+	model: Optional[str] = None,
+	retries: int = MAX_RETRIES,
+	validate: Optional[Callable[[Any], None]] = None,
+) -> Dict[str, Any]:
 	"""
 	调用 LLM 获取导演审阅 JSON。支持重试。
-	llm_client 需实现 chat_json(system_prompt, user_prompt) -> dict。
+	llm_client 需实现 chat_json(system_prompt, user_prompt) -> dict；指定 model 时以 model= 传入。
+	validate：不通过时抛异常并重试（见 providers/llm/cascade.chat_json_with_model）。
 	"""
+	policy = retry_policy()
 	last_err = None
-	for attempt in range(MAX_RETRIES + 1):
+	for attempt in range(retries + 1):
 		try:
-			return llm_client.chat_json(system_prompt, user_prompt)
+			return chat_json_with_model(llm_client, system_prompt, user_prompt, model, validate=validate, fresh=attempt > 0)
+		except CircuitOpenError:
+			raise
 		except Exception as e:
 			last_err = e
-			if attempt < MAX_RETRIES:
-				time.sleep(1.5 * (attempt + 1))
+			if attempt < retries:
+				time.sleep(policy.delay(attempt))
 	raise last_err
+
+
+def review_shots(
+	llm_client: Any,
+	chapter_id: str,
+	shots: List[Dict[str, Any]],
+	system_prompt: str = SYSTEM_PROMPT,
+	compact: bool = False,
+	context_before: Optional[List[Dict[str, Any]]] = None,
+	context_after: Optional[List[Dict[str, Any]]] = None,
+	model: Optional[str] = None,
+	retries: int = MAX_RETRIES,
+	validate: Optional[Callable[[Any], None]] = None,
+) -> Dict[str, Any]:
+	"""构造 prompt（标准或紧凑）并调用；紧凑模式下把本地 id 还原为 shot_id（validate 校验还原后的结果）。"""
+	if compact:
+		user_prompt = build_compact_user_prompt(chapter_id, shots, context_before, context_after)
+		check = (lambda raw: validate(decode_compact_review(raw, shots))) if validate is not None else None
+		return decode_compact_review(chat_director_review(llm_client, system_prompt, user_prompt, model, retries, check), shots)
+	user_prompt = build_user_prompt(chapter_id, shots, context_before, context_after)
+	return chat_director_review(llm_client, system_prompt, user_prompt, model, retries, validate)
+
+
+def _normalize_review(review: Any, ids: List[str]) -> Dict[str, Any]:
+	"""只保留 ids 内的 patch 条目并校验；不通过抛 ValueError。"""
+	if not isinstance(review, dict):
+		raise ValueError("director_review must be dict")
+	id_set = set(ids)
+	patch = review.get("patch") if isinstance(review.get("patch"), dict) else {}
+	items = patch.get("shots") if isinstance(patch.get("shots"), list) else []
+	review = dict(review)
+	review["patch"] = {"shots": [it for it in items if isinstance(it, dict) and it.get("shot_id") in id_set]}
+	ok, err = validate_director_review(review, ids)
+	if not ok:
+		raise ValueError(err)
+	return review
+
+
+def review_shots_cascade(
+	llm_client: Any,
+	chapter_id: str,
+	shots: List[Dict[str, Any]],
+	system_prompt: str = SYSTEM_PROMPT,
+	compact: bool = False,
+	cascade: Optional[CascadeConfig] = None,
+	context_before: Optional[List[Dict[str, Any]]] = None,
+	context_after: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+	"""
+	按 cascade 逐级调用 review_shots，并用 validate_director_review 校验（只保留 shots 内的 patch 条目）。
+	小模型不重试；最后一级（默认模型）沿用 MAX_RETRIES，校验不过抛 ValueError。
+	返回的 meta.model 为实际给出这份审阅的模型。
+	"""
+	ids = [s.get("shot_id", "") for s in shots]
+	models = cascade.models_for(shots) if cascade else [None]
+
+	def check(review: Any) -> None:
+		_normalize_review(review, ids)
+
+	def attempt(model: Optional[str]) -> Dict[str, Any]:
+		review = review_shots(
+			llm_client, chapter_id, shots, system_prompt, compact,
+			context_before=context_before, context_after=context_after,
+			model=model, retries=0 if model else MAX_RETRIES, validate=check,
+		)
+		review = _normalize_review(review, ids)
+		meta = review.get("meta") if isinstance(review.get("meta"), dict) else {}
+		review["meta"] = {**meta, "model": answering_model(llm_client, model)}
+		return review
+
+	return run_cascade(models, attempt)
+
+
+def _review_window(
+	llm_client: Any,
+	chapter_id: str,
+	shots: List[Dict[str, Any]],
+	w: Window,
+	system_prompt: str,
+	compact: bool = False,
+	cascade: Optional[CascadeConfig] = None,
+) -> Dict[str, Any]:
+	"""单窗口审阅：只保留核心区间 shot 的 patch（上下文 shot 的 patch 丢弃），校验不过视为失败。"""
+	return review_shots_cascade(
+		llm_client, chapter_id, w.core(shots), system_prompt, compact, cascade,
+		context_before=w.context_before(shots), context_after=w.context_after(shots),
+	)
+
+
+def merge_window_reviews(reviews: List[Dict[str, Any]]) -> Dict[str, Any]:
+	"""
+	按窗口顺序合并：patch 按 shot_id 合并字段，global_notes 去重，risks 拼接。
+	meta.model 为各窗口实际应答模型（去重，多个时逗号分隔）。
+	"""
+	merged_items: Dict[str, Dict[str, Any]] = {}
+	notes: List[str] = []
+	risks: List[Any] = []
+	models = join_models([(review.get("meta") or {}).get("model") or "" for review in reviews])
+	for review in reviews:
+		for item in review.get("patch", {}).get("shots", []):
+			merged_items.setdefault(item["shot_id"], {}).update(item)
+		for note in review.get("global_notes") or []:
+			if note not in notes:
+				notes.append(note)
+		risks.extend(review.get("risks") or [])
+	meta = {"model": models} if models else {}
+	return {"meta": meta, "global_notes": notes, "risks": risks, "patch": {"shots": list(merged_items.values())}}
+
+
+def chat_director_review_windowed(
+	llm_client: Any,
+	chapter_id: str,
+	shots: List[Dict[str, Any]],
+	window_shots: int,
+	overlap_shots: int = 2,
+	workers: int = 4,
+	system_prompt: str = SYSTEM_PROMPT,
+	compact: bool = False,
+	cascade: Optional[CascadeConfig] = None,
+) -> Tuple[Dict[str, Any], List[str]]:
+	"""
+	重叠窗口并发审阅。返回 (合并后的 director_review, 失败窗口内的 shot_id 列表)。
+	每个窗口内部沿用 chat_director_review 的重试；全部窗口失败时抛出首个错误。
+	"""
+	windows = plan_windows(len(shots), window_shots, overlap_shots)
+	outcomes = run_concurrent(
+		lambda w: _review_window(llm_client, chapter_id, shots, w, system_prompt, compact, cascade),
+		windows,
+		workers,
+	)
+	ok_reviews = [r for r, err in outcomes if err is None]
+	errors = [(w, err) for w, (_, err) in zip(windows, outcomes) if err is not None]
+	if windows and not ok_reviews:
+		raise errors[0][1]
+
+	review = merge_window_reviews(ok_reviews)
+	failed_ids = [s.get("shot_id", "") for w, _ in errors for s in w.core(shots)]
+	review["meta"]["windows"] = len(windows)
+	review["meta"]["failed_windows"] = [
+		{"start": w.start, "end": w.end, "error": str(err)[:300]} for w, err in errors
+	]
+	return review, failed_ids
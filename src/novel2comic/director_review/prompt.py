@@ -3,12 +3,15 @@
 novel2comic/director_review/prompt.py
 
 导演审阅 prompt：shot 摘要化、严格 JSON 输出约束。
+紧凑模式：shot 摘要为表格行、shot_id 换成本地整数 id，响应经 decode_compact_review 还原。
 """
 
 from __future__ import annotations
 
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+
+from novel2comic.core.prompt_codec import IdCodec, dumps, table
 
 RAW_TEXT_TRUNCATE = 120
 
@@ -63,16 +66,97 @@ def _shot_summary(shot: Dict[str, Any], max_chars: int = RAW_TEXT_TRUNCATE) -> D
 	}
 
 
-def build_user_prompt(chapter_id: str, shots: List[Dict[str, Any]]) -> str:
-	"""构造 User Prompt：shot 摘要化 JSON。"""
-	payload = {
+CONTEXT_RULE = "context_before/context_after 仅供把握前后节奏，只读；patch.shots 只能包含 shots 中的 shot_id。\n"
+
+
+def build_user_prompt(
+	chapter_id: str,
+	shots: List[Dict[str, Any]],
+	context_before: Optional[List[Dict[str, Any]]] = None,
+	context_after: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+	"""构造 User Prompt：shot 摘要化 JSON。窗口模式下两侧邻近 shot 作为只读上下文。"""
+	payload: Dict[str, Any] = {
 		"chapter_id": chapter_id,
 		"schema_version": "director_review.v0.1",
 		"shots": [_shot_summary(s) for s in shots],
 	}
+	if context_before:
+		payload["context_before"] = [_shot_summary(s) for s in context_before]
+	if context_after:
+		payload["context_after"] = [_shot_summary(s) for s in context_after]
 	return (
 		"任务：对镜头脚本做导演视角审阅，输出节奏与转场补丁（patch-only）。\n\n"
+		+ (CONTEXT_RULE if context_before or context_after else "")
 		+ OUTPUT_SCHEMA
 		+ "\n输入数据(JSON)：\n"
 		+ json.dumps(payload, ensure_ascii=False)
 	)
+
+
+COMPACT_OUTPUT_SCHEMA = """
+输入 shots 为表格（cols 为列名）：id=本地编号，b=block_id，kind/emo/int/pace=当前朗读标签，text=原文摘要。
+输出格式（严格，id 用输入中的本地编号）：
+{"global_notes":["..."],"risks":[{"id":3,"level":"high","issue":"..."}],
+"patch":{"shots":[{"id":2,"gap_after_ms":800,"subtitle_tail_hold_ms":160,"pace":"slow","emotion":"sad","intensity":"mid","reasons":["..."]}]}}
+"""
+
+_COMPACT_COLS = ("id", "b", "kind", "emo", "int", "pace", "text")
+
+
+def _compact_row(shot: Dict[str, Any], local_id: Optional[int]) -> List[Any]:
+	s = _shot_summary(shot)
+	row = [s["block_id"], s["kind"], s["emotion"], s["intensity"], s["pace"], s["raw_text"]]
+	return row if local_id is None else [local_id, *row]
+
+
+def build_compact_user_prompt(
+	chapter_id: str,
+	shots: List[Dict[str, Any]],
+	context_before: Optional[List[Dict[str, Any]]] = None,
+	context_after: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+	"""紧凑编码的 User Prompt；响应需用 decode_compact_review(review, shots) 还原 shot_id。"""
+	codec = IdCodec([s.get("shot_id", "") for s in shots])
+	payload: Dict[str, Any] = {
+		"chapter_id": chapter_id,
+		"shots": table(_COMPACT_COLS, [_compact_row(s, codec.encode(s.get("shot_id", ""))) for s in shots]),
+	}
+	if context_before:
+		payload["context_before"] = table(_COMPACT_COLS[1:], [_compact_row(s, None) for s in context_before])
+	if context_after:
+		payload["context_after"] = table(_COMPACT_COLS[1:], [_compact_row(s, None) for s in context_after])
+	return (
+		"任务：对镜头脚本做导演视角审阅，输出节奏与转场补丁（patch-only）。\n\n"
+		+ (CONTEXT_RULE.replace("shot_id", "id") if context_before or context_after else "")
+		+ COMPACT_OUTPUT_SCHEMA
+		+ "\n输入数据(JSON)：\n"
+		+ dumps(payload)
+	)
+
+
+def decode_compact_review(review: Any, shots: List[Dict[str, Any]]) -> Any:
+	"""patch.shots[].id / risks[].id -> shot_id；无法识别的 id 原样放进 shot_id，交给校验报错。"""
+	if not isinstance(review, dict):
+		return review
+	codec = IdCodec([s.get("shot_id", "") for s in shots])
+
+	def decode_items(items: Any) -> Any:
+		if not isinstance(items, list):
+			return items
+		out = []
+		for it in items:
+			if isinstance(it, dict) and "id" in it:
+				sid = codec.decode(it["id"])
+				local = it["id"]
+				it = {k: v for k, v in it.items() if k != "id"}
+				it["shot_id"] = sid if sid is not None else f"unknown_local_id:{local}"
+			out.append(it)
+		return out
+
+	review = dict(review)
+	if isinstance(review.get("patch"), dict):
+		review["patch"] = dict(review["patch"], shots=decode_items(review["patch"].get("shots", [])))
+	if "risks" in review:
+		review["risks"] = decode_items(review["risks"])
+	return review
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+providers/align/energy_align.py
+
+轻量本地对齐器：基于能量的静音检测（NumPy 向量化），把字幕边界吸附到真实停顿上。
+- 不跑 ASR（WhisperX 过重），只用 shot wav 的 PCM
+- 输入为每个 shot 的估算边界（timeline 精确段时间或字数比例），输出吸附后的边界
+- 可选把 segment 再切成句子，句子边界同样按字数估算后吸附
+
+依赖：numpy（可选依赖，pip install numpy）。
+"""
+
+from __future__ import annotations
+
+import re
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# (start_ms, end_ms, text)，shot 内相对时间
+Entry = Tuple[int, int, str]
+
+_SENT_END_RE = re.compile(r"(?<=[。！？；!?;])")
+
+
+@dataclass
+class EnergyAlignConfig:
+	"""
+	frame_ms：能量帧长
+	silence_rel_db：低于 shot 峰值多少 dB 视为静音
+	min_silence_ms：静音最短时长（过滤字间微停顿）
+	max_shift_ms：边界最多移动多远；附近无静音则保持估算值
+	split_sentences：是否把 segment 细分为句子
+	"""
+	frame_ms: int = 10
+	silence_rel_db: float = 35.0
+	min_silence_ms: int = 80
+	max_shift_ms: int = 350
+	split_sentences: bool = True
+
+
+def _require_numpy() -> None:
+	if np is None:
+		raise ImportError("numpy required for energy aligner. pip install numpy")
+
+
+def read_pcm(path: Path) -> Tuple["np.ndarray", int]:
+	"""读取 16bit wav 为 int16 数组（多声道取第一声道）。"""
+	_require_numpy()
+	with wave.open(str(path), "rb") as wf:
+		if wf.getsampwidth() != 2:
+			raise ValueError(f"energy aligner requires 16bit wav: {path}")
+		rate = wf.getframerate()
+		nch = wf.getnchannels()
+		samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2")
+	if nch > 1:
+		samples = samples[::nch]
+	return samples, rate
+
+
+def frame_db(samples: "np.ndarray", sample_rate: int, frame_ms: int) -> "np.ndarray":
+	"""逐帧 RMS（dBFS）。"""
+	hop = max(1, int(sample_rate * frame_ms / 1000))
+	n = len(samples) // hop
+	if n == 0:
+		return np.zeros(0, dtype=np.float32)
+	frames = samples[: n * hop].astype(np.float32).reshape(n, hop) / 32768.0
+	rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+	return 20.0 * np.log10(rms)
+
+
+def detect_silences(db: "np.ndarray", frame_ms: int, rel_db: float, min_silence_ms: int) -> "np.ndarray":
+	"""返回静音区间 (k, 2)，单位 ms。阈值 = 峰值 - rel_db。"""
+	if db.size == 0:
+		return np.zeros((0, 2), dtype=np.float64)
+	silent = db < (db.max() - rel_db)
+	edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+	starts = np.flatnonzero(edges == 1)
+	ends = np.flatnonzero(edges == -1)
+	keep = (ends - starts) * frame_ms >= min_silence_ms
+	return np.stack([starts[keep], ends[keep]], axis=1).astype(np.float64) * frame_ms
+
+
+def snap_boundaries(estimates: "np.ndarray", silences: "np.ndarray", max_shift_ms: float) -> "np.ndarray":
+	"""把每个估算边界吸附到最近的静音中点（距离 <= max_shift_ms），结果保持单调不减。"""
+	if estimates.size == 0 or silences.shape[0] == 0:
+		return estimates
+	centers = silences.mean(axis=1)
+	idx = np.searchsorted(centers, estimates)
+	cand = np.stack([np.clip(idx - 1, 0, len(centers) - 1), np.clip(idx, 0, len(centers) - 1)], axis=1)
+	dist = np.abs(centers[cand] - estimates[:, None])
+	pick = dist.argmin(axis=1)
+	best = cand[np.arange(len(estimates)), pick]
+	snapped = np.where(dist[np.arange(len(estimates)), pick] <= max_shift_ms, centers[best], estimates)
+	return np.maximum.accumulate(snapped)
+
+
+def _split_entry_sentences(entry: Entry) -> List[Entry]:
+	"""一个 segment 按句末标点切句，时长按字数比例分配。"""
+	start, end, text = entry
+	sents = [s for s in _SENT_END_RE.split(text) if s.strip()]
+	if len(sents) <= 1:
+		return [entry]
+	total = sum(len(s) for s in sents)
+	out = []
+	cur = float(start)
+	for s in sents:
+		nxt = cur + (end - start) * len(s) / total
+		out.append((int(round(cur)), int(round(nxt)), s))
+		cur = nxt
+	return out
+
+
+class EnergyAligner:
+	def __init__(self, cfg: EnergyAlignConfig | None = None):
+		_require_numpy()
+		self.cfg = cfg or EnergyAlignConfig()
+
+	def align_shot(self, wav_path: Path, estimates: List[Entry]) -> Tuple[List[Entry], int]:
+		"""
+		estimates：shot 内估算条目（按时间排序）。
+		返回 (吸附后的条目, 检测到的静音数)。首尾边界不动，只移动内部边界。
+		"""
+		entries = estimates
+		if self.cfg.split_sentences:
+			entries = [e for est in estimates for e in _split_entry_sentences(est)]
+		if len(entries) <= 1:
+			return entries, 0
+
+		samples, rate = read_pcm(wav_path)
+		db = frame_db(samples, rate, self.cfg.frame_ms)
+		silences = detect_silences(db, self.cfg.frame_ms, self.cfg.silence_rel_db, self.cfg.min_silence_ms)
+
+		inner = np.array([e[0] for e in entries[1:]], dtype=np.float64)
+		snapped = snap_boundaries(inner, silences, self.cfg.max_shift_ms)
+		# 不越过首条起点 / 末条终点
+		snapped = np.clip(snapped, entries[0][0], entries[-1][1])
+		bounds = [entries[0][0]] + [int(round(b)) for b in snapped] + [entries[-1][1]]
+		out = [(bounds[i], bounds[i + 1], e[2]) for i, e in enumerate(entries)]
+		return out, int(silences.shape[0])
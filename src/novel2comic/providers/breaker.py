@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+providers/breaker.py
+
+按 endpoint 家族（chat / speech / images）的熔断器与健康统计。
+- closed：正常放行；连续失败达 consecutive_failures，或最近 window 次中失败率 ≥ error_rate（样本 ≥ min_requests）即熔断
+- open：直接抛 CircuitOpenError（不发请求、不等待），open_s 秒后进入 half_open
+- half_open：只放行一个探测请求；成功则恢复 closed，失败则重新 open
+- 失败 = 传输错误（含超时）或 429 / 5xx；其他 4xx 与响应解析错误不计入
+
+由 providers/limiter 的 send / slot 统一调用，各 provider 无需单独接入。
+stage 在结束时调用 record_breakers 把状态写入 manifest providers.breakers，本 stage 内有熔断则加 warning。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+from novel2comic.core.config_loader import get_siliconflow
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+	"""熔断中：调用方应立即放弃（或挂起该 shot 等下次重跑），不要再重试等待。"""
+
+	def __init__(self, family: str, retry_after_s: float):
+		super().__init__(f"circuit open for {family}, retry after {retry_after_s:.0f}s")
+		self.family = family
+		self.retry_after_s = retry_after_s
+
+
+@dataclass
+class BreakerConfig:
+	consecutive_failures: int = 5
+	error_rate: float = 0.5
+	window: int = 20
+	min_requests: int = 10
+	open_s: float = 30.0
+
+
+def is_failure_status(code: int) -> bool:
+	return code == 429 or code >= 500
+
+
+class CircuitBreaker:
+	def __init__(self, family: str, cfg: Optional[BreakerConfig] = None):
+		self.family = family
+		self.cfg = cfg or BreakerConfig()
+		self.state = CLOSED
+		self.trips = 0
+		self.rejected = 0
+		self.consecutive = 0
+		self._outcomes: Deque[bool] = deque(maxlen=max(1, self.cfg.window))
+		self._opened_at = 0.0
+		self._probing = False
+		self._lock = threading.Lock()
+
+	def before(self) -> None:
+		"""请求前调用；熔断中抛 CircuitOpenError。"""
+		with self._lock:
+			if self.state == CLOSED:
+				return
+			now = time.monotonic()
+			if self.state == OPEN:
+				remaining = self._opened_at + self.cfg.open_s - now
+				if remaining > 0:
+					self.rejected += 1
+					raise CircuitOpenError(self.family, remaining)
+				self.state = HALF_OPEN
+			if self._probing:
+				self.rejected += 1
+				raise CircuitOpenError(self.family, 0.0)
+			self._probing = True
+
+	def success(self) -> None:
+		with self._lock:
+			self._outcomes.append(True)
+			self.consecutive = 0
+			if self.state == HALF_OPEN:
+				self.state = CLOSED
+				self._probing = False
+				self._outcomes.clear()
+
+	def failure(self) -> None:
+		with self._lock:
+			self._outcomes.append(False)
+			self.consecutive += 1
+			if self.state == HALF_OPEN:
+				self._trip()
+				return
+			if self.state == CLOSED and (self.consecutive >= self.cfg.consecutive_failures or self._error_rate_exceeded()):
+				self._trip()
+
+	def release_probe(self) -> None:
+		"""探测请求因非健康原因（如本地异常）未给出结果时，允许下一个请求继续探测。"""
+		with self._lock:
+			if self.state == HALF_OPEN:
+				self._probing = False
+
+	def _error_rate_exceeded(self) -> bool:
+		n = len(self._outcomes)
+		if n < self.cfg.min_requests:
+			return False
+		return self._outcomes.count(False) / n >= self.cfg.error_rate
+
+	def _trip(self) -> None:
+		self.state = OPEN
+		self._opened_at = time.monotonic()
+		self._probing = False
+		self.trips += 1
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			n = len(self._outcomes)
+			return {
+				"state": self.state,
+				"trips": self.trips,
+				"rejected": self.rejected,
+				"consecutive_failures": self.consecutive,
+				"error_rate": round(self._outcomes.count(False) / n, 3) if n else 0.0,
+			}
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_LOCK = threading.Lock()
+
+
+def _config() -> Optional[BreakerConfig]:
+	cc = get_siliconflow().get("circuit_breaker") or {}
+	if not cc.get("enabled", False):
+		return None
+	d = BreakerConfig()
+	return BreakerConfig(
+		consecutive_failures=int(cc.get("consecutive_failures", d.consecutive_failures)),
+		error_rate=float(cc.get("error_rate", d.error_rate)),
+		window=int(cc.get("window", d.window)),
+		min_requests=int(cc.get("min_requests", d.min_requests)),
+		open_s=float(cc.get("open_s", d.open_s)),
+	)
+
+
+def get_breaker(family: str) -> Optional[CircuitBreaker]:
+	"""进程内共享的家族熔断器；circuit_breaker.enabled=false 时返回 None。"""
+	with _LOCK:
+		if family in _BREAKERS:
+			return _BREAKERS[family]
+		cfg = _config()
+		if cfg is None:
+			return None
+		_BREAKERS[family] = CircuitBreaker(family, cfg)
+		return _BREAKERS[family]
+
+
+def trip_counts() -> Dict[str, int]:
+	"""各家族累计熔断次数；stage 开始时取一次，结束时传给 record_breakers 以识别本 stage 内的熔断。"""
+	with _LOCK:
+		breakers = list(_BREAKERS.values())
+	return {b.family: b.stats()["trips"] for b in breakers}
+
+
+def record_breaker_stats(providers: Dict[str, Any]) -> None:
+	"""只写 manifest providers.breakers（不加 warning）。"""
+	with _LOCK:
+		snapshot = {b.family: b.stats() for b in _BREAKERS.values()}
+	if snapshot:
+		providers["breakers"] = snapshot
+
+
+def record_breakers(m: Any, since: Optional[Dict[str, int]] = None) -> None:
+	"""把熔断器状态写入 manifest providers.breakers；相对 since 新增熔断的家族加 warning。"""
+	record_breaker_stats(m.providers)
+	for family, st in (m.providers.get("breakers") or {}).items():
+		new_trips = st["trips"] - (since or {}).get(family, 0)
+		if new_trips > 0:
+			m.add_warning(
+				f"circuit breaker {family} opened {new_trips}x (state={st['state']}, rejected={st['rejected']}); "
+				"affected shots failed fast, rerun to retry"
+			)
+
+
+def reset_breakers() -> None:
+	"""清空单例（测试用）。"""
+	with _LOCK:
+		_BREAKERS.clear()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+providers/cassette.py
+
+provider 请求的录制 / 回放（cassette）：复现线上问题、离线剖析本地开销。
+- record：请求照常发出，响应（状态码、响应头、完整 body）按请求落盘到 cassette 目录
+- replay：不联网，按请求查 cassette 直接返回；查不到抛 CassetteMissError
+- key = method + URL + 规范化请求体（JSON 按 key 排序）的 sha256；鉴权头不参与 key，也不落盘
+- 覆盖所有经 providers/session 共享会话的请求：LLM JSON（含 SSE 流）、TTS 音频、图像生成与图片 URL 下载、VLM 评审
+
+作为 httpx transport 挂在 providers/session 的共享会话上，各 provider 无需改动。
+录制时流式响应先读完整个 body 再交给调用方（首字节耗时不再真实），回放时整段返回。
+模式：env PROVIDER_CASSETTE=record|replay|off 优先，其次 configs/siliconflow.yaml 的 cassette 段；
+命中统计由 record_cassette 写入 manifest providers.cassette。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import httpx
+
+from novel2comic.core.config_loader import get_siliconflow
+from novel2comic.core.io import find_project_root
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+MODES = (OFF, RECORD, REPLAY)
+
+# 回放时不需要真实 key；load_*_config 在 replay 且未配置 key 时用这个占位
+REPLAY_API_KEY = "replay"
+
+# 不落盘的响应头（由 httpx 按 body 重新计算，或与回放无关）
+_SKIP_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "connection", "set-cookie"}
+
+
+class CassetteMissError(RuntimeError):
+	"""回放模式下 cassette 中没有该请求：说明输入变了（或从未录制），需要先用 record 模式跑一遍。"""
+
+	def __init__(self, method: str, url: str, key: str):
+		super().__init__(f"no cassette entry for {method} {url} (key={key[:12]}); rerun with PROVIDER_CASSETTE=record")
+		self.key = key
+
+
+def _canonical_body(content: bytes) -> bytes:
+	"""JSON 请求体按 key 排序后参与 key（字段顺序不影响命中）；非 JSON 原样参与。"""
+	if not content:
+		return b""
+	try:
+		obj = json.loads(content)
+	except (ValueError, UnicodeDecodeError):
+		return content
+	return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def request_fingerprint(request: httpx.Request) -> str:
+	h = hashlib.sha256()
+	h.update(f"{request.method} {request.url}\n".encode("utf-8"))
+	h.update(_canonical_body(request.read()))
+	return h.hexdigest()
+
+
+class CassetteStore:
+	"""<root>/<key[:2]>/<key>.json（元信息）+ <key>.body（原始响应体）。"""
+
+	def __init__(self, root: Path):
+		self.root = Path(root)
+
+	def _paths(self, key: str) -> tuple[Path, Path]:
+		d = self.root / key[:2]
+		return d / f"{key}.json", d / f"{key}.body"
+
+	def get(self, key: str) -> Optional[tuple[Dict[str, Any], bytes]]:
+		meta_path, body_path = self._paths(key)
+		if not meta_path.exists() or not body_path.exists():
+			return None
+		meta = json.loads(meta_path.read_text(encoding="utf-8"))
+		return meta, body_path.read_bytes()
+
+	def put(self, key: str, meta: Dict[str, Any], body: bytes) -> None:
+		meta_path, body_path = self._paths(key)
+		meta_path.parent.mkdir(parents=True, exist_ok=True)
+		# 先写临时文件再 replace：并发 worker 录到同一 key 时不会读到半个文件
+		suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+		for path, data in ((body_path, body), (meta_path, json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))):
+			tmp = path.with_name(path.name + suffix)
+			tmp.write_bytes(data)
+			os.replace(tmp, path)
+
+
+class CassetteTransport(httpx.BaseTransport):
+	"""包在真实 transport 外层：record 模式录制、replay 模式回放。"""
+
+	def __init__(self, mode: str, store: CassetteStore, inner: Optional[httpx.BaseTransport] = None):
+		if mode not in (RECORD, REPLAY):
+			raise ValueError(f"cassette mode must be record or replay, got {mode!r}")
+		self.mode = mode
+		self.store = store
+		self.inner = inner
+
+	def handle_request(self, request: httpx.Request) -> httpx.Response:
+		key = request_fingerprint(request)
+		if self.mode == REPLAY:
+			hit = self.store.get(key)
+			if hit is None:
+				_count("misses")
+				raise CassetteMissError(request.method, str(request.url), key)
+			meta, body = hit
+			_count("hits")
+			return httpx.Response(meta["status_code"], headers=meta.get("headers") or {}, content=body, request=request)
+
+		if self.inner is None:
+			raise RuntimeError("record mode needs an inner transport")
+		response = self.inner.handle_request(request)
+		try:
+			body = response.read()
+		finally:
+			response.close()
+		headers = {k: v for k, v in response.headers.items() if k.lower() not in _SKIP_HEADERS}
+		self.store.put(key, {
+			"method": request.method,
+			"url": str(request.url),
+			"status_code": response.status_code,
+			"headers": headers,
+		}, body)
+		_count("recorded")
+		return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+	def close(self) -> None:
+		if self.inner is not None:
+			self.inner.close()
+
+
+_STATS: Dict[str, int] = {"hits": 0, "misses": 0, "recorded": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _count(name: str) -> None:
+	with _STATS_LOCK:
+		_STATS[name] += 1
+
+
+def cassette_mode() -> str:
+	"""env PROVIDER_CASSETTE 优先，其次 siliconflow.yaml cassette.mode；默认 off。"""
+	mode = os.environ.get("PROVIDER_CASSETTE", "").strip().lower()
+	if not mode:
+		try:
+			mode = str((get_siliconflow().get("cassette") or {}).get("mode") or OFF).strip().lower()
+		except Exception:
+			mode = OFF
+	if mode not in MODES:
+		raise ValueError(f"PROVIDER_CASSETTE must be one of {MODES}, got {mode!r}")
+	return mode
+
+
+def cassette_dir() -> Path:
+	"""env PROVIDER_CASSETTE_DIR 优先，其次 cassette.path（相对项目根目录），默认 .cache/cassettes。"""
+	raw = os.environ.get("PROVIDER_CASSETTE_DIR", "").strip()
+	if not raw:
+		try:
+			raw = str((get_siliconflow().get("cassette") or {}).get("path") or "")
+		except Exception:
+			raw = ""
+	path = Path(raw or ".cache/cassettes")
+	if not path.is_absolute():
+		path = find_project_root(__file__) / path
+	return path
+
+
+def wrap_transport(inner: httpx.BaseTransport) -> httpx.BaseTransport:
+	"""按当前模式包装共享会话的 transport；off 时原样返回。"""
+	mode = cassette_mode()
+	if mode == OFF:
+		return inner
+	return CassetteTransport(mode, CassetteStore(cassette_dir()), inner)
+
+
+def record_cassette(providers: Dict[str, Any]) -> None:
+	"""非 off 模式下把 {mode, hits, misses, recorded} 写入 manifest providers.cassette。"""
+	mode = cassette_mode()
+	if mode == OFF:
+		return
+	with _STATS_LOCK:
+		providers["cassette"] = {"mode": mode, **_STATS}
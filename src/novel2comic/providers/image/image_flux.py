@@ -3,27 +3,32 @@
 providers/image/image_flux.py
 
 FLUX.1-schnell / FLUX.1 text2img via SiliconFlow /images/generations。
-支持 16:9（1024x576）、seed、prompt。
+支持 16:9（1024x576）、seed、prompt。请求经 providers/limiter 的 images 家族 AIMD 限流。
+API 请求与 URL 下载走 providers/session 的共享连接池；429/503/504 与传输错误按统一重试策略重试。
 """
 
 from __future__ import annotations
 
 import io
 import os
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
 import httpx
-
-try:
-	from dotenv import load_dotenv
-except Exception:
-	load_dotenv = None
-
 from PIL import Image
 
-from novel2comic.core.io import find_env_file, find_project_root
+from novel2comic.providers import limiter
+from novel2comic.providers.session import (
+	get_download_session,
+	get_session,
+	load_provider_env,
+	require_api_key,
+	resolve_base_url,
+	resolve_timeout,
+	retry_policy,
+)
 
 DEFAULT_MODEL = "black-forest-labs/FLUX.1-schnell"
 # FLUX.1-schnell 支持的 16:9 尺寸
@@ -39,14 +44,6 @@ class FluxConfig:
 	timeout_s: float
 
 
-def _load_dotenv_if_present(project_root: Path) -> None:
-	if load_dotenv is None:
-		return
-	env_path = find_env_file(project_root)
-	if env_path.exists():
-		load_dotenv(dotenv_path=str(env_path), override=False)
-
-
 def load_flux_config(
 	project_root: Optional[str | Path] = None,
 	api_key: Optional[str] = None,
@@ -55,24 +52,38 @@ def load_flux_config(
 	image_size: Optional[str] = None,
 	timeout_s: Optional[float] = None,
 ) -> FluxConfig:
-	root = find_project_root(project_root or __file__)
-	_load_dotenv_if_present(root)
-
-	key = (api_key or os.environ.get("SILICONFLOW_API_KEY", "")).strip()
-	if not key:
-		raise ValueError("Missing SILICONFLOW_API_KEY")
+	load_provider_env(project_root)
+	key = require_api_key(api_key)
 
-	url = (base_url or os.environ.get("SILICONFLOW_BASE_URL", "")).strip() or "https://api.siliconflow.cn/v1"
+	url = resolve_base_url(base_url)
 	m = (model or os.environ.get("FLUX_MODEL", "")).strip() or DEFAULT_MODEL
 	sz = (image_size or os.environ.get("IMAGE_SIZE", "")).strip() or DEFAULT_IMAGE_SIZE
 	# 若 IMAGE_SIZE 为 1344x768 等，FLUX.1-schnell 不支持则回退
 	if sz not in ("1024x1024", "512x1024", "768x512", "768x1024", "1024x576", "576x1024"):
 		sz = DEFAULT_IMAGE_SIZE
-	t = float(timeout_s or os.environ.get("SILICONFLOW_TIMEOUT_S", "120"))
+	t = resolve_timeout(timeout_s, 120)
 
 	return FluxConfig(api_key=key, base_url=url, model=m, image_size=sz, timeout_s=t)
 
 
+def _post_with_retry(client: httpx.Client, payload: dict) -> httpx.Response:
+	"""POST /images/generations；429/503/504 与传输错误按 retry_policy() 退避重试，最后一次原样返回/抛出。"""
+	policy = retry_policy()
+
+	def post() -> httpx.Response:
+		return limiter.send("images", lambda: client.post("/images/generations", json=payload))
+
+	for attempt in range(policy.max_attempts - 1):
+		try:
+			r = post()
+			if not policy.should_retry_status(r.status_code):
+				return r
+		except httpx.TransportError:
+			pass
+		time.sleep(policy.delay(attempt))
+	return post()
+
+
 def text2img(
 	prompt: str,
 	negative_prompt: Optional[str] = None,
@@ -98,18 +109,10 @@ def text2img(
 
 	# FLUX.1-schnell 不支持 negative_prompt（文档中无此字段），忽略
 
-	with httpx.Client(
-		base_url=cfg.base_url,
-		timeout=httpx.Timeout(cfg.timeout_s),
-		headers={
-			"Authorization": f"Bearer {cfg.api_key}",
-			"Content-Type": "application/json",
-		},
-	) as client:
-		import time
-		t0 = time.perf_counter()
-		r = client.post("/images/generations", json=payload)
-		elapsed_ms = (time.perf_counter() - t0) * 1000
+	client = get_session(cfg.base_url, cfg.api_key, cfg.timeout_s)
+	t0 = time.perf_counter()
+	r = _post_with_retry(client, payload)
+	elapsed_ms = (time.perf_counter() - t0) * 1000
 
 	if r.status_code < 200 or r.status_code >= 300:
 		body_snip = (r.text or "")[:500]
@@ -125,7 +128,7 @@ def text2img(
 		raise ValueError("FLUX image URL empty")
 
 	# 下载图片
-	img_r = httpx.get(url, timeout=30)
+	img_r = get_download_session().get(url)
 	img_r.raise_for_status()
 	img = Image.open(io.BytesIO(img_r.content)).convert("RGB")
 
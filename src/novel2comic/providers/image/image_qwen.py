@@ -5,7 +5,9 @@ providers/image/image_qwen.py
 硅基流动 Qwen/Qwen-Image（文生图）与 Qwen/Qwen-Image-Edit（图生图）。
 - T2I: image_size=1664x928, steps=50, cfg=4.0（文档推荐，中文更稳）
 - Edit: 不传 image_size，输出跟随 ref 尺寸
-- 429/503/504 指数退避重试
+- 429/503/504 与传输错误按 providers/session 的统一重试策略（指数退避 + 抖动）重试；请求经 providers/limiter 的 images 家族 AIMD 限流
+- API 请求与 URL 下载都走 providers/session 的共享连接池
+- 带 seed 的相同请求在途合并（core/singleflight）；不带 seed 的请求本就期望不同结果，不合并
 - URL 1 小时有效，必须立刻下载落盘
 """
 
@@ -13,34 +15,34 @@ from __future__ import annotations
 
 import base64
 import io
-import os
 import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
 import httpx
-
-try:
-	from dotenv import load_dotenv
-except Exception:
-	load_dotenv = None
-
 from PIL import Image
 
 from novel2comic.core.image_prompt import QWEN_NEGATIVE
-from novel2comic.core.io import find_env_file, find_project_root
+from novel2comic.core.singleflight import get_group, request_key
+from novel2comic.providers import limiter
+from novel2comic.providers.breaker import CircuitOpenError
+from novel2comic.providers.session import (
+	get_download_session,
+	get_session,
+	load_provider_env,
+	require_api_key,
+	resolve_base_url,
+	resolve_timeout,
+	retry_policy,
+)
 
 MODEL_T2I = "Qwen/Qwen-Image"
 MODEL_EDIT = "Qwen/Qwen-Image-Edit"
 DEFAULT_IMAGE_SIZE = "1664x928"
 DEFAULT_STEPS = 50
 DEFAULT_CFG = 4.0
-MAX_RETRIES = 3
-DOWNLOAD_TIMEOUT_S = 60
-RETRY_BACKOFF_BASE = 2
 ERR_BODY_MAX_LEN = 500
-DEFAULT_BASE_URL = "https://api.siliconflow.cn/v1"
 DEFAULT_TIMEOUT_S = 120
 
 
@@ -51,63 +53,58 @@ class QwenImageConfig:
 	timeout_s: float
 
 
-def _load_dotenv_if_present(project_root: Path) -> None:
-	if load_dotenv is None:
-		return
-	env_path = find_env_file(project_root)
-	if env_path.exists():
-		load_dotenv(dotenv_path=str(env_path), override=False)
-
-
 def load_qwen_config(
 	project_root: Optional[str | Path] = None,
 	api_key: Optional[str] = None,
 	base_url: Optional[str] = None,
 	timeout_s: Optional[float] = None,
 ) -> QwenImageConfig:
-	root = find_project_root(project_root or __file__)
-	_load_dotenv_if_present(root)
+	load_provider_env(project_root)
+	return QwenImageConfig(
+		api_key=require_api_key(api_key),
+		base_url=resolve_base_url(base_url),
+		timeout_s=resolve_timeout(timeout_s, DEFAULT_TIMEOUT_S),
+	)
 
-	key = (api_key or os.environ.get("SILICONFLOW_API_KEY", "")).strip()
-	if not key:
-		raise ValueError("Missing SILICONFLOW_API_KEY")
 
-	try:
-		from novel2comic.core.config_loader import get_siliconflow
-		sf = get_siliconflow()
-		url = (base_url or os.environ.get("SILICONFLOW_BASE_URL", "") or sf.get("base_url", "") or "") or DEFAULT_BASE_URL
-		t = float(timeout_s or os.environ.get("SILICONFLOW_TIMEOUT_S", "") or sf.get("timeout_s", "") or DEFAULT_TIMEOUT_S)
-	except Exception:
-		url = (base_url or os.environ.get("SILICONFLOW_BASE_URL", "")).strip() or DEFAULT_BASE_URL
-		t = float(timeout_s or os.environ.get("SILICONFLOW_TIMEOUT_S", "") or DEFAULT_TIMEOUT_S)
-
-	return QwenImageConfig(api_key=key, base_url=url, timeout_s=t)
+def _session(cfg: QwenImageConfig) -> httpx.Client:
+	return get_session(cfg.base_url, cfg.api_key, cfg.timeout_s)
 
 
 def _download_url(url: str) -> bytes:
 	"""立刻下载 URL（1 小时有效），返回 png bytes。"""
-	headers = {"User-Agent": "Mozilla/5.0 (compatible; novel2comic/1.0)"}
-	with httpx.Client(timeout=DOWNLOAD_TIMEOUT_S, follow_redirects=True) as dl_client:
-		r = dl_client.get(url, headers=headers)
+	r = get_download_session().get(url)
 	r.raise_for_status()
 	return r.content
 
 
 def _do_request(client: httpx.Client, payload: dict) -> tuple[bytes, dict]:
+	"""带 seed 时按 payload 合并在途请求；领头者与等待者各拿一份 meta 拷贝（调用方会原地补字段）。"""
+	if payload.get("seed") is None:
+		return _do_request_once(client, payload)
+	(png_bytes, meta), _ = get_group("images").do(
+		request_key("/images/generations", payload),
+		lambda: _do_request_once(client, payload),
+	)
+	return png_bytes, dict(meta)
+
+
+def _do_request_once(client: httpx.Client, payload: dict) -> tuple[bytes, dict]:
 	"""
 	POST /images/generations，解析 images[0].url，立刻 GET 下载，返回 (png_bytes, meta)。
-	429/503/504 指数退避重试最多 3 次。
+	429/503/504 与传输错误按 retry_policy() 退避重试（默认最多 3 次）。
 	"""
+	policy = retry_policy()
 	last_err = None
-	for attempt in range(MAX_RETRIES):
+	for attempt in range(policy.max_attempts):
 		try:
 			t0 = time.perf_counter()
-			r = client.post("/images/generations", json=payload)
+			r = limiter.send("images", lambda: client.post("/images/generations", json=payload))
 			elapsed_ms = (time.perf_counter() - t0) * 1000
 
-			if r.status_code in (429, 503, 504):
-				if attempt < MAX_RETRIES - 1:
-					time.sleep(RETRY_BACKOFF_BASE ** attempt)
+			if policy.should_retry_status(r.status_code):
+				if attempt < policy.max_attempts - 1:
+					time.sleep(policy.delay(attempt))
 					continue
 				body = (r.text or "")[:ERR_BODY_MAX_LEN]
 				trace = r.headers.get("x-siliconcloud-trace-id", "")
@@ -136,12 +133,12 @@ def _do_request(client: httpx.Client, payload: dict) -> tuple[bytes, dict]:
 			}
 			return png_bytes, meta
 
-		except ValueError:
+		except (ValueError, CircuitOpenError):
 			raise
 		except Exception as e:
 			last_err = e
-			if attempt < MAX_RETRIES - 1:
-				time.sleep(RETRY_BACKOFF_BASE ** attempt)
+			if attempt < policy.max_attempts - 1:
+				time.sleep(policy.delay(attempt))
 				continue
 			raise last_err
 
@@ -177,15 +174,7 @@ def generate_t2i(
 	if seed is not None:
 		payload["seed"] = seed
 
-	with httpx.Client(
-		base_url=api_cfg.base_url,
-		timeout=httpx.Timeout(api_cfg.timeout_s),
-		headers={
-			"Authorization": f"Bearer {api_cfg.api_key}",
-			"Content-Type": "application/json",
-		},
-	) as client:
-		png_bytes, meta = _do_request(client, payload)
+	png_bytes, meta = _do_request(_session(api_cfg), payload)
 
 	meta["model"] = MODEL_T2I
 	meta["image_size"] = image_size
@@ -226,15 +215,7 @@ def edit(
 	if seed is not None:
 		payload["seed"] = seed
 
-	with httpx.Client(
-		base_url=api_cfg.base_url,
-		timeout=httpx.Timeout(api_cfg.timeout_s),
-		headers={
-			"Authorization": f"Bearer {api_cfg.api_key}",
-			"Content-Type": "application/json",
-		},
-	) as client:
-		png_bytes, meta = _do_request(client, payload)
+	png_bytes, meta = _do_request(_session(api_cfg), payload)
 
 	meta["model"] = MODEL_EDIT
 	img = Image.open(io.BytesIO(png_bytes)).convert("RGB")
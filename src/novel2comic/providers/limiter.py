@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+providers/limiter.py
+
+按 endpoint 家族（chat / speech / images）共享的 AIMD 自适应并发限流。
+- 加性增：请求成功且延迟平稳时，每个 RTT 约 +increase 个并发（limit += increase / limit）
+- 乘性减：429/503/504、超时或延迟突增（> 基线 EWMA × latency_spike_ratio）时 limit *= backoff；
+  同一 RTT 内的多次过载只减一次，避免并发请求同时回报把 limit 打到底
+- 进程内单例：LLM、VLM、TTS、图像 provider 通过 get_limiter(family) 共用同一个限流器，
+  LLM 与 VLM 同走 /chat/completions，共用 chat 家族
+- 对冲副本（core/hedging）同样经过 send()，占用并发名额
+- 模块级 send / slot 同时经过 providers/breaker 的家族熔断器：熔断中直接抛 CircuitOpenError
+
+配置：configs/siliconflow.yaml 的 concurrency 段；当前 limit 等统计由 record_limits 写入 manifest providers.limits。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import httpx
+
+from novel2comic.core.config_loader import get_siliconflow
+from novel2comic.providers.breaker import CircuitBreaker, get_breaker, is_failure_status
+
+OVERLOAD_STATUS = (429, 503, 504)
+
+
+@dataclass
+class AIMDConfig:
+	initial: float = 4
+	min_limit: float = 1
+	max_limit: float = 32
+	increase: float = 1.0
+	backoff: float = 0.5
+	latency_spike_ratio: float = 4.0  # <=0 不按延迟减
+	ewma_alpha: float = 0.2
+
+
+class AIMDLimiter:
+	"""线程安全的计数信号量，容量 int(limit) 随反馈调整。"""
+
+	def __init__(self, name: str, cfg: Optional[AIMDConfig] = None):
+		self.name = name
+		self.cfg = cfg or AIMDConfig()
+		self.limit = float(min(self.cfg.max_limit, max(self.cfg.min_limit, self.cfg.initial)))
+		self.inflight = 0
+		self.max_inflight = 0
+		self.overloads = 0
+		self.decreases = 0
+		self.baseline_s: Optional[float] = None
+		self._last_cut = float("-inf")
+		self._cond = threading.Condition()
+
+	def acquire(self) -> None:
+		with self._cond:
+			while self.inflight >= max(1, int(self.limit)):
+				self._cond.wait()
+			self.inflight += 1
+			self.max_inflight = max(self.max_inflight, self.inflight)
+
+	def release(self, latency_s: float, overloaded: bool = False) -> None:
+		cfg = self.cfg
+		with self._cond:
+			self.inflight -= 1
+			now = time.monotonic()
+			spike = (
+				cfg.latency_spike_ratio > 0
+				and self.baseline_s is not None
+				and latency_s > self.baseline_s * cfg.latency_spike_ratio
+			)
+			if overloaded:
+				self.overloads += 1
+			if overloaded or spike:
+				if now - self._last_cut >= (self.baseline_s or 0.0):
+					self.limit = max(cfg.min_limit, self.limit * cfg.backoff)
+					self._last_cut = now
+					self.decreases += 1
+			else:
+				self.limit = min(cfg.max_limit, self.limit + cfg.increase / max(1.0, self.limit))
+				if self.baseline_s is None:
+					self.baseline_s = latency_s
+				else:
+					self.baseline_s += cfg.ewma_alpha * (latency_s - self.baseline_s)
+			self._cond.notify_all()
+
+	@contextmanager
+	def slot(self) -> Iterator["_Report"]:
+		"""
+		占一个并发名额；块内收到响应头后调用 report.status(code)，以响应头耗时回报。
+		超时计为过载；其他异常或未回报状态时只释放名额，不影响 limit。
+		"""
+		self.acquire()
+		rep = _Report(t0=time.perf_counter())
+		try:
+			yield rep
+		except httpx.TimeoutException:
+			rep.overloaded = True
+			rep.latency_s = time.perf_counter() - rep.t0
+			raise
+		finally:
+			if rep.latency_s is None:
+				self._release_neutral()
+			else:
+				self.release(rep.latency_s, rep.overloaded)
+
+	def send(self, fn: Callable[[], httpx.Response]) -> httpx.Response:
+		"""占一个并发名额执行一次整包请求，按状态码 / 超时回报。"""
+		with self.slot() as rep:
+			r = fn()
+			rep.status(r.status_code)
+			return r
+
+	def _release_neutral(self) -> None:
+		with self._cond:
+			self.inflight -= 1
+			self._cond.notify_all()
+
+	def stats(self) -> Dict[str, Any]:
+		with self._cond:
+			return {
+				"limit": round(self.limit, 2),
+				"inflight": self.inflight,
+				"max_inflight": self.max_inflight,
+				"overloads": self.overloads,
+				"decreases": self.decreases,
+				"baseline_ms": round(self.baseline_s * 1000, 1) if self.baseline_s is not None else None,
+			}
+
+
+@dataclass
+class _Report:
+	t0: float
+	latency_s: Optional[float] = None
+	overloaded: bool = False
+	code: Optional[int] = None
+
+	def status(self, code: int) -> None:
+		self.latency_s = time.perf_counter() - self.t0
+		self.overloaded = code in OVERLOAD_STATUS
+		self.code = code
+
+
+_LIMITERS: Dict[str, AIMDLimiter] = {}
+_LOCK = threading.Lock()
+
+
+def _config() -> Optional[AIMDConfig]:
+	cc = get_siliconflow().get("concurrency") or {}
+	if not cc.get("enabled", False):
+		return None
+	d = AIMDConfig()
+	return AIMDConfig(
+		initial=float(cc.get("initial", d.initial)),
+		min_limit=float(cc.get("min_limit", d.min_limit)),
+		max_limit=float(cc.get("max_limit", d.max_limit)),
+		increase=float(cc.get("increase", d.increase)),
+		backoff=float(cc.get("backoff", d.backoff)),
+		latency_spike_ratio=float(cc.get("latency_spike_ratio", d.latency_spike_ratio)),
+	)
+
+
+def get_limiter(family: str) -> Optional[AIMDLimiter]:
+	"""进程内共享的家族限流器；concurrency.enabled=false 时返回 None。"""
+	with _LOCK:
+		if family in _LIMITERS:
+			return _LIMITERS[family]
+		cfg = _config()
+		if cfg is None:
+			return None
+		_LIMITERS[family] = AIMDLimiter(family, cfg)
+		return _LIMITERS[family]
+
+
+def send(family: str, fn: Callable[[], httpx.Response]) -> httpx.Response:
+	"""经家族熔断器与限流器发送一次整包请求；均未启用时直接调用。"""
+	with slot(family) as rep:
+		r = fn()
+		rep.status(r.status_code)
+		return r
+
+
+@contextmanager
+def slot(family: str) -> Iterator[_Report]:
+	"""
+	占用家族的并发名额并接受熔断检查（流式请求整个流期间占用）；块内收到响应头后调用 rep.status(code)。
+	熔断中抛 CircuitOpenError；限流器未启用时只返回一个不生效的回报对象。
+	"""
+	breaker = get_breaker(family)
+	if breaker is not None:
+		breaker.before()
+	limiter = get_limiter(family)
+	ctx = limiter.slot() if limiter is not None else nullcontext(_Report(t0=time.perf_counter()))
+	rep: Optional[_Report] = None
+	try:
+		with ctx as rep:
+			yield rep
+	except httpx.TransportError:
+		if breaker is not None:
+			breaker.failure()
+		raise
+	except BaseException:
+		_settle(breaker, rep.code if rep is not None else None)
+		raise
+	_settle(breaker, rep.code)
+
+
+def _settle(breaker: Optional[CircuitBreaker], code: Optional[int]) -> None:
+	if breaker is None:
+		return
+	if code is None:
+		breaker.release_probe()
+	elif is_failure_status(code):
+		breaker.failure()
+	else:
+		breaker.success()
+
+
+def record_limits(providers: Dict[str, Any]) -> None:
+	"""把已创建的限流器统计写入 manifest providers.limits。"""
+	with _LOCK:
+		snapshot = {name: lim.stats() for name, lim in _LIMITERS.items()}
+	if snapshot:
+		providers["limits"] = snapshot
+
+
+def reset_limiters() -> None:
+	"""清空单例（测试用）。"""
+	with _LOCK:
+		_LIMITERS.clear()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+providers/llm/cascade.py
+
+分级模型（cascade）：skill 先用小模型，校验失败或窗口复杂时再升级到大模型（client 默认模型）。
+- 配置：configs/siliconflow.yaml 的 llm_cascade.<skill>（small_model / max_quotes / max_speakers）
+- 复杂度：窗口内非旁白 segment 数（引号对白/内心独白）与已知说话人数，超过阈值直接用大模型
+- run_cascade：按模型顺序尝试，前一级任何异常（含 validator 报错）都升级到下一级；
+  熔断中（CircuitOpenError）不升级，直接向上抛（同一家族，换模型也发不出去）
+
+llm_client 只需 chat_json(system_prompt, user_prompt, model=...)；model=None 表示用 client 默认模型。
+chat_json_with_model 的 validate / fresh 只在 client 支持时透传（SiliconFlowLLMClient：校验通过才写缓存、重试跳过缓存），
+否则在调用后本地校验。
+"""
+
+from __future__ import annotations
+
+import inspect
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from novel2comic.core.config_loader import get_siliconflow
+from novel2comic.providers.breaker import CircuitOpenError
+
+T = TypeVar("T")
+
+
+@dataclass
+class CascadeConfig:
+	"""small_model 为空表示不启用 cascade；max_quotes/max_speakers<=0 表示不按该项判定复杂。"""
+	small_model: str = ""
+	max_quotes: int = 0
+	max_speakers: int = 0
+
+	def models_for(self, shots: Sequence[Dict[str, Any]] = ()) -> List[Optional[str]]:
+		"""本窗口的尝试顺序：[小模型, None(大模型)] 或 [None]。"""
+		if not self.small_model or is_complex(shots, self.max_quotes, self.max_speakers):
+			return [None]
+		return [self.small_model, None]
+
+
+def load_cascade(skill: str) -> CascadeConfig:
+	cfg = (get_siliconflow().get("llm_cascade") or {}).get(skill) or {}
+	return CascadeConfig(
+		small_model=str(cfg.get("small_model") or "").strip(),
+		max_quotes=int(cfg.get("max_quotes") or 0),
+		max_speakers=int(cfg.get("max_speakers") or 0),
+	)
+
+
+def window_complexity(shots: Sequence[Dict[str, Any]]) -> Tuple[int, int]:
+	"""(非旁白 segment 数, 已知说话人数)。shot 无 speech.segments 时均为 0。"""
+	quotes = 0
+	speakers = set()
+	for shot in shots:
+		for seg in (shot.get("speech") or {}).get("segments") or []:
+			if seg.get("kind", "narration") != "narration":
+				quotes += 1
+			speaker = seg.get("speaker")
+			if speaker and speaker != "unknown":
+				speakers.add(speaker)
+	return quotes, len(speakers)
+
+
+def is_complex(shots: Sequence[Dict[str, Any]], max_quotes: int, max_speakers: int) -> bool:
+	quotes, speakers = window_complexity(shots)
+	return (max_quotes > 0 and quotes > max_quotes) or (max_speakers > 0 and speakers > max_speakers)
+
+
+def accepts_kwarg(fn: Callable[..., Any], name: str) -> bool:
+	"""fn 是否接受关键字参数 name（含 **kwargs）；用于兼容只实现基础签名的 client。"""
+	try:
+		params = inspect.signature(fn).parameters
+	except (TypeError, ValueError):
+		return False
+	return name in params or any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values())
+
+
+def chat_json_with_model(
+	llm_client: Any,
+	system_prompt: str,
+	user_prompt: str,
+	model: Optional[str],
+	validate: Optional[Callable[[Any], None]] = None,
+	fresh: bool = False,
+) -> Any:
+	"""
+	model 为 None 时不传 model 参数（兼容只实现 chat_json(system, user) 的 client）。
+	validate：校验函数（不通过抛异常）；client 支持时由 client 在写缓存前调用，否则这里调用后本地校验。
+	fresh：重试时跳过缓存读取（client 支持时透传）。
+	"""
+	fn = llm_client.chat_json
+	kwargs: Dict[str, Any] = {}
+	if model is not None:
+		kwargs["model"] = model
+	if fresh and accepts_kwarg(fn, "fresh"):
+		kwargs["fresh"] = True
+	local_validate = validate
+	if validate is not None and accepts_kwarg(fn, "validate"):
+		kwargs["validate"] = validate
+		local_validate = None
+	result = fn(system_prompt, user_prompt, **kwargs)
+	if local_validate is not None:
+		local_validate(result)
+	return result
+
+
+def answering_model(llm_client: Any, model: Optional[str]) -> str:
+	"""实际应答的模型名：cascade 指定的小模型，或 client 默认模型（model=None）。"""
+	return model or str(getattr(getattr(llm_client, "cfg", None), "model", "") or "")
+
+
+def join_models(models: Sequence[str]) -> str:
+	"""多块 / 多窗口的应答模型：按出现顺序去重，逗号分隔。"""
+	out: List[str] = []
+	for m in models:
+		if m and m not in out:
+			out.append(m)
+	return ",".join(out)
+
+
+def run_cascade(models: Sequence[Optional[str]], attempt: Callable[[Optional[str]], T]) -> T:
+	"""依次用各级模型调用 attempt(model)；非最后一级失败即升级，最后一级的异常与 CircuitOpenError 向上抛。"""
+	last = len(models) - 1
+	for i, model in enumerate(models):
+		try:
+			return attempt(model)
+		except CircuitOpenError:
+			raise
+		except Exception:
+			if i == last:
+				raise
+	raise RuntimeError("empty cascade")
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+providers/llm/llm_cache.py
+
+chat_json 的持久化响应缓存（sqlite，标准库，无额外依赖）。
+- key = sha256(model, messages, temperature, top_p, response_format) 的规范化 JSON
+- 只缓存通过调用方校验的 JSON 响应（chat_json(validate=...)）；解析失败、截断或校验不过的不落盘
+- 淘汰：读到过期条目即删除；写入时按 TTL 清理，并按最近使用时间保留 max_entries 条
+- 线程安全：窗口并发调用共用一个连接，加锁串行访问
+- hits / misses / writes 计数供 manifest providers.llm 记录
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CACHE_KEY_FIELDS = ("model", "messages", "temperature", "top_p", "response_format")
+
+
+def cache_key(payload: Dict[str, Any]) -> str:
+	"""只取影响输出的请求字段，规范化后取 sha256。"""
+	material = {k: payload.get(k) for k in CACHE_KEY_FIELDS}
+	raw = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+	return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+	"""
+	path：sqlite 文件路径（父目录自动创建）
+	ttl_s：条目有效期（<=0 不过期）
+	max_entries：保留的最大条目数（<=0 不限），超出按 last_used 淘汰最旧的
+	bypass：为 True 时不读缓存（每次都请求），但仍写入新结果，用于强制刷新
+	"""
+
+	def __init__(self, path: Path, ttl_s: float = 0, max_entries: int = 0, bypass: bool = False):
+		self.path = Path(path)
+		self.ttl_s = ttl_s
+		self.max_entries = max_entries
+		self.bypass = bypass
+		self.hits = 0
+		self.misses = 0
+		self.writes = 0
+		self._lock = threading.Lock()
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+		self._conn.execute(
+			"CREATE TABLE IF NOT EXISTS responses ("
+			"key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+		)
+		self._conn.commit()
+
+	def close(self) -> None:
+		with self._lock:
+			self._conn.close()
+
+	def _expired(self, created_at: float, now: float) -> bool:
+		return self.ttl_s > 0 and now - created_at > self.ttl_s
+
+	def get(self, key: str) -> Optional[Dict[str, Any]]:
+		with self._lock:
+			if self.bypass:
+				self.misses += 1
+				return None
+			now = time.time()
+			row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+			if row is None or self._expired(row[1], now):
+				if row is not None:
+					self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+					self._conn.commit()
+				self.misses += 1
+				return None
+			self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+			self._conn.commit()
+			self.hits += 1
+		return json.loads(row[0])
+
+	def put(self, key: str, value: Dict[str, Any]) -> None:
+		raw = json.dumps(value, ensure_ascii=False)
+		with self._lock:
+			now = time.time()
+			self._conn.execute(
+				"INSERT OR REPLACE INTO responses (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+				(key, raw, now, now),
+			)
+			self.writes += 1
+			self._evict(now)
+			self._conn.commit()
+
+	def delete(self, key: str) -> None:
+		"""删除条目（缓存内容未通过调用方校验时）。"""
+		with self._lock:
+			self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+			self._conn.commit()
+
+	def _evict(self, now: float) -> None:
+		if self.ttl_s > 0:
+			self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_s,))
+		if self.max_entries > 0:
+			self._conn.execute(
+				"DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+				(self.max_entries,),
+			)
+
+	def __len__(self) -> int:
+		with self._lock:
+			return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			return {"hits": self.hits, "misses": self.misses, "writes": self.writes, "bypass": self.bypass}
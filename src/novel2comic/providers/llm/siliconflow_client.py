@@ -5,7 +5,18 @@ providers/llm/siliconflow_client.py
 这个文件做什么：
 - 提供一个极薄的 SiliconFlow LLM Client，供 skill 层调用。
 - 支持从项目根目录的 .env 读取配置（推荐），避免你在 shell 里 export。
-- 对外只暴露一个方法：chat_json(system_prompt, user_prompt) -> dict
+- 对外只暴露一个方法：chat_json(system_prompt, user_prompt, model=None) -> dict
+- 可选持久化响应缓存（llm_cache.LLMCache）：同一请求重跑直接命中，hits/misses 记入 manifest；
+  传入 validate 时只有通过校验的响应才写缓存（命中但校验不过的条目删除后重新请求），fresh=True（重试）跳过缓存读取
+- chat_json_stream：SSE 流式输出，目标数组（如 patch.shots）的元素一闭合即回调；流被截断时保留有效前缀
+- 响应 JSON 先严格解析，失败再走 core/json_repair 本地修复（代码块、尾逗号等），修不好才报错让上层重试；
+  整包响应被截断时报错（不把有效前缀当完整结果、不写缓存），只有流式调用按截断返回有效前缀
+- 每次调用估算 prompt token（core/prompt_codec.estimate_tokens），并累计网关返回的 usage.prompt_tokens
+- 可选请求对冲（core/hedging.Hedger）：/chat/completions 超过近期 p95 未返回时发副本，取先返回者（流式不对冲）
+- 相同请求在途合并（core/singleflight，key 同缓存 key）：首个响应返回前的重复调用等待同一结果（流式不合并）
+- 请求经 providers/limiter 的 chat 家族 AIMD 限流（与 VLM 共用）
+- chat_json / chat_json_stream 可按次指定 model（分级模型 cascade 用），各模型调用次数记入 usage().model_calls
+- .env / base_url / timeout 解析与 HTTP 连接池走 providers/session（与 TTS / VLM / 图像共享）
 
 配置来源优先级（从高到低）：
 1) 显式传参（model/base_url/api_key）
@@ -19,22 +30,27 @@ providers/llm/siliconflow_client.py
 
 from __future__ import annotations
 
+import copy
 import json
 import os
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
 
 import httpx
 
-try:
-	# python-dotenv：从 .env 加载到 os.environ
-	from dotenv import load_dotenv
-except Exception:  # pragma: no cover
-	load_dotenv = None
-
 from novel2comic.core.config_loader import get_siliconflow
-from novel2comic.core.io import find_env_file, find_project_root
+from novel2comic.core.hedging import Hedger, load_hedger
+from novel2comic.core.json_repair import TruncatedJSONError, loads_tolerant
+from novel2comic.core.json_stream import JsonArrayStream
+from novel2comic.core.prompt_codec import estimate_tokens
+from novel2comic.core.singleflight import get_group, record_singleflight
+from novel2comic.providers import limiter
+from novel2comic.providers.breaker import record_breaker_stats
+from novel2comic.providers.cassette import OFF, cassette_mode, record_cassette
+from novel2comic.providers.session import get_session, load_provider_env, require_api_key, resolve_base_url, resolve_timeout
+from novel2comic.providers.llm.llm_cache import LLMCache, cache_key
 
 
 @dataclass
@@ -46,23 +62,47 @@ class SiliconFlowConfig:
 
 
 class SiliconFlowLLMClient:
-	def __init__(self, cfg: SiliconFlowConfig):
+	def __init__(self, cfg: SiliconFlowConfig, cache: Optional[LLMCache] = None, hedger: Optional[Hedger] = None):
 		self.cfg = cfg
-		self._client = httpx.Client(
-			base_url=cfg.base_url,
-			timeout=httpx.Timeout(cfg.timeout_s),
-			headers={
-				"Authorization": f"Bearer {cfg.api_key}",
-				"Content-Type": "application/json",
-			},
-		)
+		self.cache = cache
+		self.hedger = hedger
+		self._stats_lock = threading.Lock()
+		self.prompt_stats: Dict[str, int] = {"calls": 0, "est_tokens": 0, "max_est_tokens": 0, "prompt_tokens": 0, "json_repaired": 0}
+		self.model_calls: Dict[str, int] = {}
+		self._client = get_session(cfg.base_url, cfg.api_key, cfg.timeout_s)
 
 	def close(self) -> None:
-		self._client.close()
+		# 共享会话不在这里关闭（见 providers/session.close_sessions）
+		if self.cache is not None:
+			self.cache.close()
+		if self.hedger is not None:
+			self.hedger.close()
+
+	def usage(self) -> Dict[str, Any]:
+		"""manifest providers.llm 记录：provider/model + 缓存命中统计。"""
+		out: Dict[str, Any] = {"provider": "siliconflow", "model": self.cfg.model}
+		if self.cache is not None:
+			out["cache"] = self.cache.stats()
+		if self.hedger is not None:
+			out["hedge"] = self.hedger.stats()
+		with self._stats_lock:
+			out["prompt"] = dict(self.prompt_stats)
+			if self.model_calls:
+				out["model_calls"] = dict(self.model_calls)
+		return out
+
+	def _record_prompt(self, system_prompt: str, user_prompt: str, model: str) -> None:
+		est = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+		with self._stats_lock:
+			self.model_calls[model] = self.model_calls.get(model, 0) + 1
+			st = self.prompt_stats
+			st["calls"] += 1
+			st["est_tokens"] += est
+			st["max_est_tokens"] = max(st["max_est_tokens"], est)
 
-	def chat_json(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+	def _build_payload(self, system_prompt: str, user_prompt: str, model: Optional[str] = None) -> Dict[str, Any]:
 		payload: Dict[str, Any] = {
-			"model": self.cfg.model,
+			"model": model or self.cfg.model,
 			"messages": [
 				{"role": "system", "content": system_prompt},
 				{"role": "user", "content": user_prompt},
@@ -74,8 +114,147 @@ class SiliconFlowLLMClient:
 		# 尽量启用 JSON mode：能显著减少 Markdown/废话
 		# 如果你的网关不支持，会返回 4xx；到时候你注释掉这一行即可。
 		payload["response_format"] = {"type": "json_object"}
+		return payload
+
+	def chat_json(
+		self,
+		system_prompt: str,
+		user_prompt: str,
+		model: Optional[str] = None,
+		validate: Optional[Callable[[Any], None]] = None,
+		fresh: bool = False,
+	) -> Dict[str, Any]:
+		"""
+		validate(result)：调用方校验，不通过时抛异常；通过后才写缓存。
+		fresh：跳过缓存读取（重试时使用，避免重复拿到刚被拒绝的响应），结果仍会写入。
+		"""
+		payload = self._build_payload(system_prompt, user_prompt, model)
+		self._record_prompt(system_prompt, user_prompt, payload["model"])
+
+		key = cache_key(payload)
+		if self.cache is not None and not fresh:
+			cached = self.cache.get(key)
+			if cached is not None:
+				try:
+					if validate is not None:
+						validate(cached)
+					return cached
+				except Exception:
+					# 旧条目不再通过校验：删掉后按未命中处理
+					self.cache.delete(key)
+
+		result, _ = get_group("chat").do(key, lambda: self._post_chat(payload))
+		# 领头者与等待者各拿一份拷贝：共享对象只读，任何一方修改自己的结果都不影响其他线程
+		result = copy.deepcopy(result)
+		if validate is not None:
+			validate(result)
+		if self.cache is not None:
+			self.cache.put(key, result)
+		return result
 
-		r = self._client.post("/chat/completions", json=payload)
+	def chat_json_stream(
+		self,
+		system_prompt: str,
+		user_prompt: str,
+		array_path: Sequence[str],
+		on_item: Optional[Callable[[Any], None]] = None,
+		model: Optional[str] = None,
+		validate: Optional[Callable[[Any], None]] = None,
+		fresh: bool = False,
+	) -> Tuple[Dict[str, Any], bool]:
+		"""
+		流式 chat_json。array_path 指向输出中的补丁数组（如 ("patch", "shots")），
+		每个元素闭合即调用 on_item（回调抛异常会中止请求）。
+		返回 (结果, 是否完整)：流被截断或整体 JSON 不合法时，结果为已闭合元素组成的有效前缀，且不写缓存。
+		validate / fresh 同 chat_json：完整结果在 on_item 全部回调后校验，通过才写缓存；
+		命中缓存但校验不过时删除该条目并抛出（on_item 已回放，调用方以 fresh=True 重试）。
+		"""
+		payload = self._build_payload(system_prompt, user_prompt, model)
+		self._record_prompt(system_prompt, user_prompt, payload["model"])
+
+		key = cache_key(payload) if self.cache is not None else ""
+		if self.cache is not None and not fresh:
+			cached = self.cache.get(key)
+			if cached is not None:
+				if on_item is not None:
+					for item in _dig(cached, array_path):
+						on_item(item)
+				if validate is not None:
+					try:
+						validate(cached)
+					except Exception:
+						self.cache.delete(key)
+						raise
+				return cached, True
+
+		stream = JsonArrayStream(path=tuple(array_path))
+		with limiter.slot("chat") as rep, self._client.stream("POST", "/chat/completions", json=dict(payload, stream=True)) as r:
+			rep.status(r.status_code)
+			if r.status_code < 200 or r.status_code >= 300:
+				body = r.read().decode("utf-8", errors="replace")
+				if len(body) > 1000:
+					body = body[:1000] + "...(truncated)"
+				raise ValueError(f"SiliconFlow HTTP {r.status_code}: {body}")
+			try:
+				for line in r.iter_lines():
+					delta = self._parse_sse_line(line)
+					if not delta:
+						continue
+					for item in stream.feed(delta):
+						if on_item is not None:
+							on_item(item)
+			except httpx.TransportError:
+				# 连接中断：保留已闭合元素
+				pass
+
+		try:
+			result = self._loads(stream.text)
+		except ValueError:
+			result = None
+		if not isinstance(result, dict):
+			return stream.salvage(), False
+		if stream.complete:
+			if validate is not None:
+				validate(result)
+			if self.cache is not None:
+				self.cache.put(key, result)
+			return result, True
+		# 截断：修复后的有效前缀（含数组前的标量字段）；不写缓存
+		return result, False
+
+	def _parse_sse_line(self, line: str) -> str:
+		"""SSE 行 -> 本块增量文本；非 data 行、[DONE] 与无内容的块返回空串。"""
+		line = line.strip()
+		if not line.startswith("data:"):
+			return ""
+		data = line[5:].strip()
+		if not data or data == "[DONE]":
+			return ""
+		try:
+			obj = json.loads(data)
+		except ValueError:
+			return ""
+		prompt_tokens = (obj.get("usage") or {}).get("prompt_tokens") if isinstance(obj, dict) else None
+		if isinstance(prompt_tokens, int):
+			with self._stats_lock:
+				self.prompt_stats["prompt_tokens"] += prompt_tokens
+		try:
+			return obj["choices"][0]["delta"].get("content") or ""
+		except (KeyError, IndexError, TypeError, AttributeError):
+			return ""
+
+	def _loads(self, content: str, allow_truncated: bool = True) -> Any:
+		obj, repaired = loads_tolerant(content, allow_truncated=allow_truncated)
+		if repaired:
+			with self._stats_lock:
+				self.prompt_stats["json_repaired"] += 1
+		return obj
+
+	def _post_chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+		def post() -> httpx.Response:
+			return limiter.send("chat", lambda: self._client.post("/chat/completions", json=payload))
+
+		r = self.hedger.call("/chat/completions", post) if self.hedger is not None else post()
 
 		if r.status_code < 200 or r.status_code >= 300:
 			body = r.text
@@ -84,6 +263,10 @@ class SiliconFlowLLMClient:
 			raise ValueError(f"SiliconFlow HTTP {r.status_code}: {body}")
 
 		data = r.json()
+		prompt_tokens = (data.get("usage") or {}).get("prompt_tokens") if isinstance(data, dict) else None
+		if isinstance(prompt_tokens, int):
+			with self._stats_lock:
+				self.prompt_stats["prompt_tokens"] += prompt_tokens
 
 		try:
 			content = data["choices"][0]["message"]["content"]
@@ -91,24 +274,63 @@ class SiliconFlowLLMClient:
 			raise ValueError(f"Unexpected response shape: {json.dumps(data, ensure_ascii=False)[:1000]}")
 
 		try:
-			return json.loads(content)
-		except Exception:
+			return self._loads(content, allow_truncated=False)
+		except TruncatedJSONError:
+			raise ValueError(f"LLM output truncated ({len(content)} chars)")
+		except ValueError:
 			snip = content
 			if len(snip) > 1000:
 				snip = snip[:1000] + "...(truncated)"
 			raise ValueError(f"LLM output is not valid JSON. content_snip={snip}")
 
 
-def _load_dotenv_if_present(project_root: Path) -> None:
+def _dig(data: Any, path: Sequence[str]) -> list:
+	for k in path:
+		data = data.get(k) if isinstance(data, dict) else None
+	return data if isinstance(data, list) else []
+
+
+def _load_llm_cache(root: Path, sf: Dict[str, Any], bypass: Optional[bool]) -> Optional[LLMCache]:
 	"""
-	如果项目根目录存在 .env，则加载到 os.environ。
+	configs/siliconflow.yaml 的 llm_cache 段；env LLM_CACHE_ENABLED=0 关闭，LLM_CACHE_BYPASS=1 跳过读取（仍写入）。
+	cassette 录制 / 回放模式下总是跳过读取：否则缓存命中的请求不会经过 transport，录不进 cassette，回放时也不可复现。
 	"""
-	if load_dotenv is None:
-		return
+	cc = sf.get("llm_cache") or {}
+	enabled_env = os.environ.get("LLM_CACHE_ENABLED", "").strip().lower()
+	enabled = enabled_env in ("1", "true", "yes") if enabled_env else bool(cc.get("enabled", False))
+	if not enabled:
+		return None
+	if bypass is None:
+		bypass = os.environ.get("LLM_CACHE_BYPASS", "").strip().lower() in ("1", "true", "yes") or bool(cc.get("bypass", False))
+	bypass = bypass or cassette_mode() != OFF
+	path = Path(cc.get("path") or ".cache/llm_cache.sqlite")
+	if not path.is_absolute():
+		path = root / path
+	return LLMCache(
+		path,
+		ttl_s=float(cc.get("ttl_days", 30) or 0) * 86400,
+		max_entries=int(cc.get("max_entries", 20000) or 0),
+		bypass=bypass,
+	)
 
-	env_path = find_env_file(project_root)
-	if env_path.exists():
-		load_dotenv(dotenv_path=str(env_path), override=False)
+
+def record_llm_usage(providers: Dict[str, Any], stage: str, usage: Dict[str, Any]) -> None:
+	"""把 client.usage() 写入 manifest providers.llm：provider/model 取最近一次，缓存统计按 stage 分开记录。"""
+	entry = providers.setdefault("llm", {})
+	entry["provider"] = usage["provider"]
+	entry["model"] = usage["model"]
+	if "cache" in usage:
+		entry.setdefault("cache", {})[stage] = usage["cache"]
+	if "prompt" in usage:
+		entry.setdefault("prompt", {})[stage] = usage["prompt"]
+	if "hedge" in usage:
+		entry.setdefault("hedge", {})[stage] = usage["hedge"]
+	if "model_calls" in usage:
+		entry.setdefault("model_calls", {})[stage] = usage["model_calls"]
+	limiter.record_limits(providers)
+	record_singleflight(providers)
+	record_breaker_stats(providers)
+	record_cassette(providers)
 
 
 def load_siliconflow_client(
@@ -117,6 +339,7 @@ def load_siliconflow_client(
 	base_url: Optional[str] = None,
 	model: Optional[str] = None,
 	timeout_s: Optional[float] = None,
+	cache_bypass: Optional[bool] = None,
 ) -> SiliconFlowLLMClient:
 	"""
 	加载 SiliconFlow client。
@@ -124,18 +347,12 @@ def load_siliconflow_client(
 	你现在的诉求：不要用 export 环境变量，而是用项目内 .env 存储。
 	所以我们默认会从 project_root/.env 读取（project_root 缺省为当前工作目录）。
 	"""
-	root = find_project_root(project_root or __file__)
-	_load_dotenv_if_present(root)
-
-	key = (api_key or os.environ.get("SILICONFLOW_API_KEY", "")).strip()
-	if not key:
-		raise ValueError("Missing SILICONFLOW_API_KEY (from .env or env)")
+	root = load_provider_env(project_root)
+	key = require_api_key(api_key)
 
 	sf = get_siliconflow()
 	llm_cfg = sf.get("llm") or {}
-	url = (base_url or os.environ.get("SILICONFLOW_BASE_URL", "") or sf.get("base_url", "") or "").strip() or "https://api.siliconflow.cn/v1"
 	m = (model or os.environ.get("SILICONFLOW_MODEL", "") or llm_cfg.get("model", "") or "").strip() or "deepseek-ai/DeepSeek-V3.2"
-	t = float(timeout_s or os.environ.get("SILICONFLOW_TIMEOUT_S", "") or sf.get("timeout_s", "") or 60)
 
-	cfg = SiliconFlowConfig(api_key=key, base_url=url, model=m, timeout_s=t)
-	return SiliconFlowLLMClient(cfg)
\ No newline at end of file
+	cfg = SiliconFlowConfig(api_key=key, base_url=resolve_base_url(base_url), model=m, timeout_s=resolve_timeout(timeout_s, 60))
+	return SiliconFlowLLMClient(cfg, cache=_load_llm_cache(root, sf, cache_bypass), hedger=load_hedger(sf.get("hedge")))
\ No newline at end of file
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+providers/session.py
+
+provider 公共会话层：LLM / TTS / VLM / 图像 provider 共用的 .env 加载、配置解析、连接池与重试策略。
+- load_provider_env / require_api_key / resolve_base_url / resolve_timeout：统一的 .env 与 base_url、timeout_s 解析
+- get_session：按 (base_url, api_key, timeout_s) 共享一个 httpx.Client（连接池、keep-alive、limits 共用），
+  装有 h2 时走 HTTP/2；图片 URL 下载走 get_download_session
+- RetryPolicy：统一的指数退避 + 抖动（jitter），各 provider / stage 的重试等待都由 retry_policy().delay(attempt) 给出
+- add_hook：插桩钩子，所有经共享会话发出的请求在响应时回调 hook(request, response, elapsed_s)
+- 录制 / 回放（providers/cassette）：PROVIDER_CASSETTE=record|replay 时共享会话的 transport 换成 CassetteTransport
+
+限流与熔断仍在 providers/limiter 的 send / slot 中按家族生效；会话层只负责连接与重试节奏。
+配置：configs/siliconflow.yaml 的 session、retry 段。
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+try:
+	from dotenv import load_dotenv
+except ImportError:
+	load_dotenv = None
+
+try:
+	import h2  # noqa: F401
+	_HAS_H2 = True
+except ImportError:
+	_HAS_H2 = False
+
+from novel2comic.core.config_loader import get_siliconflow
+from novel2comic.core.io import find_env_file, find_project_root
+from novel2comic.providers.cassette import REPLAY, REPLAY_API_KEY, cassette_mode, wrap_transport
+
+DEFAULT_BASE_URL = "https://api.siliconflow.cn/v1"
+DEFAULT_TIMEOUT_S = 120
+DOWNLOAD_TIMEOUT_S = 60
+USER_AGENT = "novel2comic/1.0"
+
+Hook = Callable[[httpx.Request, httpx.Response, float], None]
+
+
+def _siliconflow() -> Dict:
+	try:
+		return get_siliconflow()
+	except Exception:
+		return {}
+
+
+def load_provider_env(project_root: Optional[str | Path] = None) -> Path:
+	"""定位项目根目录并加载 .env（不覆盖已有环境变量），返回项目根目录。"""
+	root = find_project_root(project_root or __file__)
+	if load_dotenv is not None:
+		env_path = find_env_file(root)
+		if env_path.exists():
+			load_dotenv(dotenv_path=str(env_path), override=False)
+	return root
+
+
+def require_api_key(api_key: Optional[str] = None) -> str:
+	key = (api_key or os.environ.get("SILICONFLOW_API_KEY", "")).strip()
+	if not key and cassette_mode() == REPLAY:
+		return REPLAY_API_KEY
+	if not key:
+		raise ValueError("Missing SILICONFLOW_API_KEY (from .env or env)")
+	return key
+
+
+def resolve_base_url(base_url: Optional[str] = None) -> str:
+	"""显式传参 > env SILICONFLOW_BASE_URL > siliconflow.yaml base_url > 默认值。"""
+	url = base_url or os.environ.get("SILICONFLOW_BASE_URL", "") or _siliconflow().get("base_url", "") or ""
+	return url.strip() or DEFAULT_BASE_URL
+
+
+def resolve_timeout(timeout_s: Optional[float] = None, default: float = DEFAULT_TIMEOUT_S) -> float:
+	"""显式传参 > env SILICONFLOW_TIMEOUT_S > siliconflow.yaml timeout_s > default。"""
+	return float(timeout_s or os.environ.get("SILICONFLOW_TIMEOUT_S", "") or _siliconflow().get("timeout_s", "") or default)
+
+
+@dataclass
+class SessionConfig:
+	http2: bool = True
+	max_connections: int = 64
+	max_keepalive_connections: int = 32
+	keepalive_expiry_s: float = 30.0
+
+
+@dataclass
+class RetryPolicy:
+	max_attempts: int = 3
+	base_s: float = 1.0
+	max_s: float = 20.0
+	jitter: bool = True
+	retry_status: Tuple[int, ...] = (429, 503, 504)
+
+	def delay(self, attempt: int) -> float:
+		"""第 attempt 次（从 0 计）失败后的等待秒数：base_s × 2^attempt，封顶 max_s；jitter 时取 [d/2, d] 均匀随机。"""
+		d = min(self.max_s, self.base_s * (2 ** attempt))
+		if self.jitter:
+			d = d / 2 + random.uniform(0, d / 2)
+		return d
+
+	def should_retry_status(self, code: int) -> bool:
+		return code in self.retry_status
+
+
+def _session_config() -> SessionConfig:
+	cc = _siliconflow().get("session") or {}
+	d = SessionConfig()
+	return SessionConfig(
+		http2=bool(cc.get("http2", d.http2)),
+		max_connections=int(cc.get("max_connections", d.max_connections)),
+		max_keepalive_connections=int(cc.get("max_keepalive_connections", d.max_keepalive_connections)),
+		keepalive_expiry_s=float(cc.get("keepalive_expiry_s", d.keepalive_expiry_s)),
+	)
+
+
+def retry_policy() -> RetryPolicy:
+	"""configs/siliconflow.yaml 的 retry 段。"""
+	cc = _siliconflow().get("retry") or {}
+	d = RetryPolicy()
+	return RetryPolicy(
+		max_attempts=max(1, int(cc.get("max_attempts", d.max_attempts))),
+		base_s=float(cc.get("base_s", d.base_s)),
+		max_s=float(cc.get("max_s", d.max_s)),
+		jitter=bool(cc.get("jitter", d.jitter)),
+		retry_status=tuple(int(c) for c in cc.get("retry_status", d.retry_status)),
+	)
+
+
+_HOOKS: List[Hook] = []
+_SESSIONS: Dict[Tuple[str, str, float], httpx.Client] = {}
+_LOCK = threading.Lock()
+_T0_KEY = "novel2comic.t0"
+
+
+def add_hook(hook: Hook) -> None:
+	"""注册插桩钩子：每个经共享会话的响应到达（响应头）时回调 hook(request, response, elapsed_s)。"""
+	with _LOCK:
+		_HOOKS.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+	with _LOCK:
+		if hook in _HOOKS:
+			_HOOKS.remove(hook)
+
+
+def _on_request(request: httpx.Request) -> None:
+	request.extensions[_T0_KEY] = time.perf_counter()
+
+
+def _on_response(response: httpx.Response) -> None:
+	with _LOCK:
+		hooks = list(_HOOKS)
+	if not hooks:
+		return
+	request = response.request
+	elapsed = time.perf_counter() - request.extensions.get(_T0_KEY, time.perf_counter())
+	for hook in hooks:
+		hook(request, response, elapsed)
+
+
+def _new_client(base_url: str, headers: Dict[str, str], timeout_s: float, follow_redirects: bool = False) -> httpx.Client:
+	cfg = _session_config()
+	transport = httpx.HTTPTransport(
+		http2=cfg.http2 and _HAS_H2,
+		limits=httpx.Limits(
+			max_connections=cfg.max_connections,
+			max_keepalive_connections=cfg.max_keepalive_connections,
+			keepalive_expiry=cfg.keepalive_expiry_s,
+		),
+	)
+	return httpx.Client(
+		base_url=base_url,
+		timeout=httpx.Timeout(timeout_s),
+		headers=headers,
+		follow_redirects=follow_redirects,
+		transport=wrap_transport(transport),
+		event_hooks={"request": [_on_request], "response": [_on_response]},
+	)
+
+
+def get_session(base_url: str, api_key: str, timeout_s: float) -> httpx.Client:
+	"""进程内共享的 API 会话（带鉴权头）；调用方不要 close，进程退出时统一关闭。"""
+	key = (base_url, api_key, float(timeout_s))
+	with _LOCK:
+		client = _SESSIONS.get(key)
+		if client is None or client.is_closed:
+			client = _SESSIONS[key] = _new_client(
+				base_url,
+				{"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+				timeout_s,
+			)
+		return client
+
+
+def get_download_session() -> httpx.Client:
+	"""下载生成结果 URL 用的共享会话（跟随重定向，不带鉴权头）。"""
+	key = ("", "", float(DOWNLOAD_TIMEOUT_S))
+	with _LOCK:
+		client = _SESSIONS.get(key)
+		if client is None or client.is_closed:
+			client = _SESSIONS[key] = _new_client(
+				"", {"User-Agent": f"Mozilla/5.0 (compatible; {USER_AGENT})"}, DOWNLOAD_TIMEOUT_S, follow_redirects=True
+			)
+		return client
+
+
+def close_sessions() -> None:
+	"""关闭并清空所有共享会话（进程退出时自动调用；测试可手动调用）。"""
+	with _LOCK:
+		clients = list(_SESSIONS.values())
+		_SESSIONS.clear()
+	for client in clients:
+		client.close()
+
+
+atexit.register(close_sessions)
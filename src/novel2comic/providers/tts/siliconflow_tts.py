@@ -4,24 +4,28 @@ providers/tts/siliconflow_tts.py
 
 SiliconFlow TTS：调用 /audio/speech 生成 wav。
 支持 CosyVoice2-0.5B（默认）、IndexTTS-2。per-call voice 覆盖。
+response_format=wav/pcm 时无需 ffmpeg；mp3/opus 走管道解码。
+synthesize_stream：pcm 流式返回，逐块交给调用方落盘，并记录首字节耗时。
+请求经 providers/limiter 的 speech 家族 AIMD 限流；synthesize 的相同请求在途合并（core/singleflight）。
+可选请求对冲（core/hedging）：synthesize 的 /audio/speech 超过近期 p95 未返回时发副本，取先返回者；流式不对冲。
+.env / base_url / timeout 解析与 HTTP 连接池走 providers/session。
 """
 
 from __future__ import annotations
 
 import os
+import time
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 import httpx
 
-try:
-	from dotenv import load_dotenv
-except Exception:
-	load_dotenv = None
-
+from novel2comic.core.audio_utils import decode_to_wav
 from novel2comic.core.config_loader import get_siliconflow, get_stage_config
-from novel2comic.core.io import find_env_file, find_project_root
+from novel2comic.core.hedging import Hedger, load_hedger
+from novel2comic.core.singleflight import get_group, request_key
+from novel2comic.providers import limiter
+from novel2comic.providers.session import get_session, load_provider_env, require_api_key, resolve_base_url, resolve_timeout
 
 # CosyVoice2 默认
 DEFAULT_MODEL = "FunAudioLLM/CosyVoice2-0.5B"
@@ -89,14 +93,6 @@ class SiliconFlowTTSConfig:
 	timeout_s: float
 
 
-def _load_dotenv_if_present(project_root: Path) -> None:
-	if load_dotenv is None:
-		return
-	env_path = find_env_file(project_root)
-	if env_path.exists():
-		load_dotenv(dotenv_path=str(env_path), override=False)
-
-
 def load_siliconflow_tts(
 	project_root: Optional[str] = None,
 	api_key: Optional[str] = None,
@@ -109,17 +105,13 @@ def load_siliconflow_tts(
 	response_format: Optional[str] = None,
 	timeout_s: Optional[float] = None,
 ) -> "SiliconFlowTTSClient":
-	root = find_project_root(project_root or __file__)
-	_load_dotenv_if_present(root)
-
-	key = (api_key or os.environ.get("SILICONFLOW_API_KEY", "")).strip()
-	if not key:
-		raise ValueError("Missing SILICONFLOW_API_KEY")
+	load_provider_env(project_root)
+	key = require_api_key(api_key)
 
 	sf = get_siliconflow()
 	tts_cfg = sf.get("tts") or {}
-	url = (base_url or os.environ.get("SILICONFLOW_BASE_URL", "") or sf.get("base_url", "") or "").strip() or "https://api.siliconflow.cn/v1"
-	t = float(timeout_s or os.environ.get("SILICONFLOW_TIMEOUT_S", "") or sf.get("timeout_s", "") or 120)
+	url = resolve_base_url(base_url)
+	t = resolve_timeout(timeout_s, 120)
 	m = (model or os.environ.get("SILICONFLOW_TTS_MODEL", "") or tts_cfg.get("model", "") or "").strip() or DEFAULT_MODEL
 	vn = (voice_narrator or os.environ.get("SILICONFLOW_TTS_VOICE_NARRATOR", "") or tts_cfg.get("voice_narrator", "") or "").strip() or DEFAULT_VOICE_NARRATOR
 	vm = (voice_male or os.environ.get("SILICONFLOW_TTS_VOICE_MALE", "") or tts_cfg.get("voice_male", "") or "").strip() or DEFAULT_VOICE_MALE
@@ -138,7 +130,7 @@ def load_siliconflow_tts(
 		response_format=fmt,
 		timeout_s=t,
 	)
-	return SiliconFlowTTSClient(cfg)
+	return SiliconFlowTTSClient(cfg, hedger=load_hedger(sf.get("hedge")))
 
 
 def select_voice(kind: str, gender_hint: str, cfg: SiliconFlowTTSConfig) -> str:
@@ -154,33 +146,28 @@ def select_voice(kind: str, gender_hint: str, cfg: SiliconFlowTTSConfig) -> str:
 
 
 class SiliconFlowTTSClient:
-	def __init__(self, cfg: SiliconFlowTTSConfig):
+	def __init__(self, cfg: SiliconFlowTTSConfig, hedger: Optional[Hedger] = None):
 		self.cfg = cfg
-		self._client = httpx.Client(
-			base_url=cfg.base_url,
-			timeout=httpx.Timeout(cfg.timeout_s),
-			headers={
-				"Authorization": f"Bearer {cfg.api_key}",
-				"Content-Type": "application/json",
-			},
-		)
+		self.hedger = hedger
+		self._client = get_session(cfg.base_url, cfg.api_key, cfg.timeout_s)
 
 	def close(self) -> None:
-		self._client.close()
+		# 共享会话不在这里关闭（见 providers/session.close_sessions）
+		if self.hedger is not None:
+			self.hedger.close()
 
-	def synthesize(
+	def _build_payload(
 		self,
 		text: str,
 		*,
-		voice: Optional[str] = None,
-		style_prompt: Optional[str] = None,
-		speed: float = 1.0,
-		gain: float = 0.0,
-		sample_rate: Optional[int] = None,
-		response_format: Optional[str] = None,
-	) -> bytes:
+		voice: Optional[str],
+		style_prompt: Optional[str],
+		speed: float,
+		gain: float,
+		sample_rate: int,
+		response_format: str,
+	) -> dict:
 		"""
-		合成音频，返回 wav bytes。
 		CosyVoice2：input = style_prompt + <|endofprompt|> + text。
 		per-call voice 覆盖默认。
 		"""
@@ -194,25 +181,130 @@ class SiliconFlowTTSClient:
 			model=self.cfg.model,
 			instruction_max_len=instruction_max_len,
 		)
-
-		v = voice or self.cfg.voice_narrator
-		sr = sample_rate or self.cfg.sample_rate
-		fmt = response_format or self.cfg.response_format
-
-		payload = {
+		return {
 			"model": self.cfg.model,
 			"input": input_text,
-			"voice": v,
-			"response_format": fmt,
-			"sample_rate": sr,
+			"voice": voice or self.cfg.voice_narrator,
+			"response_format": response_format,
+			"sample_rate": sample_rate,
 			"speed": speed,
 			"gain": gain,
 		}
 
-		r = self._client.post("/audio/speech", json=payload)
+	def synthesize(
+		self,
+		text: str,
+		*,
+		voice: Optional[str] = None,
+		style_prompt: Optional[str] = None,
+		speed: float = 1.0,
+		gain: float = 0.0,
+		sample_rate: Optional[int] = None,
+		response_format: Optional[str] = None,
+	) -> bytes:
+		"""合成音频，返回 wav bytes（整包读取）。"""
+		sr = sample_rate or self.cfg.sample_rate
+		fmt = response_format or self.cfg.response_format
+		payload = self._build_payload(
+			text,
+			voice=voice,
+			style_prompt=style_prompt,
+			speed=speed,
+			gain=gain,
+			sample_rate=sr,
+			response_format=fmt,
+		)
+
+		wav, _ = get_group("speech").do(
+			request_key("/audio/speech", payload),
+			lambda: self._post_speech(payload, fmt, sr),
+		)
+		return wav
+
+	def _post_speech(self, payload: dict, fmt: str, sr: int) -> bytes:
+		def post() -> httpx.Response:
+			return limiter.send("speech", lambda: self._client.post("/audio/speech", json=payload))
+
+		r = self.hedger.call("/audio/speech", post) if self.hedger is not None else post()
 		if r.status_code < 200 or r.status_code >= 300:
 			body_snip = (r.text or "")[:1000]
 			raise ValueError(f"SiliconFlow TTS HTTP {r.status_code}: {body_snip}")
 
-		from novel2comic.core.audio_utils import _ensure_wav
-		return _ensure_wav(r.content)
\ No newline at end of file
+		return decode_to_wav(r.content, fmt, sr)
+
+	def synthesize_stream(
+		self,
+		text: str,
+		on_pcm: Callable[[bytes], None],
+		*,
+		voice: Optional[str] = None,
+		style_prompt: Optional[str] = None,
+		speed: float = 1.0,
+		gain: float = 0.0,
+		sample_rate: Optional[int] = None,
+	) -> dict:
+		"""
+		流式合成：固定以 pcm 请求，边收边把 s16le 数据块交给 on_pcm（不在内存累积整包）。
+		返回 meta：ttfb_ms（首字节耗时）、elapsed_ms、pcm_bytes。
+		"""
+		sr = sample_rate or self.cfg.sample_rate
+		payload = self._build_payload(
+			text,
+			voice=voice,
+			style_prompt=style_prompt,
+			speed=speed,
+			gain=gain,
+			sample_rate=sr,
+			response_format="pcm",
+		)
+
+		t0 = time.perf_counter()
+		ttfb_ms = None
+		n_bytes = 0
+		header = _WavHeaderSkipper()
+		with limiter.slot("speech") as rep, self._client.stream("POST", "/audio/speech", json=payload) as r:
+			rep.status(r.status_code)
+			if r.status_code < 200 or r.status_code >= 300:
+				r.read()
+				body_snip = (r.text or "")[:1000]
+				raise ValueError(f"SiliconFlow TTS HTTP {r.status_code}: {body_snip}")
+			for chunk in r.iter_bytes():
+				if not chunk:
+					continue
+				if ttfb_ms is None:
+					ttfb_ms = round((time.perf_counter() - t0) * 1000, 2)
+				pcm = header.feed(chunk)
+				if pcm:
+					n_bytes += len(pcm)
+					on_pcm(pcm)
+
+		return {
+			"ttfb_ms": ttfb_ms,
+			"elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+			"pcm_bytes": n_bytes,
+		}
+
+
+class _WavHeaderSkipper:
+	"""个别网关即使请求 pcm 也返回带 RIFF 头的流：缓冲到 data 块后再放行。"""
+
+	def __init__(self) -> None:
+		self._buf = b""
+		self._done = False
+
+	def feed(self, chunk: bytes) -> bytes:
+		if self._done:
+			return chunk
+		self._buf += chunk
+		if len(self._buf) < 4:
+			return b""
+		if self._buf[:4] != b"RIFF":
+			self._done = True
+			out, self._buf = self._buf, b""
+			return out
+		pos = self._buf.find(b"data")
+		if pos < 0 or len(self._buf) < pos + 8:
+			return b""
+		self._done = True
+		out, self._buf = self._buf[pos + 8:], b""
+		return out
@@ -4,6 +4,8 @@ providers/vlm/siliconflow_vlm.py
 
 SiliconFlow VLM 评审：/chat/completions + 多图 image_url + JSON mode。
 用于 Strict Image QA：角色一致性、画面符合度、画风一致性。
+请求经 providers/limiter 的 chat 家族 AIMD 限流（与 LLM 共用）；相同评审请求在途合并（core/singleflight）。
+.env / base_url / timeout 解析与 HTTP 连接池走 providers/session。
 """
 
 from __future__ import annotations
@@ -15,15 +17,8 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-import httpx
-
-try:
-	from dotenv import load_dotenv
-except Exception:
-	load_dotenv = None
-
 from novel2comic.core.config_loader import get_siliconflow
-from novel2comic.core.io import find_env_file, find_project_root
+from novel2comic.core.json_repair import loads_tolerant
 from novel2comic.core.image_review_schema import (
 	DEFAULT_ALIGNMENT_THRESHOLD,
 	DEFAULT_IDENTITY_THRESHOLD,
@@ -31,13 +26,15 @@ from novel2comic.core.image_review_schema import (
 	ReviewResult,
 	parse_review_json,
 )
+from novel2comic.core.singleflight import get_group, request_key
+from novel2comic.providers import limiter
+from novel2comic.providers.session import get_session, load_provider_env, require_api_key, resolve_base_url, resolve_timeout
 from novel2comic.providers.vlm.prompts.recheck_prompts import (
 	RECHECK_SYSTEM_PROMPT,
 	recheck_user_text,
 )
 
 DEFAULT_VLM_MODEL = "Qwen/Qwen2.5-VL-32B-Instruct"
-DEFAULT_BASE_URL = "https://api.siliconflow.cn/v1"
 DEFAULT_TIMEOUT_S = 120
 DEFAULT_DETAIL = "high"
 
@@ -126,17 +123,16 @@ def _bytes_to_data_url(png_bytes: bytes, resize: bool = True) -> str:
 
 
 def _extract_json_from_response(text: str) -> str:
-	"""从模型输出提取 JSON（部分模型不支持 json_object，可能返回 ```json ... ``` 或纯 JSON）。"""
-	import re
+	"""
+	从模型输出提取 JSON（部分模型不支持 json_object，可能返回 ```json ... ```、带说明文字或尾逗号的 JSON）。
+	能本地修复的返回规范化 JSON；修不好或被截断（只剩前缀的评审不可信）原样返回，由 parse_review_json 判为 parse_error。
+	"""
 	text = (text or "").strip()
-	# ```json ... ``` 或 ``` ... ```
-	m = re.search(r"```(?:json)?\s*([\s\S]*?)```", text)
-	if m:
-		return m.group(1).strip()
-	# 尝试直接解析整段
-	if text.startswith("{"):
+	try:
+		obj, _ = loads_tolerant(text, allow_truncated=False)
+	except ValueError:
 		return text
-	return text
+	return json.dumps(obj, ensure_ascii=False)
 
 
 def _build_user_content(
@@ -218,46 +214,64 @@ def load_vlm_config(
 	timeout_s: Optional[float] = None,
 	detail: Optional[str] = None,
 ) -> VLMConfig:
-	root = find_project_root(project_root or __file__)
-	if load_dotenv:
-		env_path = find_env_file(root)
-		if env_path.exists():
-			load_dotenv(dotenv_path=str(env_path), override=False)
-
-	key = (api_key or os.environ.get("SILICONFLOW_API_KEY", "")).strip()
-	if not key:
-		raise ValueError("Missing SILICONFLOW_API_KEY")
+	load_provider_env(project_root)
+	key = require_api_key(api_key)
 
 	try:
-		sf = get_siliconflow()
-		vlm_cfg = sf.get("vlm") or {}
-		url = (base_url or os.environ.get("SILICONFLOW_BASE_URL", "") or sf.get("base_url", "") or "").strip() or DEFAULT_BASE_URL
-		t = float(timeout_s or os.environ.get("SILICONFLOW_TIMEOUT_S", "") or sf.get("timeout_s", "") or DEFAULT_TIMEOUT_S)
-		m = (model or os.environ.get("VLM_MODEL", "") or vlm_cfg.get("model", "") or "").strip() or DEFAULT_VLM_MODEL
-		d = (detail or os.environ.get("VLM_DETAIL", "") or vlm_cfg.get("detail", "") or "").strip() or DEFAULT_DETAIL
+		vlm_cfg = get_siliconflow().get("vlm") or {}
 	except Exception:
-		url = (base_url or os.environ.get("SILICONFLOW_BASE_URL", "")).strip() or DEFAULT_BASE_URL
-		t = float(timeout_s or os.environ.get("SILICONFLOW_TIMEOUT_S", "") or DEFAULT_TIMEOUT_S)
-		m = (model or os.environ.get("VLM_MODEL", "")).strip() or DEFAULT_VLM_MODEL
-		d = (detail or os.environ.get("VLM_DETAIL", "")).strip() or DEFAULT_DETAIL
+		vlm_cfg = {}
+	m = (model or os.environ.get("VLM_MODEL", "") or vlm_cfg.get("model", "") or "").strip() or DEFAULT_VLM_MODEL
+	d = (detail or os.environ.get("VLM_DETAIL", "") or vlm_cfg.get("detail", "") or "").strip() or DEFAULT_DETAIL
 
-	return VLMConfig(api_key=key, base_url=url, model=m, timeout_s=t, detail=d)
+	return VLMConfig(
+		api_key=key,
+		base_url=resolve_base_url(base_url),
+		model=m,
+		timeout_s=resolve_timeout(timeout_s, DEFAULT_TIMEOUT_S),
+		detail=d,
+	)
 
 
 class SiliconFlowVLMClient:
 	def __init__(self, cfg: VLMConfig):
 		self.cfg = cfg
-		self._client = httpx.Client(
-			base_url=cfg.base_url,
-			timeout=httpx.Timeout(cfg.timeout_s),
-			headers={
-				"Authorization": f"Bearer {cfg.api_key}",
-				"Content-Type": "application/json",
-			},
-		)
+		self._client = get_session(cfg.base_url, cfg.api_key, cfg.timeout_s)
 
 	def close(self) -> None:
-		self._client.close()
+		"""共享会话不在这里关闭（见 providers/session.close_sessions）；保留接口供调用方成对使用。"""
+
+	def _post_review(self, payload: Dict[str, Any], label: str) -> str:
+		"""
+		发送评审请求，返回抽取后的 JSON 文本。相同 payload 的在途请求合并为一次（singleflight）。
+		"""
+		key = request_key("/chat/completions", payload)
+		content_str, _ = get_group("vlm").do(key, lambda: self._post_review_once(payload, label))
+		return content_str
+
+	def _post_review_once(self, payload: Dict[str, Any], label: str) -> str:
+		payload = dict(payload)
+		# 部分 VLM 不支持 json_object，先尝试带 json，失败则重试不带
+		for use_json in (True, False):
+			if use_json:
+				payload["response_format"] = {"type": "json_object"}
+			elif "response_format" in payload:
+				del payload["response_format"]
+			r = limiter.send("chat", lambda: self._client.post("/chat/completions", json=payload))
+			if r.status_code < 200 or r.status_code >= 300:
+				body = (r.text or "")[:1000]
+				if use_json and "json" in body.lower() and "not supported" in body.lower():
+					continue
+				raise ValueError(f"{label} HTTP {r.status_code}: {body}")
+			break
+
+		data = r.json()
+		try:
+			content_str = data["choices"][0]["message"]["content"]
+		except (KeyError, IndexError, TypeError):
+			raise ValueError(f"{label} unexpected response: {json.dumps(data, ensure_ascii=False)[:500]}")
+
+		return _extract_json_from_response(content_str)
 
 	def review_shot_image(
 		self,
@@ -299,27 +313,7 @@ class SiliconFlowVLMClient:
 			],
 			"temperature": 0.1,
 		}
-		# 部分 VLM 不支持 json_object，先尝试带 json，失败则重试不带
-		for use_json in (True, False):
-			if use_json:
-				payload["response_format"] = {"type": "json_object"}
-			elif "response_format" in payload:
-				del payload["response_format"]
-			r = self._client.post("/chat/completions", json=payload)
-			if r.status_code < 200 or r.status_code >= 300:
-				body = (r.text or "")[:1000]
-				if use_json and "json" in body.lower() and "not supported" in body.lower():
-					continue
-				raise ValueError(f"VLM HTTP {r.status_code}: {body}")
-			break
-
-		data = r.json()
-		try:
-			content_str = data["choices"][0]["message"]["content"]
-		except (KeyError, IndexError, TypeError):
-			raise ValueError(f"VLM unexpected response: {json.dumps(data, ensure_ascii=False)[:500]}")
-
-		content_str = _extract_json_from_response(content_str)
+		content_str = self._post_review(payload, "VLM")
 
 		return parse_review_json(
 			content_str,
@@ -377,26 +371,7 @@ class SiliconFlowVLMClient:
 			],
 			"temperature": 0.05,
 		}
-		for use_json in (True, False):
-			if use_json:
-				payload["response_format"] = {"type": "json_object"}
-			elif "response_format" in payload:
-				del payload["response_format"]
-			r = self._client.post("/chat/completions", json=payload)
-			if r.status_code < 200 or r.status_code >= 300:
-				body = (r.text or "")[:1000]
-				if use_json and "json" in body.lower() and "not supported" in body.lower():
-					continue
-				raise ValueError(f"VLM Recheck HTTP {r.status_code}: {body}")
-			break
-
-		data = r.json()
-		try:
-			content_str = data["choices"][0]["message"]["content"]
-		except (KeyError, IndexError, TypeError):
-			raise ValueError(f"VLM Recheck unexpected response: {json.dumps(data, ensure_ascii=False)[:500]}")
-
-		content_str = _extract_json_from_response(content_str)
+		content_str = self._post_review(payload, "VLM Recheck")
 
 		return parse_review_json(
 			content_str,
@@ -9,6 +9,7 @@ refine_shot_split/prompt.py
 关键点：
 - 强调：只能输出 JSON，不能 Markdown。
 - 强调：文本守恒，不准改写 base_shots 的文字，只能通过 ops 重排/合并/拆分。
+- compact=True：base_shots 编码为表格行（键名只出现一次）、无空格 JSON，减少输入 token。
 """
 
 from __future__ import annotations
@@ -16,6 +17,8 @@ from __future__ import annotations
 import json
 from typing import List
 
+from novel2comic.core.prompt_codec import dumps, table
+
 from .schema import Shot, Constraints
 
 
@@ -27,11 +30,11 @@ SYSTEM_PROMPT = (
 )
 
 
-def build_user_prompt(chapter_id: str, base_shots: List[Shot], c: Constraints) -> str:
+def build_user_prompt(chapter_id: str, base_shots: List[Shot], c: Constraints, compact: bool = False) -> str:
 	"""
 	把输入序列化为 LLM 可读的 JSON，再加上规则说明。
 	"""
-	payload = {
+	payload: dict = {
 		"chapter_id": chapter_id,
 		"constraints": {
 			"min_shots": c.min_shots,
@@ -48,6 +51,9 @@ def build_user_prompt(chapter_id: str, base_shots: List[Shot], c: Constraints) -
 		],
 	}
 
+	if compact:
+		payload["base_shots"] = table(("idx", "kind", "text"), [(s.idx, s.kind, s.text) for s in base_shots])
+
 	rules = (
 		"任务：在不改变任何原文字符的前提下，让分镜边界更符合语义与叙事节奏。\n"
 		"输出格式：\n"
@@ -70,4 +76,7 @@ def build_user_prompt(chapter_id: str, base_shots: List[Shot], c: Constraints) -
 		"- 输出后 shot 数必须在 [min_shots,max_shots]\n"
 	)
 
+	if compact:
+		rules += "- base_shots 为表格：cols 为列名，rows 每行一个 shot\n"
+		return rules + "\n输入数据(JSON)：\n" + dumps(payload)
 	return rules + "\n输入数据(JSON)：\n" + json.dumps(payload, ensure_ascii=False)
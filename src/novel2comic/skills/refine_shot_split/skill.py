@@ -11,6 +11,14 @@ refine_shot_split/skill.py
   5) 校验（文本守恒、shot 数范围、约束）
   6) 失败则回退 baseline
 
+分块模式（chunk_shots>0）：
+- base_shots 只在 scene_break 处切块，相邻短场景合并到不超过 chunk_shots，超长场景按固定大小硬切
+- 各块独立 refine（并发），块内 idx 从 0 编号；守恒与数量范围按块校验
+- 失败的块单独回退 baseline，其余块保留 refine 结果；最后拼接并重新编号 idx
+- 拼接后按整章 min/max 再校验总数；超出范围整章回退 baseline
+
+分级模型（cascade）：每块（或整章）先用小模型，patch 校验/文本守恒/数量范围任一不过即升级到 client 默认模型。
+
 注意：
 - 这里不关心你用 DeepSeek 还是 SiliconFlow，只依赖一个 llm_client 接口：
   llm_client.chat_json(system_prompt: str, user_prompt: str) -> dict
@@ -18,8 +26,9 @@ refine_shot_split/skill.py
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+import math
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
 
 from .schema import Shot, Constraints
 from .prompt import SYSTEM_PROMPT, build_user_prompt
@@ -31,6 +40,8 @@ from .validator import (
 	validate_count_range,
 )
 from .applier import apply_patch
+from novel2comic.core.windowing import Window, plan_windows_at_breaks, run_concurrent
+from novel2comic.providers.llm.cascade import CascadeConfig, answering_model, chat_json_with_model, join_models, run_cascade
 
 
 @dataclass
@@ -39,34 +50,156 @@ class RefineResult:
 	patch: Optional[Dict[str, Any]]
 	used_fallback: bool
 	error: str
+	chunks: int = 1
+	failed_chunks: int = 0
+	# 实际给出 refine 结果的模型（cascade 小模型或默认模型；分块时去重后逗号分隔）；回退时为空
+	model: str = ""
+
+
+def _copy_shots(shots: List[Shot], start_idx: int = 0) -> List[Shot]:
+	return [Shot(idx=start_idx + i, kind=s.kind, text=s.text, tags=(dict(s.tags) if s.tags else None)) for i, s in enumerate(shots)]
+
+
+def chunk_constraints(c: Constraints, chunk_len: int, total: int) -> Constraints:
+	"""整章 min/max 按块长度等比分摊（向外取整，且不比 baseline 块长更严）。"""
+	ratio = chunk_len / max(1, total)
+	return replace(
+		c,
+		min_shots=min(chunk_len, max(1, math.floor(c.min_shots * ratio))),
+		max_shots=max(chunk_len, math.ceil(c.max_shots * ratio)),
+	)
 
 
 class RefineShotSplitSkill:
-	def __init__(self, llm_client: Any):
+	"""
+	chunk_shots：<=0 整章一次调用（旧行为）；>0 分块并发 refine，每块最多 chunk_shots 个 base shot
+	workers：并发块数
+	compact：紧凑 prompt 编码（表格行）
+	cascade：分级模型配置，None 为只用默认模型
+	"""
+
+	def __init__(
+		self,
+		llm_client: Any,
+		chunk_shots: int = 0,
+		workers: int = 4,
+		compact: bool = False,
+		cascade: Optional[CascadeConfig] = None,
+	):
 		self.llm_client = llm_client
+		self.chunk_shots = chunk_shots
+		self.workers = workers
+		self.compact = compact
+		self.cascade = cascade
 
 	def run(self, chapter_id: str, base_shots: List[Shot], c: Constraints) -> RefineResult:
-		user_prompt = build_user_prompt(chapter_id, base_shots, c)
+		if self.chunk_shots <= 0:
+			return self._run_whole(chapter_id, base_shots, c)
+		return self._run_chunked(chapter_id, base_shots, c)
+
+	def _refine(self, chapter_id: str, base_shots: List[Shot], c: Constraints) -> Tuple[List[Shot], Dict[str, Any], str]:
+		"""返回 (refined_shots, patch, 应答模型)。"""
+		user_prompt = build_user_prompt(chapter_id, base_shots, c, compact=self.compact)
+		models = self.cascade.models_for() if self.cascade else [None]
+
+		def attempt(model: Optional[str]) -> Tuple[List[Shot], Dict[str, Any], str]:
+			refined, patch = self._refine_with(base_shots, c, user_prompt, model)
+			return refined, patch, answering_model(self.llm_client, model)
+
+		return run_cascade(models, attempt)
+
+	def _refine_with(
+		self, base_shots: List[Shot], c: Constraints, user_prompt: str, model: Optional[str]
+	) -> Tuple[List[Shot], Dict[str, Any]]:
 
 		# 短章放宽 min/max：baseline 不足 min_shots 时，接受 baseline 数量
 		effective_min = min(c.min_shots, len(base_shots))
 		effective_max = max(c.max_shots, len(base_shots))
 
-		try:
-			patch = self.llm_client.chat_json(SYSTEM_PROMPT, user_prompt)
+		refined: List[Shot] = []
 
+		def check(patch: Any) -> None:
+			# 全部校验通过后才写 LLM 缓存（见 chat_json_with_model）
 			validate_patch_shape(patch)
 			validate_ops_syntax(patch["ops"])
 			validate_constraints(patch["constraints"], c)
-
-			refined = apply_patch(base_shots, patch, c)
-
+			out = apply_patch(base_shots, patch, c)
 			# 这两条是“绝对硬约束”
-			validate_text_conservation(base_shots, refined)
-			validate_count_range(refined, c, effective_min=effective_min, effective_max=effective_max)
+			validate_text_conservation(base_shots, out)
+			validate_count_range(out, c, effective_min=effective_min, effective_max=effective_max)
+			refined[:] = out
+
+		patch = chat_json_with_model(self.llm_client, SYSTEM_PROMPT, user_prompt, model, validate=check)
+		return refined, patch
 
-			return RefineResult(refined_shots=refined, patch=patch, used_fallback=False, error="")
+	def _run_whole(self, chapter_id: str, base_shots: List[Shot], c: Constraints) -> RefineResult:
+		try:
+			refined, patch, model = self._refine(chapter_id, base_shots, c)
+			return RefineResult(refined_shots=refined, patch=patch, used_fallback=False, error="", model=model)
 
 		except Exception as e:
-			# 失败就回退 baseline，保证流水线不中断
-			return RefineResult(refined_shots=base_shots, patch=None, used_fallback=True, error=str(e))
+			# 失败就回退 baseline，保证流水线不中断；整章即唯一的一块，记为失败
+			return RefineResult(refined_shots=base_shots, patch=None, used_fallback=True, error=str(e), failed_chunks=1)
+
+	def _run_chunked(self, chapter_id: str, base_shots: List[Shot], c: Constraints) -> RefineResult:
+		breaks = [s.kind == "scene_break" for s in base_shots]
+		windows = plan_windows_at_breaks(breaks, self.chunk_shots)
+
+		def run_chunk(w: Window) -> Tuple[List[Shot], Optional[Dict[str, Any]], str]:
+			chunk = _copy_shots(w.core(base_shots))
+			# 只有 scene_break 或单个 shot 的块无可 refine，直接保留
+			if len(chunk) <= 1 or all(s.kind == "scene_break" for s in chunk):
+				return chunk, None, ""
+			return self._refine(chapter_id, chunk, chunk_constraints(c, len(chunk), len(base_shots)))
+
+		outcomes = run_concurrent(run_chunk, windows, self.workers)
+
+		refined: List[Shot] = []
+		chunk_patches: List[Dict[str, Any]] = []
+		errors: List[str] = []
+		models: List[str] = []
+		for w, (res, err) in zip(windows, outcomes):
+			entry: Dict[str, Any] = {"start": w.start, "end": w.end}
+			if err is None:
+				shots, patch, model = res
+				entry["patch"] = patch
+				if model:
+					entry["model"] = model
+					models.append(model)
+			else:
+				shots = _copy_shots(w.core(base_shots))
+				entry["error"] = str(err)
+				errors.append(f"chunk {w.index} [{w.start}:{w.end}]: {err}")
+			refined.extend(shots)
+			chunk_patches.append(entry)
+
+		for i, s in enumerate(refined):
+			s.idx = i
+
+		# 各块 min 向下取整，拼接后可能超出整章范围：按整章约束再校验，不过则整章回退 baseline
+		try:
+			validate_count_range(
+				refined, c,
+				effective_min=min(c.min_shots, len(base_shots)),
+				effective_max=max(c.max_shots, len(base_shots)),
+			)
+		except ValueError as e:
+			errors.append(f"stitched: {e}")
+			return RefineResult(
+				refined_shots=_copy_shots(base_shots),
+				patch=None,
+				used_fallback=True,
+				error="; ".join(errors),
+				chunks=len(windows),
+				failed_chunks=len(windows),
+			)
+
+		return RefineResult(
+			refined_shots=refined,
+			patch={"schema_version": "shotsplit_patch.v0.1", "chapter_id": chapter_id, "chunks": chunk_patches},
+			used_fallback=bool(errors),
+			error="; ".join(errors),
+			chunks=len(windows),
+			failed_chunks=len(errors),
+			model=join_models(models),
+		)
@@ -3,12 +3,17 @@
 speech_plan/prompt.py
 
 SpeechPlan LLM prompt。严格 JSON 输出，patch-only，不改写原文。
+紧凑模式（build_compact_user_prompt）：shot 用本地整数 id、表格行、原文只出现一次（segments 拼起来即 raw_text），
+响应经 decode_compact_patch 还原为标准 patch 后再校验。
 """
 
 from __future__ import annotations
 
 import json
-from typing import Any, Dict, List
+import re
+from typing import Any, Dict, List, Optional
+
+from novel2comic.core.prompt_codec import IdCodec, dumps, table
 
 
 SYSTEM_PROMPT = (
@@ -22,11 +27,21 @@ SYSTEM_PROMPT = (
 )
 
 
-def build_user_prompt(chapter_id: str, shots_with_segments: List[Dict[str, Any]]) -> str:
+def _context_item(shot: Dict[str, Any]) -> Dict[str, Any]:
+	return {"shot_id": shot["shot_id"], "raw_text": shot.get("text", {}).get("raw_text", "")}
+
+
+def build_user_prompt(
+	chapter_id: str,
+	shots_with_segments: List[Dict[str, Any]],
+	context_before: Optional[List[Dict[str, Any]]] = None,
+	context_after: Optional[List[Dict[str, Any]]] = None,
+) -> str:
 	"""
 	shots_with_segments: 每个 shot 含 shot_id, raw_text, segments (seg_id, kind, raw_text)
+	context_before/context_after: 窗口两侧的只读上下文 shot（只给原文，不要求输出）
 	"""
-	payload = {
+	payload: Dict[str, Any] = {
 		"chapter_id": chapter_id,
 		"schema_version": "speech_plan_patch.v0.1",
 		"shots": [
@@ -41,6 +56,10 @@ def build_user_prompt(chapter_id: str, shots_with_segments: List[Dict[str, Any]]
 			for s in shots_with_segments
 		],
 	}
+	if context_before:
+		payload["context_before"] = [_context_item(s) for s in context_before]
+	if context_after:
+		payload["context_after"] = [_context_item(s) for s in context_after]
 
 	rules = (
 		"任务：为每个 shot 的 default 和 quote segments 输出朗读标签。\n"
@@ -58,5 +77,90 @@ def build_user_prompt(chapter_id: str, shots_with_segments: List[Dict[str, Any]]
 		'}\n'
 		"raw_text 不可改。segments 的 intensity/pace 可选覆盖，为 null 则用 default。\n"
 	)
+	if context_before or context_after:
+		rules += "context_before/context_after 仅供理解上下文（说话人、情绪延续），不要为其中的 shot 输出任何内容。\n"
 
 	return rules + "\n输入数据(JSON)：\n" + json.dumps(payload, ensure_ascii=False)
+
+
+# segment kind 缩写（紧凑模式）；core/quote_splitter 产出 narration / quote，其余为 speech_schema 的 mode 名
+KIND_CODES = {"narration": "n", "quote": "q", "quoted_dialogue": "q", "inner_thought": "t"}
+
+COMPACT_RULES = (
+	"任务：为每个 shot 的 default 和 quote segments 输出朗读标签。\n"
+	"输入：shots 为表格（cols 为列名）；id 为 shot 本地编号；segs 为 [kind, 原文] 列表，"
+	"kind：n=旁白 q=引号对白 t=内心独白；raw 非空时为 shot 原文（否则原文即 segs 拼接）。\n"
+	"输出格式：\n"
+	'{"schema_version":"speech_plan_patch.v0.1","shots":[{"id":0,'
+	'"default":{"emotion":"neutral","intensity":0.35,"pace":"normal","pause_ms":80,"mode":"narration"},'
+	'"segs":[{"i":0,"speaker":"...","gender_hint":"...","tone":"...","intensity":null,"pace":null}]}]}\n'
+	"segs[].i 为该 shot 内 segment 序号。每个 shot 都必须输出；原文不可改、不要回显原文。"
+	"segs 的 intensity/pace 可选覆盖，为 null 则用 default。\n"
+)
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _segments(shot: Dict[str, Any]) -> List[Dict[str, Any]]:
+	return shot.get("speech", {}).get("segments", [])
+
+
+def build_compact_user_prompt(
+	chapter_id: str,
+	shots_with_segments: List[Dict[str, Any]],
+	context_before: Optional[List[Dict[str, Any]]] = None,
+	context_after: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+	"""紧凑编码的 user prompt；响应需用 decode_compact_patch(patch, shots_with_segments) 还原。"""
+	codec = IdCodec([s["shot_id"] for s in shots_with_segments])
+	rows = []
+	for s in shots_with_segments:
+		raw = s.get("text", {}).get("raw_text", "")
+		segs = _segments(s)
+		joined = "".join(seg.get("raw_text", "") for seg in segs)
+		redundant = _WS_RE.sub("", joined) == _WS_RE.sub("", raw)
+		rows.append([
+			codec.encode(s["shot_id"]),
+			"" if redundant else raw,
+			[[KIND_CODES.get(seg.get("kind", ""), seg.get("kind", "")), seg.get("raw_text", "")] for seg in segs],
+		])
+	payload: Dict[str, Any] = {"chapter_id": chapter_id, "shots": table(["id", "raw", "segs"], rows)}
+	if context_before:
+		payload["context_before"] = [s.get("text", {}).get("raw_text", "") for s in context_before]
+	if context_after:
+		payload["context_after"] = [s.get("text", {}).get("raw_text", "") for s in context_after]
+
+	rules = COMPACT_RULES
+	if context_before or context_after:
+		rules += "context_before/context_after 为前后文原文，仅供理解上下文，不要为其输出任何内容。\n"
+	return rules + "\n输入数据(JSON)：\n" + dumps(payload)
+
+
+def decode_compact_patch(patch: Any, shots_with_segments: List[Dict[str, Any]]) -> Any:
+	"""本地 id / segment 序号 -> shot_id / seg_id。无法识别的条目原样保留，交给 validate_patch 报错。"""
+	if not isinstance(patch, dict) or not isinstance(patch.get("shots"), list):
+		return patch
+	by_id = {s["shot_id"]: s for s in shots_with_segments}
+	codec = IdCodec([s["shot_id"] for s in shots_with_segments])
+	out_shots = []
+	for item in patch["shots"]:
+		if not isinstance(item, dict) or "id" not in item:
+			out_shots.append(item)
+			continue
+		sid = codec.decode(item["id"])
+		shot_out: Dict[str, Any] = {k: v for k, v in item.items() if k not in ("id", "segs")}
+		shot_out["shot_id"] = sid if sid is not None else item["id"]
+		segs = _segments(by_id[sid]) if sid is not None else []
+		decoded_segs = []
+		for seg in item.get("segs") or []:
+			if not isinstance(seg, dict):
+				decoded_segs.append(seg)
+				continue
+			seg_out = {k: v for k, v in seg.items() if k != "i"}
+			i = seg.get("i")
+			if isinstance(i, int) and not isinstance(i, bool) and 0 <= i < len(segs):
+				seg_out["seg_id"] = segs[i]["seg_id"]
+			decoded_segs.append(seg_out)
+		shot_out["segments"] = decoded_segs
+		out_shots.append(shot_out)
+	return dict(patch, shots=out_shots)
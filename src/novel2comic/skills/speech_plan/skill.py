@@ -3,18 +3,32 @@
 speech_plan/skill.py
 
 SpeechPlanSkill：patch-only，LLM 只输出标签不改写原文。
-失败回退到默认有声书模板。
+长章节按 window_shots 切窗口并发调用（两侧带 overlap_shots 个只读上下文），
+每个窗口独立校验、失败按 retry_policy() 退避后重试（熔断中不重试）；仍失败的窗口单独回退到默认有声书模板，不影响其他窗口。
+stream 模式：LLM 流式输出，每个 shot 条目一闭合即校验并应用；流被截断时保留已完成的 shot，其余用默认模板。
+cascade：窗口先用小模型（只试一次），校验失败、流被截断或窗口引号段过多时升级到 client 默认模型（含重试）。
 """
 
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
-from .prompt import SYSTEM_PROMPT, build_user_prompt
-from .validator import validate_patch
+from .prompt import SYSTEM_PROMPT, build_compact_user_prompt, build_user_prompt, decode_compact_patch
+from .validator import validate_patch, validate_patch_shape, validate_patch_shot
 from .applier import apply_patch
 from novel2comic.core.speech_schema import default_speech, default_segment
+from novel2comic.core.windowing import Window, plan_windows, run_concurrent
+from novel2comic.providers.breaker import CircuitOpenError
+from novel2comic.providers.llm.cascade import CascadeConfig, accepts_kwarg, chat_json_with_model, run_cascade
+from novel2comic.providers.session import retry_policy
+
+# 窗口与重试的默认值；stages/plan 在 stage_plan.yaml 缺省时也用这里的值
+DEFAULT_WINDOW_SHOTS = 24
+DEFAULT_OVERLAP_SHOTS = 2
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 1
 
 
 @dataclass
@@ -22,36 +36,164 @@ class SpeechPlanResult:
 	shots: List[Dict[str, Any]]
 	used_fallback: bool
 	error: str
+	windows: int = 1
+	failed_windows: int = 0
+	truncated_windows: int = 0
+
+
+def fallback_shots(shots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+	"""用默认模板填充 speech（保留 segments 切分）。"""
+	result_shots = []
+	for shot in shots:
+		new_shot = dict(shot)
+		segments = shot.get("speech", {}).get("segments", [])
+		default = default_speech()["default"].copy()
+		seg_out = [
+			default_segment(seg.get("seg_id", f"{shot['shot_id']}_seg_{i}"), seg.get("kind", "narration"), seg.get("raw_text", ""))
+			for i, seg in enumerate(segments)
+		]
+		new_shot["speech"] = {"default": default, "segments": seg_out}
+		result_shots.append(new_shot)
+	return result_shots
 
 
 class SpeechPlanSkill:
-	def __init__(self, llm_client: Any):
+	"""
+	window_shots：每个窗口的 shot 数，<=0 为整章一次调用（旧行为）
+	overlap_shots：窗口两侧只读上下文 shot 数
+	workers：并发窗口数
+	retries：单个窗口失败后的重试次数
+	compact：紧凑 prompt 编码（本地短 id、表格行、原文只出现一次）
+	stream：流式调用（llm_client 需提供 chat_json_stream），逐条校验与应用
+	cascade：分级模型配置（providers/llm/cascade.py），None 为只用默认模型
+	"""
+
+	def __init__(
+		self,
+		llm_client: Any,
+		window_shots: int = DEFAULT_WINDOW_SHOTS,
+		overlap_shots: int = DEFAULT_OVERLAP_SHOTS,
+		workers: int = DEFAULT_WORKERS,
+		retries: int = DEFAULT_RETRIES,
+		compact: bool = False,
+		stream: bool = False,
+		cascade: Optional[CascadeConfig] = None,
+	):
 		self.llm_client = llm_client
+		self.window_shots = window_shots
+		self.overlap_shots = overlap_shots
+		self.workers = workers
+		self.retries = retries
+		self.compact = compact
+		self.stream = stream and hasattr(llm_client, "chat_json_stream")
+		self.cascade = cascade
 
 	def run(self, chapter_id: str, shots: List[Dict[str, Any]]) -> SpeechPlanResult:
 		"""
 		shots: 每个 shot 需含 shot_id, text.raw_text, speech.default, speech.segments。
 		speech.segments 由 quote_splitter 生成（seg_id, kind, raw_text）。
 		"""
-		expected_ids = [s["shot_id"] for s in shots]
-
-		try:
-			user_prompt = build_user_prompt(chapter_id, shots)
-			patch = self.llm_client.chat_json(SYSTEM_PROMPT, user_prompt)
-			validate_patch(patch, expected_ids)
-			result_shots = apply_patch(shots, patch)
-			return SpeechPlanResult(shots=result_shots, used_fallback=False, error="")
-		except Exception as e:
-			# 回退：用默认模板填充
-			result_shots = []
-			for shot in shots:
-				new_shot = dict(shot)
-				segments = shot.get("speech", {}).get("segments", [])
-				default = default_speech()["default"].copy()
-				seg_out = [
-					default_segment(seg.get("seg_id", f"{shot['shot_id']}_seg_{i}"), seg.get("kind", "narration"), seg.get("raw_text", ""))
-					for i, seg in enumerate(segments)
-				]
-				new_shot["speech"] = {"default": default, "segments": seg_out}
-				result_shots.append(new_shot)
-			return SpeechPlanResult(shots=result_shots, used_fallback=True, error=str(e))
+		windows = plan_windows(len(shots), self.window_shots, self.overlap_shots)
+		outcomes = run_concurrent(lambda w: self._run_window(chapter_id, shots, w), windows, self.workers)
+
+		result_shots: List[Dict[str, Any]] = []
+		errors: List[str] = []
+		notes: List[str] = []
+		for w, (out, err) in zip(windows, outcomes):
+			if err is None:
+				patched, note = out
+				result_shots.extend(patched)
+				if note:
+					notes.append(f"window {w.index} [{w.start}:{w.end}]: {note}")
+				continue
+			result_shots.extend(fallback_shots(w.core(shots)))
+			errors.append(str(err) if len(windows) == 1 else f"window {w.index} [{w.start}:{w.end}]: {err}")
+
+		return SpeechPlanResult(
+			shots=result_shots,
+			used_fallback=bool(errors or notes),
+			error="; ".join(errors + notes),
+			windows=len(windows),
+			failed_windows=len(errors),
+			truncated_windows=len(notes),
+		)
+
+	def _run_window(self, chapter_id: str, shots: List[Dict[str, Any]], w: Window) -> Tuple[List[Dict[str, Any]], str]:
+		"""返回 (应用后的核心 shots, 备注)；备注非空表示流被截断、部分 shot 用了默认模板。"""
+		core = w.core(shots)
+		expected_ids = [s["shot_id"] for s in core]
+		build = build_compact_user_prompt if self.compact else build_user_prompt
+		user_prompt = build(chapter_id, core, w.context_before(shots), w.context_after(shots))
+		models = self.cascade.models_for(core) if self.cascade else [None]
+
+		def decode(patch: Any) -> Any:
+			return decode_compact_patch(patch, core) if self.compact else patch
+
+		def check(patch: Any) -> None:
+			validate_patch(decode(patch), expected_ids)
+
+		def attempt(model: Optional[str]) -> Tuple[List[Dict[str, Any]], str]:
+			# 小模型只试一次，失败直接升级；默认模型按 retries 退避重试（重试跳过缓存读取），熔断中直接抛出
+			policy = retry_policy()
+			tries = 1 if model else 1 + max(0, self.retries)
+			last_err: Exception = RuntimeError("no attempt")
+			for i in range(tries):
+				try:
+					if self.stream:
+						out = self._stream_window(core, user_prompt, model, fresh=i > 0)
+						if model and out[1]:
+							raise ValueError(f"small model {out[1]}")
+						return out
+					patch = chat_json_with_model(self.llm_client, SYSTEM_PROMPT, user_prompt, model, validate=check, fresh=i > 0)
+					return apply_patch(core, decode(patch)), ""
+				except CircuitOpenError:
+					raise
+				except Exception as e:
+					last_err = e
+					if i < tries - 1:
+						time.sleep(policy.delay(i))
+			raise last_err
+
+		return run_cascade(models, attempt)
+
+	def _stream_window(
+		self, core: List[Dict[str, Any]], user_prompt: str, model: Optional[str] = None, fresh: bool = False
+	) -> Tuple[List[Dict[str, Any]], str]:
+		expected_ids = [s["shot_id"] for s in core]
+		by_id = {s["shot_id"]: s for s in core}
+		seen: set = set()
+		applied: Dict[str, Dict[str, Any]] = {}
+
+		def on_item(item: Any) -> None:
+			if self.compact:
+				item = decode_compact_patch({"shots": [item]}, core)["shots"][0]
+			validate_patch_shot(item, expected_ids, seen)
+			sid = item["shot_id"]
+			applied[sid] = apply_patch([by_id[sid]], {"shots": [item]})[0]
+
+		def check(patch: Any) -> None:
+			# 完整输出：形状合法且覆盖全部 shot 才写缓存
+			validate_patch_shape(patch)
+			missing = [sid for sid in expected_ids if sid not in applied]
+			if missing:
+				raise ValueError(f"missing shot_ids: {set(missing)}")
+
+		stream_fn = self.llm_client.chat_json_stream
+		kwargs: Dict[str, Any] = {}
+		if model:
+			kwargs["model"] = model
+		if accepts_kwarg(stream_fn, "validate"):
+			kwargs["validate"] = check
+		if fresh and accepts_kwarg(stream_fn, "fresh"):
+			kwargs["fresh"] = True
+		patch, complete = stream_fn(SYSTEM_PROMPT, user_prompt, ("shots",), on_item, **kwargs)
+		note = ""
+		if complete:
+			check(patch)
+		elif not applied:
+			raise ValueError("stream truncated before any shot completed")
+		else:
+			note = f"stream truncated, {len(applied)}/{len(core)} shots planned"
+
+		# 未完成的 shot 用空 patch 应用（即默认模板）
+		return [applied.get(s["shot_id"]) or apply_patch([s], {"shots": []})[0] for s in core], note
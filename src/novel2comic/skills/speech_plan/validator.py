@@ -68,22 +68,27 @@ def validate_segment(seg: Dict[str, Any]) -> None:
 		raise ValueError("patch must not modify raw_text")
 
 
+def validate_patch_shot(shot: Any, expected_shot_ids: List[str], seen: set) -> None:
+	"""单个 shot 条目校验（流式模式下逐条调用）；通过后把 shot_id 记入 seen。"""
+	if not isinstance(shot, dict):
+		raise ValueError("each shot must be object")
+	sid = shot.get("shot_id")
+	if sid not in expected_shot_ids:
+		raise ValueError(f"unknown shot_id: {sid}")
+	if sid in seen:
+		raise ValueError(f"duplicate shot_id: {sid}")
+	seen.add(sid)
+	if "default" in shot:
+		validate_shot_default(shot["default"])
+	for seg in shot.get("segments", []):
+		validate_segment(seg)
+
+
 def validate_patch(patch: Dict[str, Any], expected_shot_ids: List[str]) -> None:
 	validate_patch_shape(patch)
-	seen = set()
+	seen: set = set()
 	for shot in patch["shots"]:
-		if not isinstance(shot, dict):
-			raise ValueError("each shot must be object")
-		sid = shot.get("shot_id")
-		if sid not in expected_shot_ids:
-			raise ValueError(f"unknown shot_id: {sid}")
-		if sid in seen:
-			raise ValueError(f"duplicate shot_id: {sid}")
-		seen.add(sid)
-		if "default" in shot:
-			validate_shot_default(shot["default"])
-		for seg in shot.get("segments", []):
-			validate_segment(seg)
+		validate_patch_shot(shot, expected_shot_ids, seen)
 
 	if len(seen) != len(expected_shot_ids):
 		missing = set(expected_shot_ids) - seen
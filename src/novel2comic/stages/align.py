@@ -2,19 +2,28 @@
 """
 novel2comic/stages/align.py
 
-Align-Lite：按 shot wav 时长与 segments 比例生成 SRT/ASS。
+Align-Lite：生成 SRT/ASS。
+- 有 audio/timeline.json（TTS 写出）时直接查精确时间，不读音频
+- 否则回退：按 shot wav 时长与 segments 字数比例估算
+- provider=energy（configs/stage_align.yaml）时，再用 providers/align/energy_align
+  把边界吸附到 shot wav 中的真实静音（需 numpy），诊断写 subtitles/align/energy_align.json
 quote 段字幕保留 ""。
 """
 
 from __future__ import annotations
 
+import importlib.util
 import json
 import wave
+from dataclasses import asdict
 from pathlib import Path
 
+from novel2comic.core.config_loader import get_stage_config
 from novel2comic.core.io import ChapterPaths
 from novel2comic.core.manifest import load_manifest, save_manifest
+from novel2comic.core.timeline import Timeline, load_timeline
 from novel2comic.core.tts_utils import SHOT_BOUNDARY_PAUSE_MS
+from novel2comic.providers.align.energy_align import EnergyAlignConfig, EnergyAligner
 
 
 def _ms_to_srt_time(ms: int) -> str:
@@ -69,6 +78,124 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 	path.write_text("\n".join(lines), encoding="utf-8")
 
 
+def _proportional_entries(shot: dict, start_ms: int, duration_ms: int) -> list[tuple[int, int, str]]:
+	"""按 segment 字数比例切分 shot 时长（无精确时间时的估算）。"""
+	segments = shot.get("speech", {}).get("segments", [])
+	if not segments:
+		return [(start_ms, start_ms + duration_ms, shot.get("text", {}).get("raw_text", ""))]
+	total_chars = sum(len(s.get("raw_text", "")) for s in segments)
+	if total_chars == 0:
+		return []
+	entries = []
+	cur_ms = start_ms
+	for seg in segments:
+		raw_text = seg.get("raw_text", "").strip()
+		if not raw_text:
+			continue
+		seg_len = len(raw_text) / total_chars * duration_ms
+		end_ms = cur_ms + int(seg_len)
+		entries.append((cur_ms, end_ms, raw_text))
+		cur_ms = end_ms
+	return entries
+
+
+def _shot_groups_from_timeline(shots: list[dict], timeline: Timeline) -> list[tuple[str, int, list[tuple[int, int, str]]]]:
+	"""
+	直接查 audio/timeline.json：O(shots)，不读音频。返回 [(shot_id, shot_start_ms, entries)]。
+	字幕从 segment 起点显示到下一段起点（含其后静音）；无 segment 时间的 shot 退回比例估算。
+	"""
+	groups = []
+	for shot in shots:
+		shot_id = shot.get("shot_id", "")
+		tl_shot = timeline.shot(shot_id)
+		if tl_shot is None:
+			continue
+		tl_segs = {s["seg_id"]: s for s in tl_shot.get("segments") or []}
+		segments = shot.get("speech", {}).get("segments", [])
+		if not tl_segs or not segments:
+			entries = _proportional_entries(shot, tl_shot["start_ms"], tl_shot["end_ms"] - tl_shot["start_ms"])
+			groups.append((shot_id, tl_shot["start_ms"], entries))
+			continue
+		entries = []
+		for seg in segments:
+			raw_text = seg.get("raw_text", "").strip()
+			t = tl_segs.get(seg.get("seg_id", ""))
+			if not raw_text or t is None:
+				continue
+			entries.append((t["start_ms"], t["end_ms"] + t.get("pause_after_ms", 0), raw_text))
+		groups.append((shot_id, tl_shot["start_ms"], entries))
+	return groups
+
+
+def _shot_groups_from_wavs(shots: list[dict], paths: ChapterPaths) -> list[tuple[str, int, list[tuple[int, int, str]]]]:
+	"""旧版 ChapterPack（无 timeline.json）：读 shot wav 时长，按字数比例估算。"""
+	groups = []
+	cur_ms = 0
+
+	for shot in shots:
+		shot_id = shot.get("shot_id", "")
+		shot_wav_path = paths.audio_shots_dir / f"{shot_id}.wav"
+
+		if not shot_wav_path.exists():
+			continue
+
+		with wave.open(str(shot_wav_path), "rb") as wf:
+			frames = wf.getnframes()
+			rate = wf.getframerate()
+			shot_duration_ms = int(frames / rate * 1000)
+
+		groups.append((shot_id, cur_ms, _proportional_entries(shot, cur_ms, shot_duration_ms)))
+		cur_ms += shot_duration_ms
+
+		# 加上 shot 间停顿（与 chapter.wav 一致）
+		gap = shot.get("gap_after_ms", SHOT_BOUNDARY_PAUSE_MS)
+		cur_ms += gap
+	return groups
+
+
+def _flatten(groups: list[tuple[str, int, list[tuple[int, int, str]]]]) -> list[tuple[int, int, str]]:
+	return [e for _, _, entries in groups for e in entries]
+
+
+def _energy_align_config() -> EnergyAlignConfig:
+	cfg = get_stage_config("align")
+	d = EnergyAlignConfig()
+	return EnergyAlignConfig(
+		frame_ms=int(cfg.get("energy_frame_ms") or d.frame_ms),
+		silence_rel_db=float(cfg.get("energy_silence_rel_db") or d.silence_rel_db),
+		min_silence_ms=int(cfg.get("energy_min_silence_ms") or d.min_silence_ms),
+		max_shift_ms=int(cfg.get("energy_max_shift_ms") or d.max_shift_ms),
+		split_sentences=bool(cfg.get("energy_split_sentences", d.split_sentences)),
+	)
+
+
+def _energy_refine(
+	groups: list[tuple[str, int, list[tuple[int, int, str]]]],
+	paths: ChapterPaths,
+	aligner: EnergyAligner,
+) -> tuple[list[tuple[int, int, str]], list[dict]]:
+	"""
+	逐 shot 读 wav，把估算边界吸附到静音处。shot wav 缺失时保留估算。
+	返回 (章节绝对 entries, 每 shot 诊断信息)。
+	"""
+	entries = []
+	report = []
+	for shot_id, offset, shot_entries in groups:
+		wav_path = paths.audio_shots_dir / f"{shot_id}.wav"
+		if not shot_entries or not wav_path.exists():
+			entries.extend(shot_entries)
+			continue
+		local = [(s - offset, e - offset, t) for s, e, t in shot_entries]
+		aligned, num_silences = aligner.align_shot(wav_path, local)
+		entries.extend((s + offset, e + offset, t) for s, e, t in aligned)
+		report.append({
+			"shot_id": shot_id,
+			"num_silences": num_silences,
+			"entries": [{"start_ms": s, "end_ms": e, "text": t} for s, e, t in aligned],
+		})
+	return entries, report
+
+
 class AlignStage:
 	name = "align"
 
@@ -84,47 +211,36 @@ class AlignStage:
 		if m.stage not in ("tts_done", "aligned", "rendered"):
 			raise ValueError(f"Align requires tts_done, got {m.stage}")
 
-		entries = []
-		cur_ms = 0
+		timeline = load_timeline(paths.audio_timeline_json)
+		if timeline is not None:
+			groups = _shot_groups_from_timeline(shots, timeline)
+		else:
+			groups = _shot_groups_from_wavs(shots, paths)
 
-		for i, shot in enumerate(shots):
-			shot_id = shot.get("shot_id", "")
-			shot_wav_path = paths.audio_shots_dir / f"{shot_id}.wav"
-
-			if not shot_wav_path.exists():
-				continue
-
-			with wave.open(str(shot_wav_path), "rb") as wf:
-				frames = wf.getnframes()
-				rate = wf.getframerate()
-				shot_duration_ms = int(frames / rate * 1000)
-
-			segments = shot.get("speech", {}).get("segments", [])
-			if not segments:
-				entries.append((cur_ms, cur_ms + shot_duration_ms, shot.get("text", {}).get("raw_text", "")))
-				cur_ms += shot_duration_ms
-			else:
-				total_chars = sum(len(s.get("raw_text", "")) for s in segments)
-				if total_chars == 0:
-					cur_ms += shot_duration_ms
-				else:
-					for seg in segments:
-						raw_text = seg.get("raw_text", "").strip()
-						if not raw_text:
-							continue
-						seg_len = len(raw_text) / total_chars * shot_duration_ms
-						end_ms = cur_ms + int(seg_len)
-						entries.append((cur_ms, end_ms, raw_text))
-						cur_ms = end_ms
-
-			# 加上 shot 间停顿（与 chapter.wav 一致）
-			gap = shot.get("gap_after_ms", SHOT_BOUNDARY_PAUSE_MS)
-			cur_ms += gap
+		provider = str(get_stage_config("align").get("provider") or "lite").lower()
+		if provider == "energy" and importlib.util.find_spec("numpy") is None:
+			m.add_warning("align provider energy requires numpy; fallback to lite")
+			provider = "lite"
 
 		paths.subtitles_dir.mkdir(parents=True, exist_ok=True)
+		if provider == "energy":
+			cfg = _energy_align_config()
+			entries, report = _energy_refine(groups, paths, EnergyAligner(cfg))
+			paths.subtitles_align_dir.mkdir(parents=True, exist_ok=True)
+			out_path = paths.subtitles_align_dir / "energy_align.json"
+			out_path.write_text(
+				json.dumps({"config": asdict(cfg), "shots": report}, ensure_ascii=False, indent=2),
+				encoding="utf-8",
+			)
+			m.artifacts["subtitles_align"] = "subtitles/align/energy_align.json"
+		else:
+			provider = "lite"
+			entries = _flatten(groups)
+
 		_write_srt(entries, paths.subtitles_srt)
 		_write_ass(entries, paths.subtitles_ass)
 
+		m.providers["align"] = {"provider": provider}
 		m.set_stage("aligned")
 		m.mark_done("align")
 		save_manifest(paths.manifest, m)
@@ -10,6 +10,7 @@ Anchors Stage：生成角色锚点 + 风格锚点（16:9）。
 
 from __future__ import annotations
 
+import hashlib
 import json
 import re
 from collections import Counter
@@ -87,9 +88,9 @@ def _char_description(characters: list, char_id: str) -> tuple[str, str]:
 
 
 def _stable_seed(chapter_id: str, char_id: str) -> int:
-	"""可复现 seed。"""
-	h = hash(f"{chapter_id}:{char_id}") % (2**31)
-	return abs(h) if h != 0 else 12345
+	"""可复现 seed（跨进程稳定：内置 hash() 对 str 每个进程加盐，cassette 回放会对不上）。"""
+	h = int(hashlib.sha256(f"{chapter_id}:{char_id}".encode("utf-8")).hexdigest()[:8], 16) % (2**31)
+	return h if h != 0 else 12345
 
 
 class AnchorsGenerateStage:
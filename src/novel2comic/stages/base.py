@@ -26,12 +26,14 @@ class StageContext:
 	- novel_id/chapter_id：用于写 manifest/meta、shotscript/meta 等
 	- chapter_title：可选（后续从 ingest/LLM 提取）
 	- llm_provider_name/llm_model：记录生成计划时的模型信息（便于复现）
+	- render_profile：Render 参数组（configs/stage_render.yaml profiles），空则用配置中的 profile
 	"""
 	novel_id: str
 	chapter_id: str
 	chapter_title: str = ""
 	llm_provider_name: str = ""
 	llm_model: str = ""
+	render_profile: str = ""
 
 
 class Stage(Protocol):
@@ -16,9 +16,9 @@ from novel2comic.core.config_loader import get_stage_config
 from novel2comic.core.io import ChapterPaths, find_project_root
 from novel2comic.core.manifest import load_manifest, save_manifest
 from novel2comic.director_review.apply import apply_director_patch
-from novel2comic.director_review.client import chat_director_review
+from novel2comic.director_review.client import chat_director_review_windowed, review_shots_cascade
 from novel2comic.director_review.fallback import apply_fallback_gaps
-from novel2comic.director_review.prompt import SYSTEM_PROMPT, build_user_prompt
+from novel2comic.director_review.prompt import SYSTEM_PROMPT
 from novel2comic.stages.base import StageContext
 
 
@@ -29,6 +29,10 @@ def _director_config() -> dict:
 		"apply_patch": cfg.get("apply_patch", True),
 		"model": (cfg.get("model") or "").strip() or None,
 		"temperature": float(cfg.get("temperature") or 0.2),
+		"window_shots": int(cfg.get("window_shots") or 0),
+		"overlap_shots": int(cfg.get("overlap_shots") or 0),
+		"workers": int(cfg.get("workers") or 4),
+		"compact": bool(cfg.get("compact_prompt", False)),
 	}
 
 
@@ -63,19 +67,39 @@ class DirectorReviewStage:
 
 		if dr_cfg["enabled"]:
 			try:
-				from novel2comic.providers.llm.siliconflow_client import load_siliconflow_client
+				from novel2comic.providers.llm.cascade import load_cascade
+				from novel2comic.providers.llm.siliconflow_client import load_siliconflow_client, record_llm_usage
 
 				llm = load_siliconflow_client(project_root=str(find_project_root()))
 				if dr_cfg["model"]:
 					llm.cfg.model = dr_cfg["model"]
 				temperature = dr_cfg["temperature"]
+				cascade = load_cascade("director_review")
 				# 临时覆盖 temperature（siliconflow_client 写死 0.2，此处不强制改）
 				try:
-					user_prompt = build_user_prompt(ctx.chapter_id, shots)
-					director_review = chat_director_review(llm, SYSTEM_PROMPT, user_prompt)
-					director_review.setdefault("meta", {})["model"] = llm.cfg.model
+					if dr_cfg["window_shots"] > 0:
+						# 失败窗口的 shot 不在 patch 中，落盘前统一补 fallback gap_after_ms
+						director_review, failed_ids = chat_director_review_windowed(
+							llm,
+							ctx.chapter_id,
+							shots,
+							dr_cfg["window_shots"],
+							overlap_shots=dr_cfg["overlap_shots"],
+							workers=dr_cfg["workers"],
+							compact=dr_cfg["compact"],
+							cascade=cascade,
+						)
+						if failed_ids:
+							n_failed = len(director_review["meta"]["failed_windows"])
+							m.add_warning(f"Director Review fallback in {n_failed}/{director_review['meta']['windows']} windows ({len(failed_ids)} shots)")
+					else:
+						# 无小模型时 cascade 只有默认模型一级；校验通过的响应才写 LLM 缓存
+						director_review = review_shots_cascade(llm, ctx.chapter_id, shots, SYSTEM_PROMPT, dr_cfg["compact"], cascade)
+					# meta.model 由 review_shots_cascade 记为实际应答的模型（cascade 小模型或默认模型）
+					director_review.setdefault("meta", {}).setdefault("model", llm.cfg.model)
 					director_review.setdefault("meta", {})["fallback"] = False
 				finally:
+					record_llm_usage(m.providers, self.name, llm.usage())
 					llm.close()
 			except Exception as e:
 				used_fallback = True
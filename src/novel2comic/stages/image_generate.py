@@ -6,6 +6,7 @@ Image Stage：为每个 shot 生成 16:9 全幅静帧。
 - Draft：Qwen/Qwen-Image 文生图（1664x928, steps=50, cfg=4）
 - Refine：同场景连续镜头用 Qwen/Qwen-Image-Edit，ref=prev_shot
 - 断链回退：连续失败 >=2 次或 attempt3 强制回退 T2I
+- provider 录制 / 回放（providers/cassette）时 seed 按 (shot_id, attempt) 固定，回放请求与录制一致
 """
 
 from __future__ import annotations
@@ -29,6 +30,7 @@ from novel2comic.core.image_prompt import (
 from novel2comic.core.image_qc import parse_size, qc_image
 from novel2comic.core.io import ChapterPaths, find_project_root
 from novel2comic.core.manifest import load_manifest, save_manifest
+from novel2comic.core.singleflight import record_singleflight
 from novel2comic.providers.image.image_qwen import (
 	DEFAULT_CFG,
 	DEFAULT_IMAGE_SIZE as QWEN_IMAGE_SIZE,
@@ -37,6 +39,10 @@ from novel2comic.providers.image.image_qwen import (
 	generate_t2i as qwen_t2i,
 	load_qwen_config,
 )
+from novel2comic.providers.breaker import CircuitOpenError, record_breakers, trip_counts
+from novel2comic.providers.cassette import OFF as CASSETTE_OFF, cassette_mode, record_cassette
+from novel2comic.providers.limiter import record_limits
+from novel2comic.providers.session import retry_policy
 
 ERR_MSG_META_LEN = 300
 ERR_MSG_MANIFEST_LEN = 200
@@ -70,6 +76,13 @@ def _prompt_hash(prompt: str) -> str:
 	return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
 
 
+def _pick_seed(shot_id: str, attempt: int, stable: bool) -> int:
+	"""默认随机；stable（cassette 录制 / 回放）时按 (shot_id, attempt) 固定，保证回放命中。"""
+	if stable:
+		return int(hashlib.sha256(f"{shot_id}:{attempt}".encode("utf-8")).hexdigest()[:8], 16) % 1_000_000_000
+	return random.randint(0, 999_999_999)
+
+
 def _infer_char_from_text(text: str) -> str:
 	"""简单启发式：从文本提取可能的人名。"""
 	import re
@@ -133,7 +146,8 @@ def _generate_one_shot(
 	meta_path = paths.images_shots_dir / f"shot_{shot_id}.meta.json"
 	image_size = img_cfg["image_size"]
 	expected_w, expected_h = parse_size(image_size)
-	seed = random.randint(0, 999_999_999)
+	stable_seed = cassette_mode() != CASSETTE_OFF
+	seed = _pick_seed(shot_id, 0, stable_seed)
 	use_vlm = bool(img_cfg.get("use_vlm_review", False))
 	max_attempts = int(img_cfg.get("review_max_attempts", 8)) if use_vlm else int(img_cfg.get("max_attempts", 3))
 	require_char = bool(img_cfg.get("require_char_anchor", False))
@@ -170,7 +184,7 @@ def _generate_one_shot(
 
 	for attempt in range(max_attempts):
 		if attempt >= 1:
-			seed = random.randint(0, 999_999_999)
+			seed = _pick_seed(shot_id, attempt, stable_seed)
 
 		# Ref 选择：force_ref > char_anchor preferred > chain > t2i
 		force_t2i = attempt >= 2 and (force_ref or chain_allowed)
@@ -267,8 +281,9 @@ def _generate_one_shot(
 				"error": err,
 			}
 			attempts_log.append(attempt_rec)
-			if attempt < max_attempts - 1:
-				time.sleep(2 ** attempt)
+			# 熔断中不再走重试阶梯，直接失败（下次重跑再生成）
+			if attempt < max_attempts - 1 and not isinstance(e, CircuitOpenError):
+				time.sleep(retry_policy().delay(attempt))
 				continue
 			meta_record = {"attempts": attempts_log, "attempt_idx": attempt + 1, "ref_used": ref_used, **attempt_rec}
 			meta_path.write_text(json.dumps(meta_record, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -379,8 +394,8 @@ def _generate_one_shot(
 			except Exception as e:
 				attempt_rec["review"] = {"round": 1, "pass": False, "error": str(e)[:200]}
 				attempts_log.append(attempt_rec)
-				if attempt < max_attempts - 1:
-					time.sleep(1)
+				if attempt < max_attempts - 1 and not isinstance(e, CircuitOpenError):
+					time.sleep(retry_policy().delay(0))
 					continue
 				meta_record = {"attempts": attempts_log, **attempt_rec}
 				meta_path.write_text(json.dumps(meta_record, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -422,6 +437,7 @@ class ImageGenerateStage:
 		paths.images_shots_dir.mkdir(parents=True, exist_ok=True)
 		img_cfg = _image_config()
 		api_cfg = load_qwen_config(project_root=str(find_project_root()))
+		trips_before = trip_counts()
 
 		total_ms = 0
 		ok_count = 0
@@ -526,5 +542,9 @@ class ImageGenerateStage:
 		m.mark_done("image")
 		m.durations["image_ms"] = total_ms
 		m.artifacts["shots_images_dir"] = "images/shots/"
+		record_limits(m.providers)
+		record_singleflight(m.providers)
+		record_breakers(m, trips_before)
+		record_cassette(m.providers)
 		save_manifest(paths.manifest, m)
 		print(f"[OK] image stage done: {ok_count} ok, {fail_count} failed")
@@ -4,7 +4,7 @@ novel2comic/stages/plan.py
 
 Plan 阶段：为 shots 补齐 speech 字段（default + segments）。
 1) deterministic 按引号切 segments
-2) 调用 SpeechPlanSkill 得到 patch
+2) 调用 SpeechPlanSkill 得到 patch（长章节按窗口并发，失败窗口单独回退）
 3) 应用 patch，落盘 shotscript
 """
 
@@ -13,10 +13,17 @@ from __future__ import annotations
 import json
 from pathlib import Path
 
+from novel2comic.core.config_loader import get_stage_config
 from novel2comic.core.io import ChapterPaths, find_project_root
 from novel2comic.core.manifest import load_manifest, save_manifest
 from novel2comic.core.quote_splitter import split_quote_segments, QuoteSegment
 from novel2comic.core.speech_schema import default_speech, default_segment
+from novel2comic.skills.speech_plan.skill import (
+	DEFAULT_OVERLAP_SHOTS,
+	DEFAULT_RETRIES,
+	DEFAULT_WINDOW_SHOTS,
+	DEFAULT_WORKERS,
+)
 from novel2comic.stages.base import StageContext
 
 
@@ -53,6 +60,18 @@ def _ensure_speech_on_shots(shots: list[dict]) -> list[dict]:
 	return result
 
 
+def _speech_plan_config() -> dict:
+	cfg = get_stage_config("plan").get("speech_plan") or {}
+	return {
+		"window_shots": int(cfg.get("window_shots", DEFAULT_WINDOW_SHOTS)),
+		"overlap_shots": int(cfg.get("overlap_shots", DEFAULT_OVERLAP_SHOTS)),
+		"workers": int(cfg.get("workers", DEFAULT_WORKERS)),
+		"retries": int(cfg.get("retries", DEFAULT_RETRIES)),
+		"compact": bool(cfg.get("compact_prompt", False)),
+		"stream": bool(cfg.get("stream", False)),
+	}
+
+
 class PlanStage:
 	name = "plan"
 
@@ -72,15 +91,24 @@ class PlanStage:
 		# 2) 调用 SpeechPlanSkill（LLM 可用时）
 		m = load_manifest(paths.manifest)
 		try:
-			from novel2comic.providers.llm.siliconflow_client import load_siliconflow_client
+			from novel2comic.providers.llm.siliconflow_client import load_siliconflow_client, record_llm_usage
+			from novel2comic.providers.llm.cascade import load_cascade
 			from novel2comic.skills.speech_plan.skill import SpeechPlanSkill
 
 			llm = load_siliconflow_client(project_root=str(find_project_root()))
 			try:
-				skill = SpeechPlanSkill(llm)
+				skill = SpeechPlanSkill(llm, cascade=load_cascade("speech_plan"), **_speech_plan_config())
 				result = skill.run(ctx.chapter_id, shots)
 				shots = result.shots
+				if result.failed_windows or result.truncated_windows:
+					msg = (
+						f"SpeechPlan fallback in {result.failed_windows}/{result.windows} windows"
+						f" ({result.truncated_windows} truncated): {result.error[:300]}"
+					)
+					m.add_warning(msg)
+					print(f"[WARN] {msg}")
 			finally:
+				record_llm_usage(m.providers, self.name, llm.usage())
 				llm.close()
 		except Exception as e:
 			# 无 LLM 或失败：使用默认模板，但必须记录
@@ -2,16 +2,411 @@
 """
 novel2comic/stages/render.py
 
-Render 阶段：占位图 + chapter.wav + chapter.ass -> video/preview.mp4
+Render 阶段：shot 图片 + chapter.wav + chapter.ass -> video/preview.mp4
+- mode=image（默认）：一 shot 一 clip（图片 + motion + 本段字幕），多进程并行编码到 video/clips/，
+  再用 concat demuxer 拷贝拼接（不重编码），音频取 chapter.wav
+- mode=color：旧版单进程纯色背景 + 整章字幕烧录
+- profile：configs profiles.<name> 覆盖顶层参数（如 proxy：640x360 ultrafast 快速 QA 预览），
+  CLI `run --profile proxy` 优先；非 default profile 输出 video/<profile>.mp4，clip 缓存独立
+- 所有 ffmpeg 经 core/ffmpeg_pool 执行：进程内限并发、按核数分配 -threads、-progress 进度/ETA、超时
+- hls=true：另出 video/hls/（fMP4 分片，一 shot 一分片），分片随 clip 完成并发封装，playlist 增量写出
+- subtitles=burn（默认，成片）烧录字幕；subtitles=soft 封装为字幕流（mp4: mov_text，mkv: ASS），
+  字幕改动不触发 clip 重编码，只需拷贝重封装
+参数见 configs/stage_render.yaml。
 """
 
 from __future__ import annotations
 
-import subprocess
+import json
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from novel2comic.core.config_loader import get_stage_config
+from novel2comic.core.ffmpeg_pool import DEFAULT_TIMEOUT_S, FFmpegPool, ProgressBoard, get_ffmpeg_pool
+from novel2comic.core.hls import PLAYLIST_NAME, HlsPlaylistWriter, HlsSegment, build_segment_cmd, write_segment_files
 from novel2comic.core.io import ChapterPaths
 from novel2comic.core.manifest import load_manifest, save_manifest
+from novel2comic.core.render_plan import (
+	ClipSpec,
+	RenderSettings,
+	build_clip_cmd,
+	build_concat_cmd,
+	build_prescale_cmd,
+	clip_cache_key,
+	clip_events,
+	file_sha256,
+	normalize_motion,
+	plan_clips,
+	render_ass,
+	split_ass,
+	subtitle_codec,
+	text_sha256,
+	write_concat_list,
+)
+from novel2comic.core.timeline import load_timeline
+from novel2comic.core.tts_utils import SHOT_BOUNDARY_PAUSE_MS
+
+
+DEFAULT_PROFILE = "default"
+
+
+def _profile_config(cfg: dict, profile: str) -> dict:
+	"""profiles.<name> 覆盖顶层参数；default 即顶层参数本身。"""
+	if profile == DEFAULT_PROFILE:
+		return cfg
+	overrides = (cfg.get("profiles") or {}).get(profile)
+	if overrides is None:
+		raise ValueError(f"unknown render profile: {profile}")
+	return {**cfg, **overrides}
+
+
+def _hls_dir(paths: ChapterPaths, profile: str) -> Path:
+	if profile == DEFAULT_PROFILE:
+		return paths.video_hls_dir
+	return paths.video_dir / f"hls_{profile}"
+
+
+def _clips_dir(paths: ChapterPaths, profile: str) -> Path:
+	"""各 profile 独立的 clip 目录与缓存，互不覆盖。"""
+	if profile == DEFAULT_PROFILE:
+		return paths.video_clips_dir
+	return paths.video_dir / f"clips_{profile}"
+
+
+def _render_settings(cfg: dict) -> RenderSettings:
+	d = RenderSettings()
+	return RenderSettings(
+		width=int(cfg.get("width") or d.width),
+		height=int(cfg.get("height") or d.height),
+		fps=int(cfg.get("fps") or d.fps),
+		preset=str(cfg.get("preset") or d.preset),
+		crf=int(cfg.get("crf") if cfg.get("crf") is not None else d.crf),
+		audio_bitrate=str(cfg.get("audio_bitrate") or d.audio_bitrate),
+	)
+
+
+def _ffmpeg_pool(cfg: dict) -> FFmpegPool:
+	"""进程内共享的 ffmpeg 池：workers 为同时运行的 ffmpeg 上限（0 = CPU 核数一半）。"""
+	return get_ffmpeg_pool(
+		max_procs=int(cfg.get("workers") or 0),
+		timeout_s=float(cfg.get("timeout_s") or DEFAULT_TIMEOUT_S),
+	)
+
+
+def _shot_starts(shots: list[dict], paths: ChapterPaths) -> list[tuple[str, int]]:
+	"""各 shot 在 chapter.wav 中的起点：优先 audio/timeline.json，否则按 shot wav 时长 + gap 累加。"""
+	timeline = load_timeline(paths.audio_timeline_json)
+	if timeline is not None:
+		return [(s["shot_id"], s["start_ms"]) for s in timeline.data.get("shots", [])]
+
+	starts = []
+	cur_ms = 0
+	for shot in shots:
+		shot_id = shot.get("shot_id", "")
+		shot_wav_path = paths.audio_shots_dir / f"{shot_id}.wav"
+		if not shot_wav_path.exists():
+			continue
+		with wave.open(str(shot_wav_path), "rb") as wf:
+			shot_ms = int(wf.getnframes() / wf.getframerate() * 1000)
+		starts.append((shot_id, cur_ms))
+		cur_ms += shot_ms + shot.get("gap_after_ms", SHOT_BOUNDARY_PAUSE_MS)
+	return starts
+
+
+def _load_clip_index(path: Path) -> dict:
+	if not path.exists():
+		return {}
+	try:
+		data = json.loads(path.read_text(encoding="utf-8"))
+	except (OSError, ValueError):
+		return {}
+	return data if isinstance(data, dict) else {}
+
+
+def _save_clip_index(path: Path, index: dict) -> None:
+	path.write_text(json.dumps(index, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def _encode_segment(
+	pool: FFmpegPool,
+	paths: ChapterPaths,
+	hls_dir: Path,
+	clip: ClipSpec,
+	clip_path: Path,
+	seg_task: tuple,
+	settings: RenderSettings,
+) -> str | None:
+	"""clip + 音频区间 -> fragmented mp4 -> 拆为 init/m4s。"""
+	seg, _, start_s, _ = seg_task
+	tmp = hls_dir / f"{clip.shot_id}.frag.mp4"
+	cmd = build_segment_cmd(clip_path, paths.audio_chapter_wav, start_s, seg.duration_s, tmp, settings.audio_bitrate)
+	r = pool.run(cmd, label=f"{clip.shot_id}:hls")
+	if not r.ok:
+		return r.error
+	try:
+		write_segment_files(tmp, hls_dir / seg.init, hls_dir / seg.media)
+	except (OSError, ValueError) as e:
+		return f"{type(e).__name__}: {e}"
+	return None
+
+
+def _prescale_images(pool: FFmpegPool, clips: list[ClipSpec], clips_dir: Path, settings: RenderSettings) -> str | None:
+	"""
+	独立阶段：在 clip 编码前把待编码 clip 的图片缩放到目标尺寸，clip.image 改指缩放结果。
+	按内容哈希 + 尺寸缓存，同一图片（多个 shot 共用）只缩放一次，不会并发写同一文件。返回错误信息或 None。
+	"""
+	targets: dict[Path, Path] = {}
+	for clip in clips:
+		if clip.image is None:
+			continue
+		scaled = clips_dir / "images" / f"{clip.image_sha[:16]}_{settings.width}x{settings.height}.png"
+		if not scaled.exists():
+			targets.setdefault(scaled, clip.image)
+		clip.image = scaled
+	if not targets:
+		return None
+	(clips_dir / "images").mkdir(parents=True, exist_ok=True)
+
+	def run_one(item: tuple[Path, Path]) -> str | None:
+		scaled, src = item
+		r = pool.run(build_prescale_cmd(src, scaled, settings), label=f"prescale:{scaled.stem}")
+		return None if r.ok else f"ffmpeg prescale {src.name} failed: {r.error}"
+
+	with ThreadPoolExecutor(max_workers=min(pool.max_procs, len(targets))) as executor:
+		errors = list(executor.map(run_one, targets.items()))
+	return next((e for e in errors if e), None)
+
+
+def _encode_clip(pool: FFmpegPool, clip: ClipSpec, cmd: list[str], board: ProgressBoard) -> str | None:
+	"""编码一个 clip；返回错误信息或 None。"""
+	r = pool.run(cmd, duration_ms=clip.duration_ms, label=clip.shot_id, on_progress=board.update)
+	return None if r.ok else r.error
+
+
+def _output_path(paths: ChapterPaths, container: str, profile: str = DEFAULT_PROFILE) -> Path:
+	"""default -> video/preview.mp4；其它 profile -> video/<profile>.mp4（不覆盖正式预览）。"""
+	out = paths.video_preview_mp4 if profile == DEFAULT_PROFILE else paths.video_dir / f"{profile}.mp4"
+	return out.with_suffix(".mkv") if container == "mkv" else out
+
+
+def _soft_subtitle_path(paths: ChapterPaths, container: str) -> Path:
+	"""mkv 保留 ASS 样式；mp4 的 mov_text 无样式，优先用 SRT。"""
+	if container != "mkv" and paths.subtitles_srt.exists():
+		return paths.subtitles_srt
+	return paths.subtitles_ass
+
+
+def _render_color(
+	paths: ChapterPaths,
+	audio_ms: int,
+	soft: bool,
+	container: str,
+	cfg: dict,
+	profile: str = DEFAULT_PROFILE,
+) -> None:
+	"""
+	旧版：纯色背景 + 音频 + 整章 ASS 烧录（单个 ffmpeg）。soft 时字幕作为字幕流封装。
+	cfg 为已合并 profile 的参数：尺寸、帧率、preset、crf、音频码率与 image 模式一致。
+	"""
+	settings = _render_settings(cfg)
+	duration_sec = audio_ms / 1000.0
+	ass_path = paths.subtitles_ass.resolve()
+	cmd = [
+		"ffmpeg", "-y",
+		"-f", "lavfi",
+		"-i", f"color=c=0x1a1a2e:s={settings.width}x{settings.height}:r={settings.fps}:d={duration_sec}",
+		"-i", str(paths.audio_chapter_wav),
+	]
+	if soft:
+		cmd += [
+			"-i", str(_soft_subtitle_path(paths, container)),
+			"-map", "0:v", "-map", "1:a", "-map", "2:s",
+			"-c:s", subtitle_codec(container),
+		]
+	else:
+		cmd += ["-vf", f"ass={ass_path}"]
+	cmd += [
+		"-c:v", "libx264", "-preset", settings.preset, "-crf", str(settings.crf),
+		"-c:a", "aac", "-b:a", settings.audio_bitrate,
+		"-shortest",
+		str(_output_path(paths, container, profile)),
+	]
+	board = ProgressBoard(audio_ms)
+	r = _ffmpeg_pool(cfg).run(cmd, duration_ms=audio_ms, label="chapter", on_progress=board.update)
+	if not r.ok:
+		raise RuntimeError(f"ffmpeg failed: {r.error}")
+
+
+def _render_clips(
+	paths: ChapterPaths,
+	shots: list[dict],
+	audio_ms: int,
+	cfg: dict,
+	profile: str = DEFAULT_PROFILE,
+) -> list[ClipSpec]:
+	"""一 shot 一 clip 并行编码，然后 concat 拷贝拼接。返回 clip 列表。cfg 为已合并 profile 的参数。"""
+	settings = _render_settings(cfg)
+	soft = str(cfg.get("subtitles") or "burn").lower() == "soft"
+	container = str(cfg.get("container") or "mp4").lower()
+	prescale = bool(cfg.get("prescale_images", False))
+
+	shots_by_id = {s.get("shot_id", ""): s for s in shots}
+	motions = {sid: normalize_motion(s.get("motion")) for sid, s in shots_by_id.items()}
+	static_ids = {sid for sid, mo in motions.items() if mo["type"] == "static"}
+	clips = plan_clips(
+		_shot_starts(shots, paths),
+		audio_ms,
+		settings.fps,
+		static_ids=static_ids,
+		static_fps=int(cfg.get("static_fps") or 0),
+	)
+	if not clips:
+		raise ValueError("no shot clips to render (missing timeline and shot wavs)")
+
+	header, events = split_ass(paths.subtitles_ass.read_text(encoding="utf-8"))
+	header_sha = text_sha256(header)
+
+	clips_dir = _clips_dir(paths, profile)
+	clips_dir.mkdir(parents=True, exist_ok=True)
+	use_cache = bool(cfg.get("clip_cache", True))
+	index_path = clips_dir / "clips.json"
+	index = _load_clip_index(index_path) if use_cache else {}
+
+	hls_dir = _hls_dir(paths, profile) if bool(cfg.get("hls", False)) else None
+	hls_index = {}
+	if hls_dir is not None:
+		hls_dir.mkdir(parents=True, exist_ok=True)
+		hls_index = _load_clip_index(hls_dir / "segments.json") if use_cache else {}
+
+	pending = []
+	clip_paths = []
+	tasks = []
+	cursor_s = 0.0
+	for clip in clips:
+		shot = shots_by_id.get(clip.shot_id, {})
+		image = paths.images_shots_dir / f"shot_{clip.shot_id}.png"
+		if image.exists():
+			clip.image = image
+			clip.image_sha = file_sha256(image)
+		clip.motion = motions.get(clip.shot_id) or normalize_motion(shot.get("motion"))
+		# soft：clip 不含字幕，字幕不参与 clip 指纹
+		clip.events = [] if soft else clip_events(events, clip.start_ms, clip.end_ms)
+		# 烧录时 clip.ass 沿用章节头部：样式变更须使含字幕的 clip 失效
+		clip.ass_header_sha = header_sha if clip.events else None
+
+		out_path = clips_dir / f"{clip.shot_id}.mp4"
+		clip_paths.append(out_path)
+		key = clip_cache_key(clip, settings)
+		clip_stale = not (use_cache and index.get(clip.shot_id) == key and out_path.exists())
+		if clip_stale:
+			pending.append(clip)
+
+		# HLS 分片：音频区间按 clip 实际帧时长累加，与视频严格对齐
+		seg_task = None
+		if hls_dir is not None:
+			dur_s = clip.frames / (clip.fps or settings.fps)
+			seg_key = f"{key}:{cursor_s:.6f}:{dur_s:.6f}:{settings.audio_bitrate}"
+			seg = HlsSegment(init=f"{clip.shot_id}_init.mp4", media=f"{clip.shot_id}.m4s", duration_s=dur_s)
+			seg_fresh = (
+				not clip_stale
+				and hls_index.get(clip.shot_id) == seg_key
+				and (hls_dir / seg.init).exists()
+				and (hls_dir / seg.media).exists()
+			)
+			seg_task = (seg, seg_key, cursor_s, not seg_fresh)
+			cursor_s += dur_s
+		tasks.append((clip, out_path, key, clip_stale, seg_task))
+
+	# 先摘掉待编码 clip / 分片的旧 key：中断时不会把半成品当缓存命中
+	for clip, _, _, clip_stale, _ in tasks:
+		if clip_stale:
+			index.pop(clip.shot_id, None)
+	for clip, _, _, _, seg_task in tasks:
+		if seg_task is not None and seg_task[3]:
+			hls_index.pop(clip.shot_id, None)
+	if use_cache:
+		_save_clip_index(index_path, index)
+		if hls_dir is not None:
+			_save_clip_index(hls_dir / "segments.json", hls_index)
+
+	playlist = None
+	if hls_dir is not None:
+		playlist = HlsPlaylistWriter(hls_dir / PLAYLIST_NAME, [t[4][0] for t in tasks])
+
+	pool = _ffmpeg_pool(cfg)
+	if prescale:
+		err = _prescale_images(pool, [t[0] for t in tasks if t[3]], clips_dir, settings)
+		if err:
+			raise RuntimeError(err)
+
+	jobs = []
+	for i, (clip, out_path, key, clip_stale, seg_task) in enumerate(tasks):
+		cmd = None
+		if clip_stale:
+			ass_path = None
+			if clip.events:
+				ass_path = clips_dir / f"{clip.shot_id}.ass"
+				ass_path.write_text(render_ass(header, clip.events), encoding="utf-8")
+			cmd = build_clip_cmd(clip, out_path, settings, ass_path=ass_path, threads=pool.threads_per_job)
+		needs_segment = seg_task is not None and seg_task[3]
+		if cmd is None and not needs_segment:
+			if playlist is not None:
+				playlist.mark_done(i)
+			continue
+		jobs.append((i, clip, out_path, key, cmd, seg_task if needs_segment else None))
+
+	failed = None
+	if jobs:
+		# 提交并发数 = 池上限；池内信号量保证多章节同时渲染时总 ffmpeg 数不超限
+		board = ProgressBoard(sum(clip.duration_ms for _, clip, _, _, cmd, _ in jobs if cmd))
+
+		def run_job(job) -> str | None:
+			i, clip, out_path, key, cmd, seg_task = job
+			err = _encode_clip(pool, clip, cmd, board) if cmd else None
+			if err:
+				return f"ffmpeg clip {clip.shot_id} failed: {err}"
+			if cmd:
+				index[clip.shot_id] = key
+			if seg_task is not None:
+				err = _encode_segment(pool, paths, hls_dir, clip, out_path, seg_task, settings)
+				if err:
+					return f"ffmpeg hls segment {clip.shot_id} failed: {err}"
+				hls_index[clip.shot_id] = seg_task[1]
+			if playlist is not None:
+				playlist.mark_done(i)
+			return None
+
+		with ThreadPoolExecutor(max_workers=min(pool.max_procs, len(jobs))) as executor:
+			errors = list(executor.map(run_job, jobs))
+		failed = next((e for e in errors if e), None)
+	if use_cache:
+		_save_clip_index(index_path, index)
+		if hls_dir is not None:
+			_save_clip_index(hls_dir / "segments.json", hls_index)
+	if failed:
+		raise RuntimeError(failed)
+	if playlist is not None:
+		playlist.finish()
+	print(f"[INFO] render clips: {len(pending)} encoded, {len(clips) - len(pending)} cached")
+
+	list_path = clips_dir / "concat.txt"
+	write_concat_list(clip_paths, list_path)
+	r = _ffmpeg_pool(cfg).run(
+		build_concat_cmd(
+			list_path,
+			paths.audio_chapter_wav,
+			_output_path(paths, container, profile),
+			settings,
+			subtitle_path=_soft_subtitle_path(paths, container) if soft else None,
+			container=container,
+		),
+		duration_ms=audio_ms,
+		label="concat",
+	)
+	if not r.ok:
+		raise RuntimeError(f"ffmpeg concat failed: {r.error}")
+	return clips
 
 
 class RenderStage:
@@ -32,32 +427,34 @@ class RenderStage:
 		# 从 manifest 或 wav 获取时长
 		audio_ms = m.durations.get("audio_ms", 0)
 		if audio_ms <= 0:
-			import wave
 			with wave.open(str(paths.audio_chapter_wav), "rb") as wf:
 				frames = wf.getnframes()
 				rate = wf.getframerate()
 				audio_ms = int(frames / rate * 1000)
-		duration_sec = audio_ms / 1000.0
-
-		# ffmpeg: 纯色背景 + 音频 + ASS 字幕
-		# -f lavfi -i color=... 生成纯色视频
-		# -i chapter.wav 音频
-		# -vf ass=... 烧录字幕
-		ass_path = paths.subtitles_ass.resolve()
-		cmd = [
-			"ffmpeg", "-y",
-			"-f", "lavfi", "-i", f"color=c=0x1a1a2e:s=1920x1080:d={duration_sec}",
-			"-i", str(paths.audio_chapter_wav),
-			"-vf", f"ass={ass_path}",
-			"-c:v", "libx264", "-preset", "fast", "-crf", "23",
-			"-c:a", "aac", "-b:a", "128k",
-			"-shortest",
-			str(paths.video_preview_mp4),
-		]
-		r = subprocess.run(cmd, capture_output=True, text=True)
-		if r.returncode != 0:
-			raise RuntimeError(f"ffmpeg failed: {r.stderr[:1000]}")
 
+		base_cfg = get_stage_config("render")
+		profile = str(getattr(ctx, "render_profile", "") or base_cfg.get("profile") or DEFAULT_PROFILE).lower()
+		cfg = _profile_config(base_cfg, profile)
+		mode = str(cfg.get("mode") or "image").lower()
+		soft = str(cfg.get("subtitles") or "burn").lower() == "soft"
+		container = str(cfg.get("container") or "mp4").lower()
+		if mode == "color":
+			_render_color(paths, audio_ms, soft, container, cfg, profile)
+		else:
+			shotscript_path = paths.effective_shotscript()
+			if not shotscript_path.exists():
+				raise FileNotFoundError(f"missing {shotscript_path}")
+			shots = json.loads(shotscript_path.read_text(encoding="utf-8")).get("shots", [])
+			_render_clips(paths, shots, audio_ms, cfg, profile)
+			m.artifacts["video_clips_dir"] = _clips_dir(paths, profile).relative_to(paths.root).as_posix() + "/"
+			if cfg.get("hls"):
+				m.artifacts["hls_playlist"] = (_hls_dir(paths, profile) / PLAYLIST_NAME).relative_to(paths.root).as_posix()
+
+		out_rel = _output_path(paths, container, profile).relative_to(paths.root).as_posix()
+		if profile != DEFAULT_PROFILE:
+			m.artifacts[f"{profile}_video"] = out_rel
+		elif container == "mkv":
+			m.artifacts["preview_mkv"] = out_rel
 		m.durations["video_ms"] = audio_ms
 		m.set_stage("rendered")
 		m.mark_done("render")
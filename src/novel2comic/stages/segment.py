@@ -69,16 +69,25 @@ class SegmentStage:
 		shots: list[Shot] = base_shots
 		llm_provider = ""
 		llm_model = ""
+		refine_warning = ""
+		llm_usage: dict = {}
 
 		try:
 			from novel2comic.providers.llm.siliconflow_client import load_siliconflow_client
+			from novel2comic.providers.llm.cascade import load_cascade
 			from novel2comic.skills.refine_shot_split.skill import RefineShotSplitSkill
 			from novel2comic.skills.refine_shot_split.schema import Constraints
 
 			llm = load_siliconflow_client(project_root=str(find_project_root()))
 			try:
-				skill = RefineShotSplitSkill(llm)
 				ref_cfg = seg_cfg.get("refine_shot_split") or {}
+				skill = RefineShotSplitSkill(
+					llm,
+					chunk_shots=int(ref_cfg.get("chunk_shots", 0)),
+					workers=int(ref_cfg.get("workers", 4)),
+					compact=bool(ref_cfg.get("compact_prompt", False)),
+					cascade=load_cascade("refine_shot_split"),
+				)
 				c = Constraints(
 					min_shots=int(ref_cfg.get("min_shots", 60)),
 					max_shots=int(ref_cfg.get("max_shots", 120)),
@@ -86,10 +95,15 @@ class SegmentStage:
 				)
 				result = skill.run(ctx.chapter_id, base_shots, c)
 				shots = result.refined_shots
-				if not result.used_fallback:
+				# 只有 LLM 实际给出结果时才记录；model 为实际应答的模型（cascade 小模型或默认模型）
+				if result.model:
 					llm_provider = "siliconflow"
-					llm_model = llm.cfg.model
+					llm_model = result.model
+				if result.used_fallback:
+					refine_warning = f"refine_shot_split fallback in {result.failed_chunks}/{result.chunks} chunks: {result.error[:300]}"
+					print(f"[WARN] {refine_warning}")
 			finally:
+				llm_usage = llm.usage()
 				llm.close()
 		except Exception as e:
 			# 无 API key 或 LLM 失败：使用 baseline
@@ -139,6 +153,12 @@ class SegmentStage:
 
 		m = load_manifest(paths.manifest)
 		m.durations["num_shots"] = len(shots)
+		if refine_warning:
+			m.add_warning(refine_warning)
+		if llm_usage:
+			from novel2comic.providers.llm.siliconflow_client import record_llm_usage
+
+			record_llm_usage(m.providers, self.name, llm_usage)
 		m.set_stage("segmented")
 		m.mark_done("segment")
 		save_manifest(paths.manifest, m)
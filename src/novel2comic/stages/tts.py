@@ -7,6 +7,9 @@ TTS 阶段：按 shot.speech 合成 audio/shots/<shot_id>.wav，拼接 chapter.w
 - 标点驱动停顿
 - 多音色（narration/quote 按 gender_hint）
 - segment 覆盖 pace
+- 请求打包（合并同音色碎片、拆分超长段，见 core/tts_packer）
+- 可选流式模式（stream: true）：pcm 边收边写 shot wav，记录首字节耗时（只流式落盘，不提供实时试听）
+- 写出 audio/timeline.json：每个 shot / segment 的精确起止 ms
 """
 
 from __future__ import annotations
@@ -15,88 +18,220 @@ import json
 import time
 from pathlib import Path
 
-from novel2comic.core.audio_utils import concat_wavs_with_pauses, wav_duration_ms
+from novel2comic.core.audio_utils import (
+	StreamingWavWriter,
+	concat_wav_files,
+	concat_wavs_with_pauses,
+	wav_duration_ms,
+	wav_frames,
+)
+from novel2comic.core.config_loader import get_stage_config
 from novel2comic.core.io import ChapterPaths, find_project_root
 from novel2comic.core.manifest import load_manifest, save_manifest
+from novel2comic.core.timeline import build_timeline, save_timeline, segment_timings
 from novel2comic.core.speech_schema import PACE_TO_SPEED, cosyvoice2_short_instruction
 from novel2comic.core.tts_utils import get_tail_pause_ms, normalize_tts_input
 from novel2comic.core.tts_utils import SHOT_BOUNDARY_PAUSE_MS
+from novel2comic.core.tts_packer import (
+	DEFAULT_MAX_CHARS,
+	DEFAULT_MERGE_MAX_PAUSE_MS,
+	TTSUnit,
+	pack_requests,
+	unpacked_requests,
+)
+from novel2comic.core.singleflight import record_singleflight
+from novel2comic.providers.breaker import CircuitOpenError, record_breakers, trip_counts
+from novel2comic.providers.cassette import record_cassette
+from novel2comic.providers.limiter import record_limits
+from novel2comic.providers.session import retry_policy
 from novel2comic.providers.tts.siliconflow_tts import load_siliconflow_tts, select_voice
 
 
-def _synthesize_shot(tts_client, shot: dict) -> tuple[str, bytes | None, int, str | None]:
+def _tts_packer_config() -> dict:
+	cfg = get_stage_config("tts")
+	return {
+		"enabled": bool(cfg.get("pack_requests", True)),
+		"max_chars": int(cfg.get("pack_max_chars") or DEFAULT_MAX_CHARS),
+		"merge_max_pause_ms": int(cfg.get("pack_merge_max_pause_ms") or DEFAULT_MERGE_MAX_PAUSE_MS),
+	}
+
+
+def _build_units(tts_client, shot: dict) -> list[TTSUnit]:
+	"""把 shot.speech.segments 清洗为 TTSUnit（voice/style/speed/尾部停顿已确定）。"""
+	speech = shot.get("speech", {})
+	default = speech.get("default", {})
+	segments = speech.get("segments", [])
+	shot_pace = default.get("pace", "normal")
+	shot_emotion = default.get("emotion", "neutral")
+	shot_intensity = default.get("intensity", 0.35)
+
+	units = []
+	for i, seg in enumerate(segments):
+		raw_text = seg.get("raw_text", "").strip()
+		if not raw_text:
+			continue
+
+		kind = seg.get("kind", "narration")
+		is_quote = kind == "quote"
+		tts_clean, extra_pause_ms = normalize_tts_input(raw_text, is_quote=is_quote)
+		if not tts_clean:
+			continue
+
+		# segment 覆盖 pace
+		pace = seg.get("pace") or shot_pace
+		speed = PACE_TO_SPEED.get(pace, 1.0)
+
+		voice = select_voice(kind, seg.get("gender_hint", "unknown"), tts_client.cfg)
+		# 硅基流动文档：instruction 需简短（~10 字），否则会被当正文读出
+		emotion = seg.get("emotion") or shot_emotion
+		intensity = seg.get("intensity") or shot_intensity
+		# 二次防线：neutral + 低 intensity 时不传 style_prompt
+		style = cosyvoice2_short_instruction(emotion) if not (emotion == "neutral" and (intensity or 0.35) <= 0.35) else ""
+		style = (style or "").strip().replace("\n", "").replace("\r", "").replace("\t", "") or None
+
+		units.append(TTSUnit(
+			seg_id=seg.get("seg_id") or f"{shot.get('shot_id', '')}_seg_{i}",
+			text=tts_clean,
+			voice=voice,
+			style_prompt=style,
+			speed=speed,
+			pause_after_ms=get_tail_pause_ms(raw_text) + extra_pause_ms,
+		))
+	return units
+
+
+def _synthesize_shot(
+	tts_client,
+	shot: dict,
+	packer: dict | None = None,
+) -> tuple[str, bytes | None, int, str | None, list[dict]]:
 	"""
-	合成单个 shot 的 wav。返回 (shot_id, wav_bytes, audio_ms, error)。
-	使用 normalize_tts_input、标点停顿、segment pace 覆盖。
+	合成单个 shot 的 wav。返回 (shot_id, wav_bytes, audio_ms, error, seg_timings)。
+	使用 normalize_tts_input、标点停顿、segment pace 覆盖；
+	packer 启用时先合并碎片 / 拆分超长段，再逐请求合成。
+	seg_timings：各 segment 在 shot wav 内的起止 ms（见 core/timeline.segment_timings）。
 	"""
 	shot_id = shot.get("shot_id", "")
 	try:
-		speech = shot.get("speech", {})
-		default = speech.get("default", {})
-		segments = speech.get("segments", [])
-		shot_pace = default.get("pace", "normal")
-		shot_emotion = default.get("emotion", "neutral")
-		shot_intensity = default.get("intensity", 0.35)
+		units = _build_units(tts_client, shot)
+		packer = packer if packer is not None else _tts_packer_config()
+		if packer["enabled"]:
+			requests = pack_requests(units, packer["max_chars"], packer["merge_max_pause_ms"])
+		else:
+			requests = unpacked_requests(units)
 
 		parts = []
 		pauses_after = []
+		policy = retry_policy()
 
-		for seg in segments:
-			raw_text = seg.get("raw_text", "").strip()
-			if not raw_text:
-				continue
-
-			kind = seg.get("kind", "narration")
-			is_quote = kind == "quote"
-			tts_clean, extra_pause_ms = normalize_tts_input(raw_text, is_quote=is_quote)
-			if not tts_clean:
-				continue
-
-			# segment 覆盖 pace
-			pace = seg.get("pace") or shot_pace
-			speed = PACE_TO_SPEED.get(pace, 1.0)
-
-			voice = select_voice(kind, seg.get("gender_hint", "unknown"), tts_client.cfg)
-			# 硅基流动文档：instruction 需简短（~10 字），否则会被当正文读出
-			emotion = seg.get("emotion") or shot_emotion
-			intensity = seg.get("intensity") or shot_intensity
-			# 二次防线：neutral + 低 intensity 时不传 style_prompt
-			style = cosyvoice2_short_instruction(emotion) if not (emotion == "neutral" and (intensity or 0.35) <= 0.35) else ""
-			style = (style or "").strip().replace("\n", "").replace("\r", "").replace("\t", "") or None
-
-			for attempt in range(3):
+		for req in requests:
+			for attempt in range(policy.max_attempts):
 				try:
 					wav_bytes = tts_client.synthesize(
-						tts_clean,
-						voice=voice,
-						style_prompt=style,
-						speed=speed,
+						req.text,
+						voice=req.voice,
+						style_prompt=req.style_prompt,
+						speed=req.speed,
 					)
 					parts.append(wav_bytes)
-					tail_ms = get_tail_pause_ms(raw_text) + extra_pause_ms
-					pauses_after.append(tail_ms)
+					pauses_after.append(req.pause_after_ms)
 					break
 				except Exception as e:
-					if attempt == 2:
+					# 熔断中不再重试等待，直接失败（下次重跑再合成）
+					if attempt == policy.max_attempts - 1 or isinstance(e, CircuitOpenError):
 						err_msg = str(e)
 						if hasattr(e, "args") and e.args:
 							err_msg = f"{type(e).__name__}: {err_msg}"
-						return (shot_id, None, 0, err_msg)
-					time.sleep(1)
+						return (shot_id, None, 0, err_msg, [])
+					time.sleep(policy.delay(attempt))
 
 		if not parts:
-			return (shot_id, None, 0, "no segments")
+			return (shot_id, None, 0, "no segments", [])
 
-		# pauses_after 长度应为 len(parts)-1，最后一段后无静音
-		if len(pauses_after) > len(parts):
+		# pauses_after 长度应为 len(parts)-1，最后一段后无静音（shot 间停顿由 gap_after_ms 负责）
+		if len(pauses_after) > len(parts) - 1:
 			pauses_after = pauses_after[: len(parts) - 1]
 		while len(pauses_after) < len(parts) - 1:
 			pauses_after.append(SHOT_BOUNDARY_PAUSE_MS)
 
+		# 请求级时间：由帧数计算，静音长度与 create_silence_ms 取整方式一致
+		request_spans = []
+		t = 0.0
+		for i, part in enumerate(parts):
+			frames, rate = wav_frames(part)
+			end = t + frames / rate * 1000
+			pause = pauses_after[i] if i < len(pauses_after) else 0
+			nxt = end + int(rate * pause / 1000) / rate * 1000 if pause > 0 else end
+			request_spans.append((t, end, nxt))
+			t = nxt
+		timings = segment_timings([(r.seg_ids, r.seg_chars) for r in requests], request_spans)
+
 		combined = concat_wavs_with_pauses(parts, pauses_after)
-		return (shot_id, combined, wav_duration_ms(combined), None)
+		return (shot_id, combined, wav_duration_ms(combined), None, timings)
 	except Exception as e:
-		return (shot_id, None, 0, f"{type(e).__name__}: {e}")
+		return (shot_id, None, 0, f"{type(e).__name__}: {e}", [])
+
+
+def _synthesize_shot_streaming(
+	tts_client,
+	shot: dict,
+	wav_path: Path,
+	packer: dict | None = None,
+) -> tuple[str, int, float | None, str | None, list[dict]]:
+	"""
+	流式合成单个 shot：PCM 边收边写入 <wav_path>.part，成功后原子改名。
+	返回 (shot_id, audio_ms, ttfb_ms, error, seg_timings)；ttfb_ms 为该 shot 第一个请求的首字节耗时。
+	收益是不在内存里攒整段音频、可测首字节耗时；失败请求会回滚已写入的数据，所以不向外转发 PCM。
+	"""
+	shot_id = shot.get("shot_id", "")
+	part_path = wav_path.with_name(wav_path.name + ".part")
+	try:
+		units = _build_units(tts_client, shot)
+		packer = packer if packer is not None else _tts_packer_config()
+		if packer["enabled"]:
+			requests = pack_requests(units, packer["max_chars"], packer["merge_max_pause_ms"])
+		else:
+			requests = unpacked_requests(units)
+		if not requests:
+			return (shot_id, 0, None, "no segments", [])
+
+		ttfb_ms = None
+		request_spans = []
+		policy = retry_policy()
+		with StreamingWavWriter(part_path, sample_rate=tts_client.cfg.sample_rate) as writer:
+			for req in requests:
+				mark = writer.mark()
+				start = writer.position_ms
+				for attempt in range(policy.max_attempts):
+					try:
+						meta = tts_client.synthesize_stream(
+							req.text,
+							writer.write,
+							voice=req.voice,
+							style_prompt=req.style_prompt,
+							speed=req.speed,
+						)
+						if ttfb_ms is None:
+							ttfb_ms = meta.get("ttfb_ms")
+						break
+					except Exception as e:
+						writer.rollback(mark)
+						if attempt == policy.max_attempts - 1 or isinstance(e, CircuitOpenError):
+							raise
+						time.sleep(policy.delay(attempt))
+				end = writer.position_ms
+				# 与非流式一致：请求之间写停顿，最后一个请求后不写（shot 间停顿由 gap_after_ms 负责）
+				if req is not requests[-1]:
+					writer.write_silence_ms(req.pause_after_ms)
+				request_spans.append((start, end, writer.position_ms))
+			audio_ms = writer.duration_ms
+
+		part_path.replace(wav_path)
+		timings = segment_timings([(r.seg_ids, r.seg_chars) for r in requests], request_spans)
+		return (shot_id, audio_ms, ttfb_ms, None, timings)
+	except Exception as e:
+		part_path.unlink(missing_ok=True)
+		return (shot_id, 0, None, f"{type(e).__name__}: {e}", [])
 
 
 class TTSStage:
@@ -119,9 +254,13 @@ class TTSStage:
 		paths.audio_shots_dir.mkdir(parents=True, exist_ok=True)
 
 		tts = load_siliconflow_tts(project_root=str(find_project_root()))
+		trips_before = trip_counts()
+		packer = _tts_packer_config()
+		stream = bool(get_stage_config("tts").get("stream", False))
 
 		try:
-			chapter_parts = []
+			chapter_parts: list[Path] = []
+			chapter_shot_ids = []
 			shot_gaps = []
 			synthesized_count = 0
 			for shot in shots:
@@ -129,11 +268,16 @@ class TTSStage:
 				shot_wav = paths.audio_shots_dir / f"{shot_id}.wav"
 
 				if shot_wav.exists() and m.shots_index.get(shot_id, {}).get("status") == "ok":
-					chapter_parts.append(shot_wav.read_bytes())
+					chapter_parts.append(shot_wav)
+					chapter_shot_ids.append(shot_id)
 					shot_gaps.append(shot.get("gap_after_ms", SHOT_BOUNDARY_PAUSE_MS))
 					continue
 
-				_, wav_bytes, audio_ms, err = _synthesize_shot(tts, shot)
+				ttfb_ms = None
+				if stream:
+					_, audio_ms, ttfb_ms, err, seg_timings = _synthesize_shot_streaming(tts, shot, shot_wav, packer)
+				else:
+					_, wav_bytes, audio_ms, err, seg_timings = _synthesize_shot(tts, shot, packer)
 				if err:
 					m.shots_index[shot_id] = m.shots_index.get(shot_id, {}) | {
 						"status": "error",
@@ -143,13 +287,18 @@ class TTSStage:
 					save_manifest(paths.manifest, m)
 					continue
 
-				shot_wav.write_bytes(wav_bytes)
+				if not stream:
+					shot_wav.write_bytes(wav_bytes)
 				m.shots_index[shot_id] = {
 					"audio_path": f"audio/shots/{shot_id}.wav",
 					"audio_ms": audio_ms,
 					"status": "ok",
+					"segments": seg_timings,
 				}
-				chapter_parts.append(wav_bytes)
+				if ttfb_ms is not None:
+					m.shots_index[shot_id]["ttfb_ms"] = ttfb_ms
+				chapter_parts.append(shot_wav)
+				chapter_shot_ids.append(shot_id)
 				shot_gaps.append(shot.get("gap_after_ms", SHOT_BOUNDARY_PAUSE_MS))
 				synthesized_count += 1
 				# 每 5 个新合成落盘一次，减少 I/O（断点续跑）
@@ -158,10 +307,34 @@ class TTSStage:
 
 			if chapter_parts:
 				# 使用 per-shot gap_after_ms（director_review 或 fallback），无则用默认
+				# 按文件逐段拼接，不把整章音频读入内存
 				pauses = shot_gaps[:-1] if len(shot_gaps) > 1 else []
-				chapter_wav = concat_wavs_with_pauses(chapter_parts, pauses)
-				paths.audio_chapter_wav.write_bytes(chapter_wav)
-				m.durations["audio_ms"] = wav_duration_ms(chapter_wav)
+				spans = concat_wav_files(chapter_parts, pauses, paths.audio_chapter_wav)
+				m.durations["audio_ms"] = int(spans[-1][1])
+
+				# 时间轴 sidecar：Align/Render 直接查表，无需再读 wav
+				timeline = build_timeline(
+					[
+						{
+							"shot_id": sid,
+							"start_ms": start,
+							"end_ms": end,
+							"gap_after_ms": pauses[i] if i < len(pauses) else 0,
+							"segments": m.shots_index.get(sid, {}).get("segments"),
+						}
+						for i, (sid, (start, end)) in enumerate(zip(chapter_shot_ids, spans))
+					],
+					sample_rate=tts.cfg.sample_rate,
+				)
+				save_timeline(paths.audio_timeline_json, timeline)
+				m.artifacts["audio_timeline"] = "audio/timeline.json"
+			hedger = getattr(tts, "hedger", None)
+			if hedger is not None:
+				m.providers.setdefault("tts", {})["hedge"] = hedger.stats()
+			record_limits(m.providers)
+			record_singleflight(m.providers)
+			record_breakers(m, trips_before)
+			record_cassette(m.providers)
 			m.set_stage("tts_done")
 			m.mark_done("tts")
 			save_manifest(paths.manifest, m)
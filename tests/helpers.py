@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+tests/helpers.py
+
+多个测试模块共用的构造函数（不含测试）。
+"""
+
+from __future__ import annotations
+
+import struct
+
+
+def mp4_box(btype: bytes, payload: bytes = b"") -> bytes:
+	return struct.pack(">I4s", 8 + len(payload), btype) + payload
+
+
+def fake_fmp4() -> bytes:
+	"""最小的 fragmented mp4：ftyp + moov（init）、moof + mdat（media）、mfra（尾部索引）。"""
+	return mp4_box(b"ftyp", b"isom") + mp4_box(b"moov", b"m") + mp4_box(b"moof", b"f") + mp4_box(b"mdat", b"dd") + mp4_box(b"mfra")
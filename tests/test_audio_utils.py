@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_audio_utils.py
+
+音频解码、流式写入与拼接工具单元测试（不依赖 ffmpeg 的路径）。
+"""
+
+from __future__ import annotations
+
+import shutil
+
+import pytest
+
+from novel2comic.core.audio_utils import (
+	StreamingWavWriter,
+	concat_wav_files,
+	concat_wavs_with_pauses,
+	create_silence_ms,
+	decode_to_wav,
+	pcm_to_wav,
+	wav_duration_ms,
+)
+
+
+class TestDecodeToWav:
+	def test_riff_passthrough(self):
+		wav = create_silence_ms(100)
+		assert decode_to_wav(wav, "wav") is wav
+
+	def test_pcm_wrapped_without_ffmpeg(self):
+		pcm = b"\x00\x00" * 24000
+		wav = decode_to_wav(pcm, "pcm", sample_rate=24000)
+		assert wav[:4] == b"RIFF"
+		assert wav_duration_ms(wav) == 1000
+
+	def test_pcm_to_wav_respects_sample_rate(self):
+		pcm = b"\x00\x00" * 16000
+		assert wav_duration_ms(pcm_to_wav(pcm, sample_rate=16000)) == 1000
+
+	@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+	def test_invalid_compressed_bytes_raise(self):
+		with pytest.raises(RuntimeError, match="ffmpeg decode failed"):
+			decode_to_wav(b"not audio at all", "mp3")
+
+
+class TestStreamingWavWriter:
+	def test_incremental_write_and_header(self, tmp_path):
+		path = tmp_path / "s.wav"
+		with StreamingWavWriter(path, sample_rate=24000) as w:
+			w.write(b"\x00" * 3)  # 奇数字节：尾巴暂存
+			w.write(b"\x00" * (48000 - 3))
+			w.write_silence_ms(500)
+		assert wav_duration_ms(path.read_bytes()) == 1500
+
+	def test_rollback_discards_partial_request(self, tmp_path):
+		path = tmp_path / "s.wav"
+		with StreamingWavWriter(path, sample_rate=24000) as w:
+			w.write(b"\x00\x00" * 24000)
+			mark = w.mark()
+			w.write(b"\x00\x00" * 12000)
+			w.rollback(mark)
+		assert wav_duration_ms(path.read_bytes()) == 1000
+
+
+def test_concat_wav_files_matches_in_memory(tmp_path):
+	a = create_silence_ms(300)
+	b = create_silence_ms(200)
+	(tmp_path / "a.wav").write_bytes(a)
+	(tmp_path / "b.wav").write_bytes(b)
+	out = tmp_path / "out.wav"
+	spans = concat_wav_files([tmp_path / "a.wav", tmp_path / "b.wav"], [100], out)
+	assert spans == [(0.0, 300.0), (400.0, 600.0)]
+	assert out.read_bytes() == concat_wavs_with_pauses([a, b], [100])
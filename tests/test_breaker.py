@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""providers/breaker 熔断器单元测试。"""
+
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from novel2comic.core.manifest import new_manifest
+from novel2comic.providers import breaker, limiter
+from novel2comic.providers.breaker import BreakerConfig, CircuitBreaker, CircuitOpenError
+
+
+def test_consecutive_failures_trip_and_half_open_probe(monkeypatch):
+	now = [100.0]
+	monkeypatch.setattr(breaker.time, "monotonic", lambda: now[0])
+	b = CircuitBreaker("speech", BreakerConfig(consecutive_failures=3, open_s=10))
+	for _ in range(3):
+		b.before()
+		b.failure()
+	with pytest.raises(CircuitOpenError):
+		b.before()
+	now[0] += 11
+	b.before()  # 探测请求放行
+	with pytest.raises(CircuitOpenError):
+		b.before()  # 探测期间其余请求仍被拒绝
+	b.success()
+	b.before()
+	st = b.stats()
+	assert st["state"] == "closed" and st["trips"] == 1 and st["rejected"] == 2
+
+
+def test_error_rate_trips_without_consecutive_run():
+	b = CircuitBreaker("images", BreakerConfig(consecutive_failures=100, error_rate=0.5, window=4, min_requests=4))
+	for ok in (True, False, True, False):
+		(b.success if ok else b.failure)()
+	assert b.stats()["state"] == "open"
+
+
+def test_send_counts_5xx_and_transport_errors(monkeypatch):
+	b = CircuitBreaker("chat", BreakerConfig(consecutive_failures=2))
+	monkeypatch.setattr(limiter, "get_breaker", lambda family: b)
+	monkeypatch.setattr(limiter, "get_limiter", lambda family: None)
+	req = httpx.Request("POST", "https://x/chat/completions")
+	assert limiter.send("chat", lambda: httpx.Response(400, request=req)).status_code == 400
+
+	def down():
+		raise httpx.ConnectError("down", request=req)
+
+	with pytest.raises(httpx.ConnectError):
+		limiter.send("chat", down)
+	limiter.send("chat", lambda: httpx.Response(503, request=req))
+	with pytest.raises(CircuitOpenError):
+		limiter.send("chat", lambda: httpx.Response(200, request=req))
+
+
+def test_record_breakers_warns_on_new_trips(monkeypatch):
+	b = CircuitBreaker("speech", BreakerConfig(consecutive_failures=1))
+	monkeypatch.setattr(breaker, "_BREAKERS", {"speech": b})
+	before = breaker.trip_counts()
+	b.failure()
+	m = new_manifest("n", "ch_0001")
+	breaker.record_breakers(m, before)
+	assert m.providers["breakers"]["speech"]["state"] == "open"
+	assert any("circuit breaker speech" in w for w in m.status["warnings"])
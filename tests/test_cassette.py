@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_cassette.py
+
+provider 录制 / 回放：录制后离线回放同一响应、未录制请求报 miss、key 不受字段顺序与鉴权头影响、
+经共享会话的 LLM client 在 replay 模式下不联网、不需要 API key、录制 / 回放时 LLM 缓存不读。
+"""
+
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from novel2comic.providers import session
+from novel2comic.providers.cassette import (
+	RECORD,
+	REPLAY,
+	CassetteMissError,
+	CassetteStore,
+	CassetteTransport,
+	request_fingerprint,
+)
+from novel2comic.providers.llm.siliconflow_client import SiliconFlowConfig, SiliconFlowLLMClient, _load_llm_cache
+from novel2comic.providers.session import require_api_key
+from novel2comic.stages.image_generate import _pick_seed
+
+URL = "https://example.invalid/v1/chat/completions"
+CHAT_RESPONSE = {"choices": [{"message": {"content": '{"ok": true}'}}]}
+
+
+def _record(tmp_path, payload: dict, response: httpx.Response) -> list:
+	calls = []
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		calls.append(1)
+		return response
+
+	transport = CassetteTransport(RECORD, CassetteStore(tmp_path), inner=httpx.MockTransport(handler))
+	with httpx.Client(transport=transport) as client:
+		r = client.post(URL, json=payload, headers={"Authorization": "Bearer secret"})
+		assert r.status_code == response.status_code
+	return calls
+
+
+def test_record_then_replay_offline(tmp_path):
+	audio = bytes(range(256)) * 4
+	calls = _record(tmp_path, {"input": "你好"}, httpx.Response(200, content=audio, headers={"content-type": "audio/wav"}))
+	assert calls == [1]
+	# 鉴权头不落盘
+	assert not any(b"secret" in p.read_bytes() for p in tmp_path.rglob("*.json"))
+
+	with httpx.Client(transport=CassetteTransport(REPLAY, CassetteStore(tmp_path))) as client:
+		r = client.post(URL, json={"input": "你好"})
+		assert r.status_code == 200
+		assert r.content == audio
+		assert r.headers["content-type"] == "audio/wav"
+		with pytest.raises(CassetteMissError):
+			client.post(URL, json={"input": "别的"})
+
+
+def test_fingerprint_ignores_key_order_and_headers():
+	a = httpx.Request("POST", URL, json={"x": 1, "y": 2}, headers={"Authorization": "Bearer a"})
+	b = httpx.Request("POST", URL, json={"y": 2, "x": 1}, headers={"Authorization": "Bearer b"})
+	assert request_fingerprint(a) == request_fingerprint(b)
+	assert request_fingerprint(a) != request_fingerprint(httpx.Request("POST", URL, json={"x": 2, "y": 2}))
+
+
+def test_llm_client_replays_through_shared_session(tmp_path, monkeypatch):
+	client = SiliconFlowLLMClient(SiliconFlowConfig(api_key="k", base_url="https://example.invalid/v1", model="m"))
+	payload = client._build_payload("s", "u")
+	_record(tmp_path, payload, httpx.Response(200, json=CHAT_RESPONSE))
+
+	monkeypatch.setenv("PROVIDER_CASSETTE", "replay")
+	monkeypatch.setenv("PROVIDER_CASSETTE_DIR", str(tmp_path))
+	monkeypatch.delenv("SILICONFLOW_API_KEY", raising=False)
+	session.close_sessions()
+	try:
+		key = require_api_key()
+		replay = SiliconFlowLLMClient(SiliconFlowConfig(api_key=key, base_url="https://example.invalid/v1", model="m"))
+		assert replay.chat_json("s", "u") == {"ok": True}
+		with pytest.raises(CassetteMissError):
+			replay.chat_json("s", "not recorded")
+	finally:
+		session.close_sessions()
+
+
+def test_llm_cache_reads_bypassed_while_recording_or_replaying(tmp_path, monkeypatch):
+	monkeypatch.setenv("LLM_CACHE_ENABLED", "1")
+	monkeypatch.delenv("LLM_CACHE_BYPASS", raising=False)
+	cc = {"llm_cache": {"path": str(tmp_path / "llm.sqlite")}}
+	monkeypatch.setenv("PROVIDER_CASSETTE", "off")
+	assert not _load_llm_cache(tmp_path, cc, None).bypass
+	for mode in (RECORD, REPLAY):
+		monkeypatch.setenv("PROVIDER_CASSETTE", mode)
+		assert _load_llm_cache(tmp_path, cc, None).bypass
+		assert _load_llm_cache(tmp_path, cc, False).bypass
+
+
+def test_image_seed_is_stable_only_under_cassette():
+	assert _pick_seed("s1", 0, True) == _pick_seed("s1", 0, True)
+	assert _pick_seed("s1", 0, True) != _pick_seed("s1", 1, True)
+	assert 0 <= _pick_seed("s1", 3, True) < 1_000_000_000
@@ -104,3 +104,94 @@ def test_apply_director_patch_invalid_shot_id():
 	director_review = {"patch": {"shots": [{"shot_id": "s999", "gap_after_ms": 100}]}}
 	ok, _ = validate_director_review(director_review, ["s001"])
 	assert ok is False
+
+
+class _WindowReviewLLM:
+	"""为 prompt 中每个 shot（含上下文）输出 gap；含 fail_id 的窗口抛错。"""
+
+	def __init__(self, fail_id: str = ""):
+		self.fail_id = fail_id
+		self.calls = 0
+
+	def chat_json(self, system_prompt, user_prompt):
+		self.calls += 1
+		payload = json.loads(user_prompt.split("输入数据(JSON)：\n", 1)[1])
+		ids = [s["shot_id"] for s in payload["shots"]]
+		if self.fail_id in ids:
+			raise ValueError("boom")
+		ctx = [s["shot_id"] for s in payload.get("context_before", []) + payload.get("context_after", [])]
+		return {
+			"global_notes": ["节奏偏快"],
+			"patch": {"shots": [{"shot_id": sid, "gap_after_ms": 700} for sid in ids + ctx]},
+		}
+
+
+def test_windowed_review_merges_core_patches_and_isolates_failures(monkeypatch):
+	from novel2comic.director_review import client
+
+	monkeypatch.setattr(client.time, "sleep", lambda s: None)
+	shots = [{"shot_id": f"s{i}", "order": i, "text": {"raw_text": "文。"}} for i in range(6)]
+	llm = _WindowReviewLLM(fail_id="s3")
+	review, failed = client.chat_director_review_windowed(llm, "ch", shots, 2, overlap_shots=1, workers=3)
+	assert failed == ["s2", "s3"]
+	assert [it["shot_id"] for it in review["patch"]["shots"]] == ["s0", "s1", "s4", "s5"]
+	assert review["global_notes"] == ["节奏偏快"]
+	assert review["meta"]["windows"] == 3 and len(review["meta"]["failed_windows"]) == 1
+	# 2 个成功窗口 + 失败窗口 1 + MAX_RETRIES 次
+	assert llm.calls == 2 + 1 + client.MAX_RETRIES
+
+	directed, report = apply_director_patch({"shots": shots}, review)
+	assert "invariant_violation" not in report
+	assert "gap_after_ms" not in directed["shots"][2]
+
+
+def test_windowed_review_all_failed_raises(monkeypatch):
+	from novel2comic.director_review import client
+
+	monkeypatch.setattr(client.time, "sleep", lambda s: None)
+	shots = [{"shot_id": "s0", "order": 0, "text": {"raw_text": "文。"}}]
+	with pytest.raises(ValueError, match="boom"):
+		client.chat_director_review_windowed(_WindowReviewLLM(fail_id="s0"), "ch", shots, 4)
+
+
+def test_review_cascade_escalates_without_small_model_retries(monkeypatch):
+	from novel2comic.director_review import client
+	from novel2comic.providers.llm.cascade import CascadeConfig
+
+	monkeypatch.setattr(client.time, "sleep", lambda s: None)
+	models = []
+
+	class _SmallFails(_WindowReviewLLM):
+		def chat_json(self, system_prompt, user_prompt, model=None):
+			models.append(model)
+			if model:
+				return {"patch": {"shots": [{"shot_id": "s0", "text": {"raw_text": "改写"}}]}}
+			return _WindowReviewLLM.chat_json(self, system_prompt, user_prompt)
+
+	shots = [{"shot_id": "s0", "order": 0, "text": {"raw_text": "文。"}}]
+	review = client.review_shots_cascade(_SmallFails(), "ch", shots, cascade=CascadeConfig(small_model="small"))
+	assert review["patch"]["shots"] == [{"shot_id": "s0", "gap_after_ms": 700}]
+	assert models == ["small", None]
+
+
+def test_review_meta_records_answering_model(monkeypatch):
+	from types import SimpleNamespace
+
+	from novel2comic.director_review import client
+	from novel2comic.providers.llm.cascade import CascadeConfig
+
+	monkeypatch.setattr(client.time, "sleep", lambda s: None)
+
+	class _Small(_WindowReviewLLM):
+		cfg = SimpleNamespace(model="big")
+
+		def chat_json(self, system_prompt, user_prompt, model=None):
+			return _WindowReviewLLM.chat_json(self, system_prompt, user_prompt)
+
+	shots = [{"shot_id": f"s{i}", "order": i, "text": {"raw_text": "文。"}} for i in range(4)]
+	review = client.review_shots_cascade(_Small(), "ch", shots[:1], cascade=CascadeConfig(small_model="small"))
+	assert review["meta"]["model"] == "small"
+	assert client.review_shots_cascade(_Small(), "ch", shots[:1])["meta"]["model"] == "big"
+	# 窗口模式：合并各窗口实际应答模型
+	review, _ = client.chat_director_review_windowed(_Small(), "ch", shots, 2, overlap_shots=0, cascade=CascadeConfig(small_model="small"))
+	assert review["meta"]["model"] == "small"
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_energy_align.py
+
+能量静音检测与边界吸附（providers/align/energy_align）。
+"""
+
+from __future__ import annotations
+
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from novel2comic.providers.align.energy_align import (  # noqa: E402
+	EnergyAlignConfig,
+	EnergyAligner,
+	detect_silences,
+	frame_db,
+	snap_boundaries,
+)
+
+SR = 16000
+
+
+def _tone(ms: int) -> "np.ndarray":
+	t = np.arange(int(SR * ms / 1000)) / SR
+	return (np.sin(2 * np.pi * 220 * t) * 12000).astype(np.int16)
+
+
+def _silence(ms: int) -> "np.ndarray":
+	return np.zeros(int(SR * ms / 1000), dtype=np.int16)
+
+
+def _write_wav(path, samples) -> None:
+	with wave.open(str(path), "wb") as wf:
+		wf.setnchannels(1)
+		wf.setsampwidth(2)
+		wf.setframerate(SR)
+		wf.writeframes(samples.tobytes())
+
+
+def test_detect_silences_finds_gap():
+	samples = np.concatenate([_tone(500), _silence(200), _tone(300)])
+	db = frame_db(samples, SR, 10)
+	sil = detect_silences(db, 10, 35.0, 80)
+	assert sil.shape == (1, 2)
+	assert sil[0, 0] == pytest.approx(500, abs=10)
+	assert sil[0, 1] == pytest.approx(700, abs=10)
+
+
+def test_detect_silences_ignores_short_pause():
+	samples = np.concatenate([_tone(300), _silence(40), _tone(300)])
+	sil = detect_silences(frame_db(samples, SR, 10), 10, 35.0, 80)
+	assert sil.shape[0] == 0
+
+
+def test_snap_boundaries_respects_max_shift_and_monotonic():
+	silences = np.array([[480.0, 520.0], [2000.0, 2100.0]])
+	out = snap_boundaries(np.array([400.0, 1000.0, 1900.0]), silences, 200)
+	# 400 -> 500；1000 附近无静音保持；1900 -> 2050
+	assert out.tolist() == [500.0, 1000.0, 2050.0]
+
+
+def test_align_shot_snaps_segment_boundary(tmp_path):
+	wav = tmp_path / "s1.wav"
+	# 第一句实际 700ms，停顿 200ms，第二句 300ms；字数估算给出 600ms 边界
+	_write_wav(wav, np.concatenate([_tone(700), _silence(200), _tone(300)]))
+	aligner = EnergyAligner(EnergyAlignConfig(split_sentences=False))
+	out, n = aligner.align_shot(wav, [(0, 600, "第一句话。"), (600, 1200, "二句。")])
+	assert n == 1
+	assert out[0][0] == 0 and out[-1][1] == 1200
+	assert out[0][1] == out[1][0] == pytest.approx(800, abs=10)
+
+
+def test_align_shot_splits_sentences(tmp_path):
+	wav = tmp_path / "s1.wav"
+	_write_wav(wav, np.concatenate([_tone(400), _silence(200), _tone(400)]))
+	out, _ = EnergyAligner().align_shot(wav, [(0, 1000, "一二三。四五六。")])
+	assert [t for _, _, t in out] == ["一二三。", "四五六。"]
+	assert out[0][1] == pytest.approx(500, abs=10)
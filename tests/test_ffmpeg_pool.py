@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_ffmpeg_pool.py
+
+ffmpeg 进程池：线程预算、-progress 解析、超时（用 python 子进程代替 ffmpeg）。
+"""
+
+from __future__ import annotations
+
+import sys
+
+from novel2comic.core.ffmpeg_pool import (
+	FFmpegPool,
+	FFmpegProgress,
+	ProgressBoard,
+	parse_progress_line,
+	progress_out_ms,
+	with_progress,
+	with_threads,
+)
+
+
+def test_thread_budget_from_cores():
+	pool = FFmpegPool(max_procs=3, cpu_count=12)
+	assert pool.threads_per_job == 4
+	assert FFmpegPool(cpu_count=8).max_procs == 4
+
+
+def test_with_threads_and_progress():
+	cmd = ["ffmpeg", "-y", "-i", "a.png", "out.mp4"]
+	assert with_threads(cmd, 2) == ["ffmpeg", "-y", "-i", "a.png", "-threads", "2", "out.mp4"]
+	assert with_threads(["ffmpeg", "-threads", "1", "o"], 4) == ["ffmpeg", "-threads", "1", "o"]
+	assert with_progress(cmd)[:4] == ["ffmpeg", "-progress", "pipe:1", "-nostats"]
+	assert with_progress(["python", "x"]) == ["python", "x"]
+
+
+def test_parse_progress_block():
+	state: dict = {}
+	assert parse_progress_line("frame=24\n", state) is None
+	assert parse_progress_line("out_time_us=1500000\n", state) is None
+	assert parse_progress_line("progress=continue\n", state) == "continue"
+	assert progress_out_ms(state) == 1500
+	assert progress_out_ms({"out_time_ms": "250000"}) == 250
+
+
+def test_progress_eta():
+	p = FFmpegProgress(label="a", out_ms=2000, duration_ms=10000, elapsed_s=1.0)
+	assert p.speed == 2.0
+	assert p.eta_s == 4.0
+
+
+def test_run_reports_progress_and_stderr_tail():
+	script = (
+		"import sys;"
+		"print('out_time_us=500000');print('progress=continue');"
+		"print('out_time_us=1000000');print('progress=end');"
+		"sys.stderr.write('boom\\n');sys.exit(3)"
+	)
+	seen = []
+	r = FFmpegPool(max_procs=1).run([sys.executable, "-c", script], duration_ms=1000, on_progress=seen.append)
+	assert [(p.out_ms, p.done) for p in seen] == [(500, False), (1000, True)]
+	assert not r.ok and r.returncode == 3 and "boom" in r.error
+
+
+def test_run_timeout_kills_process():
+	r = FFmpegPool(max_procs=1).run([sys.executable, "-c", "import time; time.sleep(30)"], timeout_s=0.5)
+	assert r.timed_out and not r.ok
+	assert r.elapsed_s < 10
+
+
+def test_progress_board_summary():
+	lines = []
+	board = ProgressBoard(total_ms=2000, interval_s=0, printer=lines.append)
+	board.update(FFmpegProgress(label="a", out_ms=1000, duration_ms=1000, elapsed_s=1.0, done=True))
+	assert lines[-1].startswith("[render] 50% (1 jobs done)")
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""core/hedging 单元测试。"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from novel2comic.core.hedging import HedgeConfig, Hedger, quantile
+
+
+def _warm(h: Hedger, n: int = 10, latency: float = 0.01) -> None:
+	for _ in range(n):
+		h.record("/x", latency)
+
+
+def test_threshold_needs_samples_and_is_clamped():
+	h = Hedger(HedgeConfig(min_samples=5, min_delay_s=0.05, max_delay_s=0.2))
+	assert h.threshold("/x") is None
+	_warm(h, 5, 0.01)
+	assert h.threshold("/x") == 0.05
+	_warm(h, 100, 5.0)
+	assert h.threshold("/x") == 0.2
+	assert quantile([1, 2, 3, 4, 100], 0.5) == 3
+	h.close()
+
+
+def test_slow_primary_is_hedged_and_backup_wins():
+	h = Hedger(HedgeConfig(min_samples=5, min_delay_s=0.02, max_delay_s=0.05, budget=1.0))
+	_warm(h)
+	release = threading.Event()
+	calls = []
+	hedges = []
+
+	def fn():
+		calls.append(1)
+		if len(calls) == 1:
+			release.wait(2)
+			return "slow"
+		return "fast"
+
+	assert h.call("/x", fn, on_hedge=lambda: hedges.append(1)) == "fast"
+	release.set()
+	st = h.stats()
+	assert st["hedged"] == 1 and st["hedge_wins"] == 1 and hedges == [1]
+	h.close()
+
+
+def test_budget_limits_hedges_and_failures_propagate():
+	h = Hedger(HedgeConfig(min_samples=5, min_delay_s=0.01, max_delay_s=0.01, budget=0.0))
+	_warm(h)
+	assert h.call("/x", lambda: "ok") == "ok"
+	assert h.stats()["hedged"] == 0
+
+	def boom():
+		raise ValueError("boom")
+
+	with pytest.raises(ValueError, match="boom"):
+		h.call("/x", boom)
+	h.close()
+
+
+class _Resp:
+	def __init__(self, status_code: int):
+		self.status_code = status_code
+
+
+def test_fast_error_response_does_not_beat_slow_success():
+	h = Hedger(HedgeConfig(min_samples=5, min_delay_s=0.02, max_delay_s=0.05, budget=1.0))
+	_warm(h)
+	calls = []
+
+	def fn():
+		calls.append(1)
+		if len(calls) == 1:
+			time.sleep(0.2)
+			return _Resp(200)
+		return _Resp(429)
+
+	before = len(h._latency["/x"])
+	out = h.call("/x", fn)
+	assert out.status_code == 200
+	assert h.stats()["hedge_wins"] == 0
+	# 429 的耗时不进入样本，只记录成功的那一份
+	assert len(h._latency["/x"]) == before + 1
+	h.close()
+
+
+def test_both_failed_returns_primary_and_records_nothing():
+	h = Hedger(HedgeConfig(min_samples=5, min_delay_s=0.01, max_delay_s=0.01, budget=1.0))
+	_warm(h)
+	before = len(h._latency["/x"])
+	assert h.call("/x", lambda: _Resp(503)).status_code == 503
+	assert len(h._latency["/x"]) == before
+	h.close()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_hls.py
+
+HLS fMP4 拆分与增量 playlist。
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from novel2comic.core.hls import HlsPlaylistWriter, HlsSegment, render_playlist, split_fmp4
+from tests.helpers import fake_fmp4, mp4_box
+
+
+def test_split_fmp4():
+	init, media = split_fmp4(fake_fmp4())
+	assert init == mp4_box(b"ftyp", b"isom") + mp4_box(b"moov", b"m")
+	assert media == mp4_box(b"moof", b"f") + mp4_box(b"mdat", b"dd")
+
+
+def test_split_fmp4_rejects_plain_mp4():
+	with pytest.raises(ValueError):
+		split_fmp4(mp4_box(b"ftyp") + mp4_box(b"moov") + mp4_box(b"mdat"))
+
+
+def test_render_playlist_vod():
+	text = render_playlist([HlsSegment("a_init.mp4", "a.m4s", 1.5), HlsSegment("b_init.mp4", "b.m4s", 2.0)], 2, True)
+	lines = text.splitlines()
+	assert lines[0] == "#EXTM3U" and "#EXT-X-PLAYLIST-TYPE:VOD" in lines
+	assert lines.count("#EXT-X-DISCONTINUITY") == 1
+	assert '#EXT-X-MAP:URI="b_init.mp4"' in lines
+	assert lines[-1] == "#EXT-X-ENDLIST"
+
+
+def test_playlist_writer_publishes_contiguous_prefix(tmp_path):
+	segs = [HlsSegment(f"{i}_init.mp4", f"{i}.m4s", 1.2) for i in range(3)]
+	w = HlsPlaylistWriter(tmp_path / "playlist.m3u8", segs)
+	assert w.target_duration == 2
+	w.mark_done(1)
+	assert w.published == 0 and not (tmp_path / "playlist.m3u8").exists()
+	w.mark_done(0)
+	text = (tmp_path / "playlist.m3u8").read_text(encoding="utf-8")
+	assert "1.m4s" in text and "2.m4s" not in text and "EVENT" in text
+	with pytest.raises(RuntimeError):
+		w.finish()
+	w.mark_done(2)
+	w.finish()
+	assert (tmp_path / "playlist.m3u8").read_text(encoding="utf-8").endswith("#EXT-X-ENDLIST\n")
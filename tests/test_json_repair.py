@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_json_repair.py
+
+容错 JSON 解析：代码块、尾逗号、Python 字面量、裸换行、截断前缀；LLM / VLM 客户端接入。
+"""
+
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from novel2comic.core.json_repair import TruncatedJSONError, loads_tolerant, repair_json, strip_fences
+from novel2comic.providers.llm.llm_cache import LLMCache
+from novel2comic.providers.llm.siliconflow_client import SiliconFlowConfig, SiliconFlowLLMClient
+from novel2comic.providers.vlm.siliconflow_vlm import _extract_json_from_response
+
+
+def test_strict_json_is_not_marked_repaired():
+	assert loads_tolerant('{"a": 1}') == ({"a": 1}, False)
+
+
+@pytest.mark.parametrize(
+	"raw, expected",
+	[
+		('```json\n{"a": [1, 2,],}\n```', {"a": [1, 2]}),
+		('好的，结果如下：{"ok": True, "x": None} 以上。', {"ok": True, "x": None}),
+		('{"t": "第一行\n第二行"}', {"t": "第一行\n第二行"}),
+		('```json\n{"a": 1', {"a": 1}),
+	],
+)
+def test_common_syntax_errors(raw, expected):
+	obj, repaired = loads_tolerant(raw)
+	assert obj == expected and repaired
+
+
+def test_truncated_array_keeps_complete_elements_only():
+	raw = '{"schema_version": "v", "shots": [{"id": 0, "d": {"p": 1}}, {"id": 1, "d": {"p"'
+	obj, _ = loads_tolerant(raw)
+	assert obj == {"schema_version": "v", "shots": [{"id": 0, "d": {"p": 1}}]}
+
+
+@pytest.mark.parametrize(
+	"raw",
+	[
+		'{"a":"he said \\"hi',
+		'{"schema_version": "v", "shots": [{"id": 0, "d": {"p": 1}}, {"id": 1, "d": {"p"',
+		'{"a": 1',
+	],
+)
+def test_truncation_rejected_when_not_allowed(raw):
+	with pytest.raises(TruncatedJSONError):
+		loads_tolerant(raw, allow_truncated=False)
+
+
+def test_unrecoverable_raises():
+	assert repair_json("") is None
+	with pytest.raises(ValueError):
+		loads_tolerant("没有 JSON")
+
+
+def test_strip_fences_without_fence():
+	assert strip_fences('结果：[1]') == "[1]"
+
+
+def test_llm_client_repairs_instead_of_raising():
+	def handler(request: httpx.Request) -> httpx.Response:
+		content = '```json\n{"shots": [{"id": 0},],}\n```'
+		return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+	client = SiliconFlowLLMClient(SiliconFlowConfig(api_key="k", base_url="https://example.invalid/v1", model="m"))
+	client._client = httpx.Client(base_url="https://example.invalid/v1", transport=httpx.MockTransport(handler))
+	assert client.chat_json("s", "u") == {"shots": [{"id": 0}]}
+	assert client.usage()["prompt"]["json_repaired"] == 1
+	client.close()
+
+
+def test_llm_client_rejects_truncated_output_and_does_not_cache(tmp_path):
+	calls = []
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		calls.append(1)
+		content = '{"shots": [{"id": 0}, {"id": 1, "text": "半'
+		return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+	cache = LLMCache(tmp_path / "llm.sqlite")
+	client = SiliconFlowLLMClient(SiliconFlowConfig(api_key="k", base_url="https://example.invalid/v1", model="m"), cache=cache)
+	client._client = httpx.Client(base_url="https://example.invalid/v1", transport=httpx.MockTransport(handler))
+	for _ in range(2):
+		with pytest.raises(ValueError, match="truncated"):
+			client.chat_json("s", "u")
+	assert len(calls) == 2
+	assert cache.stats()["writes"] == 0
+	client.close()
+
+
+def test_vlm_extract_json_repairs():
+	out = _extract_json_from_response('```json\n{"pass": true, "scores": {"alignment": 0.9,},}\n```')
+	assert json.loads(out) == {"pass": True, "scores": {"alignment": 0.9}}
+	assert _extract_json_from_response("not json") == "not json"
+	# 截断的评审不当作结果（否则前缀里的 pass 会被采信）
+	assert _extract_json_from_response('{"pass": true, "issues": ["手') == '{"pass": true, "issues": ["手'
+
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_json_stream.py
+
+流式 JSON 数组元素提取与 SSE 流式 chat_json（httpx.MockTransport，不联网）。
+"""
+
+from __future__ import annotations
+
+import json
+
+import httpx
+
+from novel2comic.core.json_stream import JsonArrayStream
+from novel2comic.providers.llm.llm_cache import LLMCache
+from novel2comic.providers.llm.siliconflow_client import SiliconFlowConfig, SiliconFlowLLMClient
+
+_DOC = {
+	"meta": {"shots": [{"decoy": True}]},
+	"patch": {"note": '含 {括号] 与 "引号" \\ 反斜杠', "shots": [{"shot_id": "a", "r": ["x}"]}, {"shot_id": "b", "n": {"k": 1}}]},
+}
+
+
+def test_items_emitted_as_soon_as_closed_char_by_char():
+	text = json.dumps(_DOC, ensure_ascii=False)
+	st = JsonArrayStream(path=("patch", "shots"))
+	emitted = []
+	for ch in text:
+		emitted.extend(st.feed(ch))
+	assert emitted == _DOC["patch"]["shots"]
+	assert st.complete
+
+
+def test_truncated_stream_keeps_valid_prefix():
+	text = json.dumps(_DOC, ensure_ascii=False)
+	cut = text.index('{"shot_id": "b"') + 5
+	st = JsonArrayStream(path=("patch", "shots"))
+	st.feed(text[:cut])
+	assert not st.complete
+	assert st.salvage() == {"patch": {"shots": [{"shot_id": "a", "r": ["x}"]}]}}
+
+
+def _sse(content: str, pieces: int = 7) -> bytes:
+	step = max(1, len(content) // pieces)
+	lines = []
+	for i in range(0, len(content), step):
+		chunk = {"choices": [{"delta": {"content": content[i:i + step]}}]}
+		lines.append("data: " + json.dumps(chunk, ensure_ascii=False))
+	lines.append("data: [DONE]")
+	return ("\n\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def _client(tmp_path, body: bytes) -> tuple[SiliconFlowLLMClient, list]:
+	calls = []
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		calls.append(json.loads(request.content))
+		return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+	client = SiliconFlowLLMClient(
+		SiliconFlowConfig(api_key="k", base_url="https://example.invalid/v1", model="m"),
+		cache=LLMCache(tmp_path / "c.sqlite"),
+	)
+	client._client = httpx.Client(base_url="https://example.invalid/v1", transport=httpx.MockTransport(handler))
+	return client, calls
+
+
+def test_chat_json_stream_complete_and_cached(tmp_path):
+	content = json.dumps({"shots": [{"id": 0}, {"id": 1}]})
+	client, calls = _client(tmp_path, _sse(content))
+	got = []
+	result, complete = client.chat_json_stream("s", "u", ("shots",), got.append)
+	assert complete and result == {"shots": [{"id": 0}, {"id": 1}]} and got == [{"id": 0}, {"id": 1}]
+	assert calls[0]["stream"] is True
+
+	replayed = []
+	assert client.chat_json_stream("s", "u", ("shots",), replayed.append) == (result, True)
+	assert replayed == got and len(calls) == 1
+	client.close()
+
+
+def test_chat_json_stream_truncated_not_cached(tmp_path):
+	content = json.dumps({"shots": [{"id": 0}, {"id": 1}]})
+	client, calls = _client(tmp_path, _sse(content[:-8]))
+	result, complete = client.chat_json_stream("s", "u", ("shots",))
+	assert not complete and result == {"shots": [{"id": 0}]}
+	client.chat_json_stream("s", "u", ("shots",))
+	assert len(calls) == 2
+	client.close()
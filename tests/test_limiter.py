@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""providers/limiter AIMD 限流单元测试。"""
+
+from __future__ import annotations
+
+import threading
+
+import httpx
+import pytest
+
+from novel2comic.providers.limiter import AIMDConfig, AIMDLimiter
+
+
+def _resp(code: int) -> httpx.Response:
+	return httpx.Response(code, request=httpx.Request("POST", "https://x/chat/completions"))
+
+
+def test_additive_increase_and_multiplicative_decrease():
+	lim = AIMDLimiter("chat", AIMDConfig(initial=2, max_limit=4, latency_spike_ratio=0))
+	for _ in range(4):
+		lim.send(lambda: _resp(200))
+	assert 3 < lim.limit <= 4
+	before = lim.limit
+	lim.send(lambda: _resp(429))
+	assert lim.limit == pytest.approx(before * 0.5)
+	st = lim.stats()
+	assert st["overloads"] == 1 and st["decreases"] == 1 and st["inflight"] == 0
+
+
+def test_overloads_within_one_rtt_cut_once_and_timeouts_count():
+	lim = AIMDLimiter("speech", AIMDConfig(initial=8))
+	lim.baseline_s = 60.0
+	for _ in range(3):
+		lim.send(lambda: _resp(503))
+	assert lim.limit == 4 and lim.stats()["decreases"] == 1
+
+	def timeout():
+		raise httpx.ReadTimeout("slow")
+
+	with pytest.raises(httpx.ReadTimeout):
+		lim.send(timeout)
+	assert lim.overloads == 4 and lim.inflight == 0
+
+
+def test_acquire_blocks_at_limit():
+	lim = AIMDLimiter("images", AIMDConfig(initial=1, max_limit=1))
+	lim.acquire()
+	got = threading.Event()
+
+	def worker():
+		lim.acquire()
+		got.set()
+
+	t = threading.Thread(target=worker)
+	t.start()
+	assert not got.wait(0.05)
+	lim.release(0.01)
+	assert got.wait(1)
+	t.join()
+	assert lim.stats()["max_inflight"] == 1
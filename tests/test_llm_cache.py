@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_llm_cache.py
+
+LLM 响应缓存：key、TTL / 条目数淘汰、旁路、client 命中（httpx.MockTransport，不联网）。
+"""
+
+from __future__ import annotations
+
+import json
+
+import httpx
+
+from novel2comic.providers.llm import llm_cache
+from novel2comic.providers.llm.llm_cache import LLMCache, cache_key
+from novel2comic.providers.llm.siliconflow_client import (
+	SiliconFlowConfig,
+	SiliconFlowLLMClient,
+	record_llm_usage,
+)
+
+
+def _payload(user: str = "u", **kw) -> dict:
+	p = {
+		"model": "m",
+		"messages": [{"role": "system", "content": "s"}, {"role": "user", "content": user}],
+		"temperature": 0.2,
+		"top_p": 0.9,
+		"response_format": {"type": "json_object"},
+	}
+	p.update(kw)
+	return p
+
+
+def test_cache_key_depends_only_on_request_fields():
+	assert cache_key(_payload()) == cache_key(dict(reversed(list(_payload(stream=False).items()))))
+	assert cache_key(_payload()) != cache_key(_payload(temperature=0.3))
+	assert cache_key(_payload()) != cache_key(_payload(user="v"))
+
+
+def test_get_put_and_ttl(tmp_path, monkeypatch):
+	now = [1000.0]
+	monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+	c = LLMCache(tmp_path / "c.sqlite", ttl_s=60)
+	assert c.get("k") is None
+	c.put("k", {"a": 1})
+	assert c.get("k") == {"a": 1}
+	now[0] += 61
+	assert c.get("k") is None and len(c) == 0
+	assert c.stats() == {"hits": 1, "misses": 2, "writes": 1, "bypass": False}
+
+
+def test_max_entries_evicts_least_recently_used(tmp_path, monkeypatch):
+	now = [0.0]
+	monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+	c = LLMCache(tmp_path / "c.sqlite", max_entries=2)
+	for k in ("a", "b"):
+		now[0] += 1
+		c.put(k, {"k": k})
+	now[0] += 1
+	c.get("a")
+	now[0] += 1
+	c.put("c", {"k": "c"})
+	assert c.get("b") is None and c.get("a") == {"k": "a"} and len(c) == 2
+
+
+def test_bypass_skips_reads_but_refreshes(tmp_path):
+	path = tmp_path / "c.sqlite"
+	c = LLMCache(path)
+	c.put("k", {"v": 1})
+	c.close()
+	b = LLMCache(path, bypass=True)
+	assert b.get("k") is None
+	b.put("k", {"v": 2})
+	b.close()
+	assert LLMCache(path).get("k") == {"v": 2}
+
+
+def test_client_serves_repeat_requests_from_cache(tmp_path):
+	calls = []
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		calls.append(json.loads(request.content))
+		return httpx.Response(200, json={"choices": [{"message": {"content": '{"ok": true}'}}]})
+
+	client = SiliconFlowLLMClient(
+		SiliconFlowConfig(api_key="k", base_url="https://example.invalid/v1", model="m"),
+		cache=LLMCache(tmp_path / "c.sqlite"),
+	)
+	client._client = httpx.Client(base_url="https://example.invalid/v1", transport=httpx.MockTransport(handler))
+	assert client.chat_json("s", "u") == {"ok": True}
+	assert client.chat_json("s", "u") == {"ok": True}
+	assert len(calls) == 1
+
+	providers: dict = {"llm": {}}
+	record_llm_usage(providers, "plan", client.usage())
+	assert providers["llm"]["model"] == "m"
+	assert providers["llm"]["cache"]["plan"]["hits"] == 1
+	client.close()
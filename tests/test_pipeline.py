@@ -59,3 +59,40 @@ def test_prepare_and_run_segment(tmp_path: Path):
 	m = json.loads(manifest_path.read_text(encoding="utf-8"))
 	assert m["status"]["stage"] == "segmented"
 	assert m["durations"]["num_shots"] == len(data["shots"])
+
+
+def test_segment_whole_chapter_refine_failure_leaves_llm_fields_empty(tmp_path: Path, monkeypatch):
+	"""整章 refine 失败回退 baseline 时，shotscript 不记录 LLM provider / model。"""
+	from types import SimpleNamespace
+
+	from novel2comic.core.io import chapter_paths
+	from novel2comic.core.manifest import load_manifest, new_manifest, save_manifest
+	from novel2comic.providers.llm import siliconflow_client
+	from novel2comic.stages import segment
+	from novel2comic.stages.base import StageContext
+
+	class _FailingLLM:
+		cfg = SimpleNamespace(model="m")
+
+		def chat_json(self, system_prompt, user_prompt, **kw):
+			raise ValueError("boom")
+
+		def usage(self):
+			return {}
+
+		def close(self):
+			pass
+
+	cfg = {"refine_shot_split": {"chunk_shots": 0, "min_shots": 1, "max_shots": 20}}
+	monkeypatch.setattr(segment, "get_stage_config", lambda name: cfg)
+	monkeypatch.setattr(siliconflow_client, "load_siliconflow_client", lambda **kw: _FailingLLM())
+
+	paths = chapter_paths(tmp_path / "ch_0001")
+	paths.ensure_dirs()
+	paths.text_clean.write_text("　　第一段文字。\n　　第二段文字。\n", encoding="utf-8")
+	save_manifest(paths.manifest, new_manifest("book1", "ch_0001"))
+	segment.SegmentStage().run(paths, StageContext(novel_id="book1", chapter_id="ch_0001"))
+
+	data = json.loads(paths.shotscript.read_text(encoding="utf-8"))
+	assert data["meta"]["llm"] == {"provider": "", "model": ""}
+	assert any("fallback in 1/1 chunks" in w for w in load_manifest(paths.manifest).status["warnings"])
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_prompt_codec.py
+
+紧凑 prompt 编码：本地 id 往返、表格化、token 估算，以及各 skill prompt 的体积。
+"""
+
+from __future__ import annotations
+
+import json
+
+from novel2comic.core.prompt_codec import IdCodec, estimate_tokens, table
+from novel2comic.director_review.prompt import build_compact_user_prompt as dr_compact
+from novel2comic.director_review.prompt import build_user_prompt as dr_verbose
+from novel2comic.director_review.prompt import decode_compact_review
+from novel2comic.skills.speech_plan.prompt import build_compact_user_prompt, build_user_prompt, decode_compact_patch
+from novel2comic.skills.speech_plan.validator import validate_patch
+
+
+def _shots(n: int = 6) -> list[dict]:
+	shots = []
+	for i in range(n):
+		sid = f"ch_0001_shot_{i:04d}"
+		# kind 与 core/quote_splitter 的产出一致
+		segs = [("narration", "他推门进来，"), ("quote", "“你来了。”")]
+		shots.append({
+			"shot_id": sid,
+			"order": i,
+			"block_id": i,
+			"text": {"raw_text": "".join(t for _, t in segs)},
+			"speech": {
+				"default": {"mode": "narration", "emotion": "neutral", "intensity": 0.35, "pace": "normal"},
+				"segments": [{"seg_id": f"{sid}_seg_{j}", "kind": k, "raw_text": t} for j, (k, t) in enumerate(segs)],
+			},
+		})
+	return shots
+
+
+def _payload(prompt: str) -> dict:
+	return json.loads(prompt.split("输入数据(JSON)：\n", 1)[1])
+
+
+def test_estimate_tokens():
+	assert estimate_tokens("") == 0
+	assert estimate_tokens("你好，世界") == 5
+	assert estimate_tokens("abcdefgh") == 2
+
+
+def test_id_codec_roundtrip():
+	codec = IdCodec(["a", "b"])
+	assert codec.encode("b") == 1
+	assert codec.decode(1) == "b" and codec.decode("0") == "a"
+	assert codec.decode(2) is None and codec.decode(True) is None
+
+
+def test_table():
+	assert table(["a", "b"], [(1, 2)]) == {"cols": ["a", "b"], "rows": [[1, 2]]}
+
+
+def test_speech_plan_compact_prompt_dedupes_text_and_decodes():
+	shots = _shots()
+	compact = build_compact_user_prompt("ch_0001", shots)
+	verbose = build_user_prompt("ch_0001", shots)
+	assert estimate_tokens(compact) < estimate_tokens(verbose)
+	payload = _payload(compact)
+	assert "ch_0001_shot" not in json.dumps(payload["shots"], ensure_ascii=False)
+	assert payload["shots"]["rows"][0][:2] == [0, ""]  # 原文即 segs 拼接，不重复
+	assert payload["shots"]["rows"][0][2] == [["n", "他推门进来，"], ["q", "“你来了。”"]]
+
+	patch = {
+		"schema_version": "speech_plan_patch.v0.1",
+		"shots": [{"id": i, "default": {"intensity": 0.55}, "segs": [{"i": 1, "speaker": "甲"}]} for i in range(6)],
+	}
+	decoded = decode_compact_patch(patch, shots)
+	validate_patch(decoded, [s["shot_id"] for s in shots])
+	assert decoded["shots"][2]["segments"] == [{"speaker": "甲", "seg_id": "ch_0001_shot_0002_seg_1"}]
+
+
+def test_director_review_compact_prompt_and_decode():
+	shots = _shots()
+	compact = dr_compact("ch_0001", shots[1:5], shots[:1], shots[5:])
+	assert estimate_tokens(compact) < estimate_tokens(dr_verbose("ch_0001", shots[1:5], shots[:1], shots[5:]))
+	payload = _payload(compact)
+	assert [r[0] for r in payload["shots"]["rows"]] == [0, 1, 2, 3]
+	review = decode_compact_review(
+		{"patch": {"shots": [{"id": 0, "gap_after_ms": 500}, {"id": 9}]}, "risks": [{"id": 3, "issue": "x"}]},
+		shots[1:5],
+	)
+	assert review["patch"]["shots"][0] == {"gap_after_ms": 500, "shot_id": "ch_0001_shot_0001"}
+	assert review["patch"]["shots"][1]["shot_id"] == "unknown_local_id:9"
+	assert review["risks"][0]["shot_id"] == "ch_0001_shot_0004"
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_render_plan.py
+
+Render 规划：clip 切分、字幕切片、ffmpeg 命令构造（不执行 ffmpeg）。
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from novel2comic.core.render_plan import (
+	ClipSpec,
+	RenderSettings,
+	build_clip_cmd,
+	build_concat_cmd,
+	clip_events,
+	normalize_motion,
+	plan_clips,
+	render_ass,
+	split_ass,
+	write_concat_list,
+)
+
+_ASS = """[Script Info]
+Title: novel2comic
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+Dialogue: 0,0:00:00.00,0:00:01.20,Default,,0,0,0,,第一句，\\N换行
+Dialogue: 0,0:00:01.20,0:00:02.50,Default,,0,0,0,,第二句"""
+
+
+def test_plan_clips_frames_do_not_drift():
+	# 起点非帧对齐，逐 clip 帧数之和仍等于总帧数
+	clips = plan_clips([("a", 0), ("b", 1030), ("c", 2071)], 3333, 24)
+	assert [c.shot_id for c in clips] == ["a", "b", "c"]
+	assert sum(c.frames for c in clips) == round(3333 * 24 / 1000)
+	assert clips[1].start_ms == 1030 and clips[1].end_ms == 2071
+
+
+def test_plan_clips_first_clip_starts_at_zero():
+	clips = plan_clips([("a", 40)], 1000, 25)
+	assert clips[0].start_ms == 0 and clips[0].frames == 25
+
+
+def test_normalize_motion():
+	assert normalize_motion(None) == {"type": "static", "strength": 0.08}
+	assert normalize_motion("zoom_in")["type"] == "zoom_in"
+	assert normalize_motion({"type": "spin"})["type"] == "static"
+	assert normalize_motion({"type": "pan_left", "strength": 2})["strength"] == 0.5
+
+
+def test_split_and_clip_events():
+	header, events = split_ass(_ASS)
+	assert header.rstrip().endswith("Effect, Text")
+	assert events == [(0, 1200, "第一句，\\N换行"), (1200, 2500, "第二句")]
+	local = clip_events(events, 1000, 2000)
+	assert local == [(0, 200, "第一句，\\N换行"), (200, 1000, "第二句")]
+	out = render_ass(header, local)
+	assert "Dialogue: 0,0:00:00.20,0:00:01.00,Default,,0,0,0,,第二句" in out
+
+
+def test_build_clip_cmd_image_with_motion(tmp_path):
+	clip = ClipSpec("a", 0, 0, 2000, 48, image=tmp_path / "a.png", motion={"type": "zoom_in", "strength": 0.1})
+	cmd = build_clip_cmd(clip, tmp_path / "a.mp4", RenderSettings(), ass_path=tmp_path / "a.ass", threads=2)
+	vf = cmd[cmd.index("-vf") + 1]
+	assert vf.startswith("scale=1920:1080:force_original_aspect_ratio=increase,crop=1920:1080")
+	assert "zoompan=" in vf and "d=48" in vf
+	assert ",ass='" in vf and vf.endswith("format=yuv420p")
+	assert cmd[cmd.index("-frames:v") + 1] == "48"
+	assert "-an" in cmd and cmd[cmd.index("-threads") + 1] == "2"
+
+
+def test_build_clip_cmd_without_image_uses_color():
+	clip = ClipSpec("a", 0, 0, 1000, 24)
+	cmd = build_clip_cmd(clip, Path("a.mp4"), RenderSettings())
+	assert "lavfi" in cmd
+	assert "zoompan" not in cmd[cmd.index("-vf") + 1]
+
+
+def test_concat_list_and_cmd(tmp_path):
+	list_path = tmp_path / "concat.txt"
+	write_concat_list([tmp_path / "a.mp4", tmp_path / "it's.mp4"], list_path)
+	lines = list_path.read_text(encoding="utf-8").splitlines()
+	assert lines[0].startswith("file '") and lines[1].endswith("it'\\''s.mp4'")
+	cmd = build_concat_cmd(list_path, tmp_path / "a.wav", tmp_path / "out.mp4", RenderSettings())
+	assert cmd[cmd.index("-c:v") + 1] == "copy"
+	assert ["-f", "concat"] == cmd[cmd.index("-f"):cmd.index("-f") + 2]
+
+
+def test_plan_clips_static_shots_use_reduced_fps_without_drift():
+	# fps=24, static_fps=8 -> k=3；静止镜头边界吸附到 3 帧网格
+	starts = [("a", 0), ("b", 1030), ("c", 2071)]
+	clips = plan_clips(starts, 3333, 24, static_ids={"b"}, static_fps=8)
+	b = clips[1]
+	assert b.fps == 8
+	# 低帧率帧数 * 3 == 全局帧数；全部 clip 覆盖的全局帧数仍等于总帧数
+	total = sum(c.frames * (24 // c.fps) for c in clips)
+	assert total == round(3333 * 24 / 1000)
+	assert clips[0].fps == 24 and clips[2].fps == 24
+
+
+def test_plan_clips_static_fps_must_divide_fps():
+	clips = plan_clips([("a", 0)], 1000, 25, static_ids={"a"}, static_fps=8)
+	assert clips[0].fps == 25 and clips[0].frames == 25
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_render_stage.py
+
+Render 阶段 clip 编排与缓存（假 ffmpeg：只记录命令并创建输出文件）。
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from novel2comic.core.ffmpeg_pool import FFmpegPool, FFmpegResult
+from novel2comic.core.io import chapter_paths
+from novel2comic.core.timeline import build_timeline, save_timeline
+from novel2comic.stages import render
+from tests.helpers import fake_fmp4
+
+_ASS = """[Script Info]
+Title: novel2comic
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+Dialogue: 0,0:00:00.00,0:00:01.00,Default,,0,0,0,,第一句
+Dialogue: 0,0:00:01.20,0:00:02.00,Default,,0,0,0,,第二句"""
+
+
+class _FakeFFmpeg(FFmpegPool):
+	"""不启动进程：记录命令并创建输出文件。"""
+
+	def __init__(self):
+		super().__init__(max_procs=2, cpu_count=8)
+		self.cmds: list[list[str]] = []
+
+	def _execute(self, cmd, duration_ms, label, on_progress, timeout_s):
+		self.cmds.append(cmd)
+		out = Path(cmd[-1])
+		out.write_bytes(fake_fmp4() if out.name.endswith(".frag.mp4") else b"x")
+		return FFmpegResult(returncode=0, elapsed_s=0.0)
+
+	def clip_cmds(self) -> list[list[str]]:
+		return [c for c in self.cmds if "concat" not in c]
+
+
+@pytest.fixture
+def pack(tmp_path, monkeypatch):
+	paths = chapter_paths(tmp_path)
+	paths.ensure_dirs()
+	save_timeline(paths.audio_timeline_json, build_timeline(
+		[
+			{"shot_id": "s1", "start_ms": 0, "end_ms": 1000, "gap_after_ms": 200},
+			{"shot_id": "s2", "start_ms": 1200, "end_ms": 2000, "gap_after_ms": 0},
+		],
+		sample_rate=24000,
+	))
+	paths.subtitles_ass.write_text(_ASS, encoding="utf-8")
+	(paths.images_shots_dir / "shot_s1.png").write_bytes(b"img1")
+	fake = _FakeFFmpeg()
+	monkeypatch.setattr(render, "get_ffmpeg_pool", lambda **kw: fake)
+	return paths, fake
+
+
+def _shots() -> list[dict]:
+	return [{"shot_id": "s1", "motion": {"type": "zoom_in"}}, {"shot_id": "s2"}]
+
+
+def test_render_clips_encodes_each_shot_and_concats(pack):
+	paths, fake = pack
+	clips = render._render_clips(paths, _shots(), 2000, {"workers": 2})
+	assert [c.shot_id for c in clips] == ["s1", "s2"]
+	assert len(fake.clip_cmds()) == 2
+	# 8 核 / 2 并发 -> 每个 ffmpeg 4 线程，且带 -progress
+	assert all(c[c.index("-threads") + 1] == "4" and "-progress" in c for c in fake.clip_cmds())
+	assert fake.cmds[-1][fake.cmds[-1].index("-c:v") + 1] == "copy"
+	assert (paths.video_clips_dir / "s2.ass").read_text(encoding="utf-8").endswith("0:00:00.80,Default,,0,0,0,,第二句")
+
+
+def test_render_clips_reuses_cache_and_reencodes_changed_shot(pack):
+	paths, fake = pack
+	render._render_clips(paths, _shots(), 2000, {})
+	fake.cmds.clear()
+
+	render._render_clips(paths, _shots(), 2000, {})
+	assert fake.clip_cmds() == []
+	assert len(fake.cmds) == 1  # 只重新 concat
+
+	(paths.images_shots_dir / "shot_s1.png").write_bytes(b"img1-fixed")
+	fake.cmds.clear()
+	render._render_clips(paths, _shots(), 2000, {})
+	assert [c[-1] for c in fake.clip_cmds()] == [str(paths.video_clips_dir / "s1.mp4")]
+
+
+def test_render_clips_reencodes_on_ass_style_change(pack):
+	paths, fake = pack
+	render._render_clips(paths, _shots(), 2000, {})
+	fake.cmds.clear()
+
+	styled = _ASS.replace(
+		"[Events]",
+		"[V4+ Styles]\nFormat: Name, Fontname, Fontsize\nStyle: Default,Noto Sans CJK SC,48\n\n[Events]",
+	)
+	paths.subtitles_ass.write_text(styled, encoding="utf-8")
+	render._render_clips(paths, _shots(), 2000, {})
+	assert len(fake.clip_cmds()) == 2
+
+
+def test_render_clips_cache_disabled(pack):
+	paths, fake = pack
+	render._render_clips(paths, _shots(), 2000, {})
+	fake.cmds.clear()
+	render._render_clips(paths, _shots(), 2000, {"clip_cache": False})
+	assert len(fake.clip_cmds()) == 2
+
+
+def test_soft_subtitles_mux_without_burn_in(pack):
+	paths, fake = pack
+	paths.subtitles_srt.write_text("1\n00:00:00,000 --> 00:00:01,000\n第一句\n", encoding="utf-8")
+	render._render_clips(paths, _shots(), 2000, {"subtitles": "soft"})
+	assert all("ass=" not in c[c.index("-vf") + 1] for c in fake.clip_cmds())
+	concat = fake.cmds[-1]
+	assert str(paths.subtitles_srt) in concat and concat[concat.index("-c:s") + 1] == "mov_text"
+
+	# 改字幕只重新封装，不重编码 clip
+	paths.subtitles_ass.write_text(_ASS.replace("第二句", "第二句改"), encoding="utf-8")
+	fake.cmds.clear()
+	render._render_clips(paths, _shots(), 2000, {"subtitles": "soft"})
+	assert fake.clip_cmds() == []
+
+
+def test_soft_subtitles_mkv_keeps_ass(pack):
+	paths, fake = pack
+	render._render_clips(paths, _shots(), 2000, {"subtitles": "soft", "container": "mkv"})
+	concat = fake.cmds[-1]
+	assert concat[-1].endswith("preview.mkv")
+	assert str(paths.subtitles_ass) in concat and concat[concat.index("-c:s") + 1] == "copy"
+	assert "-movflags" not in concat
+
+
+def test_proxy_profile_prescales_once_and_writes_separate_output(pack):
+	paths, fake = pack
+	cfg = render._profile_config(
+		{"width": 1920, "profiles": {"proxy": {"width": 640, "height": 360, "preset": "ultrafast", "prescale_images": True}}},
+		"proxy",
+	)
+	render._render_clips(paths, _shots(), 2000, cfg, "proxy")
+	prescale = [c for c in fake.clip_cmds() if c[c.index("-vf") + 1].endswith("setsar=1")]
+	assert len(prescale) == 1
+	assert fake.cmds[-1][-1] == str(paths.video_dir / "proxy.mp4")
+	assert (paths.video_dir / "clips_proxy" / "s1.mp4").exists()
+	assert not paths.video_clips_dir.joinpath("s1.mp4").exists()
+
+
+def test_prescale_runs_once_per_shared_image_before_encoding(pack):
+	paths, fake = pack
+	# 两个 shot 共用同一张图：只缩放一次，且缩放先于所有 clip 编码
+	(paths.images_shots_dir / "shot_s2.png").write_bytes(b"img1")
+	render._render_clips(paths, _shots(), 2000, {"width": 640, "height": 360, "prescale_images": True})
+	cmds = fake.clip_cmds()
+	is_prescale = [c[c.index("-vf") + 1].endswith("setsar=1") for c in cmds]
+	assert is_prescale == [True, False, False]
+	scaled = Path(cmds[0][-1])
+	assert all(str(scaled) in c for c in cmds[1:])
+
+
+def test_color_mode_applies_profile_settings(pack):
+	paths, fake = pack
+	cfg = render._profile_config(
+		{"mode": "color", "profiles": {"proxy": {"width": 640, "height": 360, "preset": "ultrafast", "crf": 30, "audio_bitrate": "64k"}}},
+		"proxy",
+	)
+	render._render_color(paths, 2000, False, "mp4", cfg, "proxy")
+	cmd = fake.cmds[-1]
+	assert "s=640x360" in cmd[cmd.index("lavfi") + 2]
+	assert cmd[cmd.index("-preset") + 1] == "ultrafast" and cmd[cmd.index("-crf") + 1] == "30"
+	assert cmd[cmd.index("-b:a") + 1] == "64k"
+	assert cmd[-1] == str(paths.video_dir / "proxy.mp4")
+
+
+def test_unknown_profile_raises():
+	with pytest.raises(ValueError):
+		render._profile_config({}, "nope")
+
+
+def test_hls_segments_per_shot_and_incremental_replace(pack):
+	paths, fake = pack
+	clips = render._render_clips(paths, _shots(), 2000, {"hls": True})
+	hls = paths.video_hls_dir
+	playlist = (hls / "playlist.m3u8").read_text(encoding="utf-8")
+	assert "s1.m4s" in playlist and "s2.m4s" in playlist and playlist.endswith("#EXT-X-ENDLIST\n")
+	assert (hls / "s1_init.mp4").exists() and not (hls / "s1.frag.mp4").exists()
+	# 分片并发编码，命令记录顺序不固定：按输出文件取
+	seg_cmds = {Path(c[-1]).name: c for c in fake.cmds if c[-1].endswith(".frag.mp4")}
+	s2 = seg_cmds["s2.frag.mp4"]
+	# 第二段音频从首 clip 的实际帧时长处开始（与视频帧网格对齐，不是 timeline 的 1200ms）
+	assert s2[s2.index("-ss") + 1] == f"{clips[0].frames / 24:.6f}"
+
+	(paths.images_shots_dir / "shot_s1.png").write_bytes(b"img1-fixed")
+	fake.cmds.clear()
+	render._render_clips(paths, _shots(), 2000, {"hls": True})
+	assert [c[-1] for c in fake.cmds if c[-1].endswith(".frag.mp4")] == [str(hls / "s1.frag.mp4")]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_session.py
+
+provider 共享会话层：同 base_url 共用连接池、重试等待（退避 + 抖动）、插桩钩子、Qwen-Image 按统一策略重试。
+"""
+
+from __future__ import annotations
+
+import httpx
+
+from novel2comic.providers import session
+from novel2comic.providers.image import image_qwen
+from novel2comic.providers.llm.siliconflow_client import SiliconFlowConfig, SiliconFlowLLMClient
+from novel2comic.providers.session import RetryPolicy, get_session
+from novel2comic.providers.vlm.siliconflow_vlm import SiliconFlowVLMClient, VLMConfig
+
+
+def test_clients_share_one_pool_per_base_url():
+	llm = SiliconFlowLLMClient(SiliconFlowConfig(api_key="k", base_url="https://a.invalid/v1", model="m", timeout_s=60))
+	vlm = SiliconFlowVLMClient(VLMConfig(api_key="k", base_url="https://a.invalid/v1", model="v", timeout_s=60, detail="low"))
+	assert llm._client is vlm._client
+	assert get_session("https://b.invalid/v1", "k", 60) is not llm._client
+	# client.close() 不关闭共享会话
+	llm.close()
+	assert not vlm._client.is_closed
+	session.close_sessions()
+	assert vlm._client.is_closed
+	assert get_session("https://a.invalid/v1", "k", 60) is not vlm._client
+	session.close_sessions()
+
+
+def test_retry_delay_backs_off_with_jitter_and_cap():
+	fixed = RetryPolicy(base_s=1.0, max_s=5.0, jitter=False)
+	assert [fixed.delay(a) for a in range(4)] == [1.0, 2.0, 4.0, 5.0]
+	jittered = RetryPolicy(base_s=1.0, max_s=5.0, jitter=True)
+	for attempt in range(4):
+		d = jittered.delay(attempt)
+		assert fixed.delay(attempt) / 2 <= d <= fixed.delay(attempt)
+	assert RetryPolicy().should_retry_status(503)
+	assert not RetryPolicy().should_retry_status(400)
+
+
+def test_hooks_receive_response_and_elapsed():
+	seen = []
+
+	def hook(request, response, elapsed):
+		seen.append((request.url.path, response.status_code, elapsed))
+
+	session.add_hook(hook)
+	try:
+		req = httpx.Request("POST", "https://a.invalid/v1/chat/completions")
+		session._on_request(req)
+		session._on_response(httpx.Response(200, request=req))
+	finally:
+		session.remove_hook(hook)
+	assert len(seen) == 1
+	path, code, elapsed = seen[0]
+	assert (path, code) == ("/v1/chat/completions", 200)
+	assert elapsed >= 0
+
+
+def test_qwen_request_retries_with_shared_policy(monkeypatch):
+	codes = [503, 200]
+	sleeps = []
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		code = codes.pop(0)
+		if code != 200:
+			return httpx.Response(code, text="busy")
+		return httpx.Response(200, json={"images": [{"url": "https://cdn.invalid/x.png"}], "seed": 7})
+
+	monkeypatch.setattr(image_qwen, "retry_policy", lambda: RetryPolicy(max_attempts=3, base_s=0.5, jitter=False))
+	monkeypatch.setattr(image_qwen.time, "sleep", sleeps.append)
+	monkeypatch.setattr(image_qwen, "_download_url", lambda url: b"png")
+	client = httpx.Client(base_url="https://example.invalid/v1", transport=httpx.MockTransport(handler))
+	png, meta = image_qwen._do_request_once(client, {"prompt": "p"})
+	assert png == b"png" and meta["seed"] == 7
+	assert sleeps == [0.5]
+	client.close()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_singleflight.py
+
+在途请求合并：并发相同 key 只执行一次、异常传给等待者、LLM client 并发相同请求只发一次 HTTP。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import httpx
+import pytest
+
+from novel2comic.core.singleflight import SingleFlight, request_key
+from novel2comic.core.windowing import run_concurrent
+from novel2comic.providers.llm.siliconflow_client import SiliconFlowConfig, SiliconFlowLLMClient
+
+
+def test_request_key_is_order_insensitive():
+	assert request_key("/a", {"x": 1, "y": 2}) == request_key("/a", {"y": 2, "x": 1})
+	assert request_key("/a", {"x": 1}) != request_key("/b", {"x": 1})
+
+
+def test_concurrent_callers_share_one_execution():
+	sf = SingleFlight()
+	release = threading.Event()
+	runs = []
+
+	def slow():
+		runs.append(1)
+		release.wait(2)
+		return {"v": 1}
+
+	threads = []
+	results = []
+	for _ in range(4):
+		t = threading.Thread(target=lambda: results.append(sf.do("k", slow)))
+		t.start()
+		threads.append(t)
+	while sf.stats()["joined"] < 3:
+		time.sleep(0.005)
+	release.set()
+	for t in threads:
+		t.join()
+	assert len(runs) == 1
+	assert sorted(shared for _, shared in results) == [False, True, True, True]
+	assert sf.stats() == {"leaders": 1, "joined": 3, "inflight": 0}
+
+
+def test_errors_propagate_and_are_not_remembered():
+	sf = SingleFlight()
+
+	def boom():
+		raise ValueError("boom")
+
+	with pytest.raises(ValueError):
+		sf.do("k", boom)
+	assert sf.do("k", lambda: 2) == (2, False)
+
+
+def test_llm_client_coalesces_identical_inflight_requests():
+	calls = []
+	gate = threading.Event()
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		calls.append(1)
+		gate.wait(2)
+		return httpx.Response(200, json={"choices": [{"message": {"content": '{"ok": true}'}}]})
+
+	client = SiliconFlowLLMClient(SiliconFlowConfig(api_key="k", base_url="https://example.invalid/v1", model="m"))
+	client._client = httpx.Client(base_url="https://example.invalid/v1", transport=httpx.MockTransport(handler))
+	published = []
+	post_chat = client._post_chat
+	client._post_chat = lambda payload: published.append(post_chat(payload)) or published[-1]
+	threading.Timer(0.2, gate.set).start()
+	outcomes = run_concurrent(lambda _: client.chat_json("s", "same"), range(3), 3)
+	assert [r for r, _ in outcomes] == [{"ok": True}] * 3
+	assert len(calls) == 1
+	# 每个调用方（含领头者）拿到的都是各自的拷贝
+	results = [r for r, _ in outcomes]
+	assert len({id(r) for r in results}) == 3
+	assert all(r is not published[0] for r in results)
+	client.close()
+
+
+def test_image_request_gives_leader_its_own_meta_copy(monkeypatch):
+	from novel2comic.providers.image import image_qwen
+
+	published = {"seed": 7}
+	monkeypatch.setattr(image_qwen, "_do_request_once", lambda client, payload: (b"png", published))
+	png, meta = image_qwen._do_request(None, {"prompt": "p", "seed": 7})
+	assert png == b"png" and meta == published
+	# 领头者原地补字段不影响共享对象
+	meta["model"] = "m"
+	assert published == {"seed": 7}
@@ -49,3 +49,100 @@ class TestApplier:
 		assert len(result) == 2
 		assert result[0].text == "前半。"
 		assert result[1].text == "后半。"
+
+
+class _ChunkLLM:
+	"""每块合并前两个 shot；块内含「坏」字的返回非法 split。"""
+
+	def __init__(self):
+		self.calls: list[list[str]] = []
+
+	def chat_json(self, system_prompt, user_prompt):
+		import json
+		payload = json.loads(user_prompt.split("输入数据(JSON)：\n", 1)[1])
+		texts = [s["text"] for s in payload["base_shots"]]
+		self.calls.append(texts)
+		if any("坏" in t for t in texts):
+			ops = [{"op": "split", "idx": 0, "at": "不存在"}]
+		else:
+			ops = [{"op": "merge", "start_idx": 0, "end_idx": 1}]
+		return {
+			"schema_version": "shotsplit_patch.v0.1",
+			"chapter_id": payload["chapter_id"],
+			"constraints": payload["constraints"],
+			"ops": ops,
+		}
+
+
+class TestChunkedRefine:
+	def _base(self):
+		texts = ["甲一。", "甲二。", "甲三。", "——————", "乙一。", "乙坏。", "乙三。", "丙一。", "丙二。"]
+		return [Shot(i, "scene_break" if t.startswith("—") else "narration", t) for i, t in enumerate(texts)]
+
+	def test_chunks_refine_independently_and_stitch(self):
+		from novel2comic.skills.refine_shot_split.skill import RefineShotSplitSkill
+
+		base = self._base()
+		llm = _ChunkLLM()
+		res = RefineShotSplitSkill(llm, chunk_shots=3, workers=3).run("ch", base, Constraints(min_shots=1, max_shots=20))
+		# 块：[甲一 甲二 甲三] [——] [乙一 乙坏 乙三] [丙一 丙二]；scene_break 块不调用 LLM
+		assert res.chunks == 4 and len(llm.calls) == 3
+		assert res.failed_chunks == 1 and res.used_fallback
+		assert [s.text for s in res.refined_shots] == [
+			"甲一。甲二。", "甲三。", "——————", "乙一。", "乙坏。", "乙三。", "丙一。丙二。",
+		]
+		assert [s.idx for s in res.refined_shots] == list(range(7))
+		validate_text_conservation(base, res.refined_shots)
+
+	def test_short_scenes_merge_into_one_chunk(self):
+		from novel2comic.core.windowing import plan_windows_at_breaks
+		from novel2comic.skills.refine_shot_split.skill import RefineShotSplitSkill
+
+		texts = ["甲一。", "——————", "乙一。", "——————", "丙一。", "丙二。"]
+		base = [Shot(i, "scene_break" if t.startswith("—") else "narration", t) for i, t in enumerate(texts)]
+		breaks = [s.kind == "scene_break" for s in base]
+		assert [(w.start, w.end) for w in plan_windows_at_breaks(breaks, 4)] == [(0, 4), (4, 6)]
+		assert len(plan_windows_at_breaks(breaks, 0)) == 3
+		llm = _ChunkLLM()
+		res = RefineShotSplitSkill(llm, chunk_shots=4, workers=1).run("ch", base, Constraints(min_shots=1, max_shots=20))
+		assert res.chunks == 2 and len(llm.calls) == 2
+
+	def test_stitched_count_out_of_chapter_range_falls_back(self):
+		from novel2comic.skills.refine_shot_split.skill import RefineShotSplitSkill
+
+		base = self._base()
+		# 各块的 min 按比例向下取整都能通过，拼接后 7 个 shot 低于整章 min=8
+		res = RefineShotSplitSkill(_ChunkLLM(), chunk_shots=3, workers=1).run("ch", base, Constraints(min_shots=8, max_shots=20))
+		assert res.used_fallback and res.failed_chunks == res.chunks == 4
+		assert [s.text for s in res.refined_shots] == [s.text for s in base]
+		assert "stitched: shot count out of range: 7" in res.error
+
+	def test_result_reports_answering_model(self):
+		from types import SimpleNamespace
+
+		from novel2comic.providers.llm.cascade import CascadeConfig
+		from novel2comic.skills.refine_shot_split.skill import RefineShotSplitSkill
+
+		class _ModelLLM(_ChunkLLM):
+			cfg = SimpleNamespace(model="big")
+
+			def chat_json(self, system_prompt, user_prompt, model=None):
+				return _ChunkLLM.chat_json(self, system_prompt, user_prompt)
+
+		base = [Shot(i, "narration", t) for i, t in enumerate(["甲一。", "甲二。", "甲三。"])]
+		c = Constraints(min_shots=1, max_shots=20)
+		assert RefineShotSplitSkill(_ModelLLM()).run("ch", base, c).model == "big"
+		small = CascadeConfig(small_model="small")
+		assert RefineShotSplitSkill(_ModelLLM(), cascade=small).run("ch", base, c).model == "small"
+		assert RefineShotSplitSkill(_ModelLLM(), chunk_shots=2, cascade=small).run("ch", base, c).model == "small"
+		# 全部块失败（回退 baseline）时不报告模型
+		bad = [Shot(i, "narration", t) for i, t in enumerate(["坏一。", "坏二。"])]
+		assert RefineShotSplitSkill(_ModelLLM(), chunk_shots=2).run("ch", bad, c).model == ""
+
+	def test_chunk_constraints_scale_with_chunk_size(self):
+		from novel2comic.skills.refine_shot_split.skill import chunk_constraints
+
+		c = chunk_constraints(Constraints(min_shots=60, max_shots=120), 20, 100)
+		assert (c.min_shots, c.max_shots) == (12, 24)
+		c = chunk_constraints(Constraints(min_shots=60, max_shots=120), 3, 100)
+		assert (c.min_shots, c.max_shots) == (1, 4)
@@ -55,3 +55,179 @@ def test_validate_patch_missing_shot_id():
 			},
 			["ch_0001_shot_0000", "ch_0001_shot_0001"],
 		)
+
+
+def _shot(i: int) -> dict:
+	sid = f"ch_0001_shot_{i:04d}"
+	return {
+		"shot_id": sid,
+		"text": {"raw_text": f"第{i}句"},
+		"speech": {"segments": [{"seg_id": f"{sid}_seg_0", "kind": "narration", "raw_text": f"第{i}句"}]},
+	}
+
+
+class _WindowLLM:
+	"""按 prompt 里的 shot_id 生成 patch；包含 bad_id 的窗口总是返回非法 intensity。"""
+
+	def __init__(self, bad_id: str = ""):
+		self.bad_id = bad_id
+		self.prompts: list[dict] = []
+
+	def chat_json(self, system_prompt, user_prompt):
+		import json
+		payload = json.loads(user_prompt.split("输入数据(JSON)：\n", 1)[1])
+		self.prompts.append(payload)
+		ids = [s["shot_id"] for s in payload["shots"]]
+		intensity = 0.5 if self.bad_id in ids else 0.75
+		return {
+			"schema_version": "speech_plan_patch.v0.1",
+			"shots": [{"shot_id": sid, "default": {"intensity": intensity}} for sid in ids],
+		}
+
+
+def test_plan_windows_overlap():
+	from novel2comic.core.windowing import plan_windows
+
+	ws = plan_windows(10, 4, 1)
+	assert [(w.start, w.end, w.ctx_start, w.ctx_end) for w in ws] == [(0, 4, 0, 5), (4, 8, 3, 9), (8, 10, 7, 10)]
+	assert len(plan_windows(10, 0, 2)) == 1
+
+
+def test_speech_plan_windows_fall_back_independently(monkeypatch):
+	from novel2comic.skills.speech_plan import skill
+	from novel2comic.skills.speech_plan.skill import SpeechPlanSkill
+
+	sleeps = []
+	monkeypatch.setattr(skill.time, "sleep", sleeps.append)
+	shots = [_shot(i) for i in range(7)]
+	llm = _WindowLLM(bad_id="ch_0001_shot_0004")
+	res = SpeechPlanSkill(llm, window_shots=3, overlap_shots=1, workers=3, retries=1).run("ch_0001", shots)
+	assert [s["shot_id"] for s in res.shots] == [s["shot_id"] for s in shots]
+	assert res.windows == 3 and res.failed_windows == 1 and res.used_fallback
+	intensities = [s["speech"]["default"]["intensity"] for s in res.shots]
+	assert intensities[:3] == [0.75] * 3 and intensities[6] == 0.75
+	assert intensities[3:6] == [0.35] * 3  # 失败窗口回退默认模板
+	# 3 个窗口 + 失败窗口退避后重试 1 次
+	assert len(llm.prompts) == 4
+	assert len(sleeps) == 1
+	middle = next(p for p in llm.prompts if p["shots"][0]["shot_id"] == "ch_0001_shot_0003")
+	assert [c["shot_id"] for c in middle["context_before"]] == ["ch_0001_shot_0002"]
+	assert [c["shot_id"] for c in middle["context_after"]] == ["ch_0001_shot_0006"]
+
+
+class _StreamLLM(_WindowLLM):
+	"""流式版本：逐条回调；truncate_after>0 时只输出前 N 条并报告截断。"""
+
+	def __init__(self, truncate_after: int = 0):
+		super().__init__()
+		self.truncate_after = truncate_after
+
+	def chat_json_stream(self, system_prompt, user_prompt, array_path, on_item=None):
+		patch = self.chat_json(system_prompt, user_prompt)
+		items = patch["shots"][: self.truncate_after] if self.truncate_after else patch["shots"]
+		for it in items:
+			on_item(it)
+		if self.truncate_after:
+			return {"shots": items}, False
+		return patch, True
+
+
+def test_speech_plan_stream_keeps_prefix_when_truncated():
+	from novel2comic.skills.speech_plan.skill import SpeechPlanSkill
+
+	shots = [_shot(i) for i in range(4)]
+	res = SpeechPlanSkill(_StreamLLM(truncate_after=2), stream=True).run("ch_0001", shots)
+	intensities = [s["speech"]["default"]["intensity"] for s in res.shots]
+	assert intensities == [0.75, 0.75, 0.35, 0.35]
+	assert res.truncated_windows == 1 and res.failed_windows == 0 and res.used_fallback
+
+	res = SpeechPlanSkill(_StreamLLM(), stream=True).run("ch_0001", shots)
+	assert [s["speech"]["default"]["intensity"] for s in res.shots] == [0.75] * 4
+	assert not res.used_fallback
+
+
+class _CascadeLLM(_WindowLLM):
+	"""小模型对包含 bad_id 的窗口返回非法 patch；默认模型（model=None）总是合法。"""
+
+	def __init__(self, bad_id: str = ""):
+		super().__init__(bad_id)
+		self.models: list = []
+
+	def chat_json(self, system_prompt, user_prompt, model=None):
+		self.models.append(model)
+		patch = _WindowLLM.chat_json(self, system_prompt, user_prompt)
+		if model is None:
+			for it in patch["shots"]:
+				it["default"]["intensity"] = 0.75
+		return patch
+
+
+def test_speech_plan_cascade_escalates_on_validation_and_complexity():
+	from novel2comic.providers.llm.cascade import CascadeConfig
+	from novel2comic.skills.speech_plan.skill import SpeechPlanSkill
+
+	shots = [_shot(i) for i in range(6)]
+	# 第三个窗口对白过多，直接用默认模型
+	for s in shots[4:6]:
+		s["speech"]["segments"] = [{"seg_id": f"{s['shot_id']}_seg_{k}", "kind": "dialogue", "raw_text": "“好”"} for k in range(2)]
+	llm = _CascadeLLM(bad_id="ch_0001_shot_0002")
+	cascade = CascadeConfig(small_model="small", max_quotes=3)
+	res = SpeechPlanSkill(llm, window_shots=2, overlap_shots=0, workers=1, retries=2, cascade=cascade).run("ch_0001", shots)
+	assert not res.used_fallback
+	assert [s["speech"]["default"]["intensity"] for s in res.shots] == [0.75] * 6
+	# 窗口 0：小模型通过；窗口 1：小模型校验失败升级；窗口 2：复杂窗口跳过小模型
+	assert llm.models == ["small", "small", None, None]
+
+
+def test_rejected_response_is_not_cached_and_retry_refetches(tmp_path, monkeypatch):
+	"""校验不过的响应不写缓存；重试跳过缓存读取重新请求，通过后才落盘。"""
+	import json
+
+	import httpx
+
+	from novel2comic.providers.llm.llm_cache import LLMCache
+	from novel2comic.providers.llm.siliconflow_client import SiliconFlowConfig, SiliconFlowLLMClient
+	from novel2comic.skills.speech_plan import skill
+	from novel2comic.skills.speech_plan.skill import SpeechPlanSkill
+
+	monkeypatch.setattr(skill.time, "sleep", lambda s: None)
+
+	shots = [_shot(i) for i in range(2)]
+	ids = [s["shot_id"] for s in shots]
+	replies = [ids[:1], ids]
+	calls = []
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		calls.append(1)
+		patch = {"schema_version": "speech_plan_patch.v0.1", "shots": [{"shot_id": sid} for sid in replies.pop(0)]}
+		return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(patch)}}]})
+
+	cache = LLMCache(tmp_path / "c.sqlite")
+	client = SiliconFlowLLMClient(SiliconFlowConfig(api_key="k", base_url="https://example.invalid/v1", model="m"), cache=cache)
+	client._client = httpx.Client(base_url="https://example.invalid/v1", transport=httpx.MockTransport(handler))
+	res = SpeechPlanSkill(client, retries=3).run("ch_0001", shots)
+	assert not res.used_fallback
+	assert len(calls) == 2
+	assert cache.stats()["hits"] == 0 and cache.stats()["writes"] == 1
+	# 重跑命中的是通过校验的那份
+	assert not SpeechPlanSkill(client, retries=3).run("ch_0001", shots).used_fallback
+	assert len(calls) == 2
+	client.close()
+
+
+def test_open_circuit_is_not_retried_or_escalated():
+	from novel2comic.providers.breaker import CircuitOpenError
+	from novel2comic.providers.llm.cascade import CascadeConfig
+	from novel2comic.skills.speech_plan.skill import SpeechPlanSkill
+
+	calls = []
+
+	class _OpenLLM:
+		def chat_json(self, system_prompt, user_prompt, model=None):
+			calls.append(model)
+			raise CircuitOpenError("llm", 5.0)
+
+	res = SpeechPlanSkill(_OpenLLM(), retries=3, cascade=CascadeConfig(small_model="small")).run("ch_0001", [_shot(0)])
+	assert res.used_fallback and res.failed_windows == 1
+	# 熔断中：不重试、不升级到大模型
+	assert calls == ["small"]
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_timeline.py
+
+audio/timeline.json 构建、查询与 Align 直接查表。
+"""
+
+from __future__ import annotations
+
+import json
+
+from novel2comic.core.timeline import Timeline, build_timeline, load_timeline, save_timeline, segment_timings
+from novel2comic.stages.align import _flatten, _shot_groups_from_timeline
+
+
+def test_segment_timings_split_request_is_unioned():
+	# 同一 seg 被拆成两个请求
+	t = segment_timings(
+		[(["a"], [5]), (["a"], [5]), (["b"], [2])],
+		[(0.0, 100.0, 360.0), (360.0, 460.0, 580.0), (580.0, 680.0, 800.0)],
+	)
+	assert [(x["seg_id"], x["start_ms"], x["end_ms"], x["pause_after_ms"]) for x in t] == [
+		("a", 0, 460, 120),
+		("b", 580, 680, 120),
+	]
+
+
+def _timeline() -> dict:
+	return build_timeline(
+		[
+			{"shot_id": "s1", "start_ms": 0.0, "end_ms": 580.0, "gap_after_ms": 200,
+			 "segments": [{"seg_id": "s1_seg_0", "start_ms": 0, "end_ms": 100, "pause_after_ms": 480}]},
+			{"shot_id": "s2", "start_ms": 780.0, "end_ms": 1780.0, "gap_after_ms": 0, "segments": None},
+		],
+		sample_rate=24000,
+	)
+
+
+def test_build_and_lookup(tmp_path):
+	path = tmp_path / "timeline.json"
+	save_timeline(path, _timeline())
+	tl = load_timeline(path)
+	assert tl is not None
+	assert tl.duration_ms == 1780
+	assert tl.shot("s2")["start_ms"] == 780
+	assert tl.shot_at(0)["shot_id"] == "s1"
+	assert tl.shot_at(700)["shot_id"] == "s1"  # gap 归前一个 shot
+	assert tl.shot_at(780)["shot_id"] == "s2"
+
+
+def test_load_timeline_rejects_unknown_schema(tmp_path):
+	path = tmp_path / "timeline.json"
+	path.write_text(json.dumps({"schema_version": "x"}), encoding="utf-8")
+	assert load_timeline(path) is None
+
+
+def test_align_entries_from_timeline():
+	shots = [
+		{"shot_id": "s1", "speech": {"segments": [{"seg_id": "s1_seg_0", "raw_text": "第一句。"}]}},
+		{"shot_id": "s2", "text": {"raw_text": "第二句。"}, "speech": {"segments": []}},
+	]
+	entries = _flatten(_shot_groups_from_timeline(shots, Timeline(_timeline())))
+	assert entries == [(0, 580, "第一句。"), (780, 1780, "第二句。")]
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_tts_packer.py
+
+TTS 请求打包（合并 / 拆分 / 停顿记账）单元测试。
+"""
+
+from __future__ import annotations
+
+from novel2comic.core.tts_packer import TTSUnit, pack_requests, split_text
+from novel2comic.core.tts_utils import get_tail_pause_ms
+
+
+def _unit(seg_id: str, text: str, voice: str = "narrator", pause: int | None = None) -> TTSUnit:
+	return TTSUnit(
+		seg_id=seg_id,
+		text=text,
+		voice=voice,
+		style_prompt=None,
+		speed=1.0,
+		pause_after_ms=get_tail_pause_ms(text) if pause is None else pause,
+	)
+
+
+class TestSplitText:
+	def test_short_text_untouched(self):
+		assert split_text("你好。", 10) == ["你好。"]
+
+	def test_split_at_sentence_end(self):
+		text = "第一句话。第二句话。第三句话。"
+		chunks = split_text(text, 10)
+		assert "".join(chunks) == text
+		assert all(len(c) <= 10 for c in chunks)
+		assert chunks[0].endswith("。")
+
+	def test_hard_cut_without_punctuation(self):
+		text = "一" * 25
+		chunks = split_text(text, 10)
+		assert "".join(chunks) == text
+		assert [len(c) for c in chunks] == [10, 10, 5]
+
+
+class TestPackRequests:
+	def test_merge_same_voice(self):
+		reqs = pack_requests([_unit("a", "他走了，"), _unit("b", "没有回头。")], max_chars=50)
+		assert len(reqs) == 1
+		assert reqs[0].text == "他走了，没有回头。"
+		assert reqs[0].seg_ids == ["a", "b"]
+		assert reqs[0].pause_after_ms == get_tail_pause_ms("没有回头。")
+
+	def test_no_merge_across_voice(self):
+		reqs = pack_requests([_unit("a", "旁白。"), _unit("b", "台词！", voice="male")], max_chars=50)
+		assert len(reqs) == 2
+		assert reqs[0].pause_after_ms == 260
+
+	def test_long_pause_not_merged(self):
+		reqs = pack_requests([_unit("a", "等等，", pause=570), _unit("b", "好。")], max_chars=50)
+		assert len(reqs) == 2
+		assert reqs[0].pause_after_ms == 570
+
+	def test_split_keeps_tail_pause_on_last_chunk(self):
+		text = "第一句话。第二句话，"
+		reqs = pack_requests([_unit("a", text, pause=999)], max_chars=6, merge_max_pause_ms=0)
+		assert "".join(r.text for r in reqs) == text
+		assert reqs[0].pause_after_ms == 260
+		assert reqs[-1].pause_after_ms == 999
+		assert all(r.seg_ids == ["a"] for r in reqs)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+tests/test_tts_stage.py
+
+TTS 阶段 shot 合成（假 client，不调用网络）。
+"""
+
+from __future__ import annotations
+
+from novel2comic.core.audio_utils import create_silence_ms, wav_duration_ms
+from novel2comic.providers.tts.siliconflow_tts import SiliconFlowTTSConfig
+from novel2comic.stages.tts import _synthesize_shot, _synthesize_shot_streaming
+
+_PACKER = {"enabled": True, "max_chars": 120, "merge_max_pause_ms": 260}
+
+
+class _FakeTTS:
+	"""每次请求返回 100ms 静音；可指定前 N 次流式请求中途失败。"""
+
+	def __init__(self, fail_first: int = 0):
+		self.cfg = SiliconFlowTTSConfig(
+			api_key="x", base_url="https://x", model="x",
+			voice_narrator="narrator", voice_male="male", voice_female="female",
+			sample_rate=24000, response_format="pcm", timeout_s=60,
+		)
+		self.calls: list[str] = []
+		self.fail_first = fail_first
+
+	def synthesize(self, text, **kw):
+		self.calls.append(text)
+		return create_silence_ms(100)
+
+	def synthesize_stream(self, text, on_pcm, **kw):
+		self.calls.append(text)
+		on_pcm(b"\x00\x00" * 1200)
+		if self.fail_first > 0:
+			self.fail_first -= 1
+			raise ValueError("stream broken")
+		on_pcm(b"\x00\x00" * 1200)
+		return {"ttfb_ms": 12.5, "elapsed_ms": 20.0, "pcm_bytes": 4800}
+
+
+def _shot() -> dict:
+	return {
+		"shot_id": "s1",
+		"speech": {
+			"default": {},
+			"segments": [
+				{"seg_id": "s1_seg_0", "kind": "narration", "raw_text": "他走了，"},
+				{"seg_id": "s1_seg_1", "kind": "narration", "raw_text": "没有回头。"},
+				{"seg_id": "s1_seg_2", "kind": "quote", "raw_text": "\u201c站住！\u201d", "gender_hint": "male"},
+			],
+		},
+	}
+
+
+def test_packed_requests_and_pauses():
+	tts = _FakeTTS()
+	_, wav, audio_ms, err, timings = _synthesize_shot(tts, _shot(), _PACKER)
+	assert err is None
+	assert tts.calls == ["他走了，没有回头。", "站住！"]
+	# 2 × 100ms + 句末停顿 260ms；最后一段后不加停顿
+	assert audio_ms == wav_duration_ms(wav) == 460
+	# 合并请求按字数（4:5）切分 100ms
+	assert [(t["seg_id"], t["start_ms"], t["end_ms"]) for t in timings] == [
+		("s1_seg_0", 0, 44),
+		("s1_seg_1", 44, 100),
+		("s1_seg_2", 360, 460),
+	]
+	assert timings[1]["pause_after_ms"] == 260
+	assert timings[2]["pause_after_ms"] == 0
+
+
+def test_streaming_writes_file_and_reports_ttfb(tmp_path):
+	tts = _FakeTTS(fail_first=1)
+	wav_path = tmp_path / "s1.wav"
+	_, audio_ms, ttfb_ms, err, timings = _synthesize_shot_streaming(tts, _shot(), wav_path, _PACKER)
+	assert err is None
+	assert timings[-1]["start_ms"] == 360
+	assert ttfb_ms == 12.5
+	# 失败的半截请求被回滚，时长与非流式一致
+	assert audio_ms == wav_duration_ms(wav_path.read_bytes()) == 460
+	assert not (tmp_path / "s1.wav.part").exists()
+
+
+def test_stream_and_buffered_modes_produce_same_durations(tmp_path):
+	_, wav, audio_ms, err, timings = _synthesize_shot(_FakeTTS(), _shot(), _PACKER)
+	assert err is None
+	wav_path = tmp_path / "s1.wav"
+	_, stream_ms, _, stream_err, stream_timings = _synthesize_shot_streaming(_FakeTTS(), _shot(), wav_path, _PACKER)
+	assert stream_err is None
+	assert stream_ms == audio_ms == wav_duration_ms(wav_path.read_bytes()) == wav_duration_ms(wav)
+	assert stream_timings == timings